@@ -0,0 +1,100 @@
+"""
+Synthetic catalogues for the benchmarks.
+
+``generate`` bulk-creates developers, categories, features and titles from a seed, so the same arguments
+always produce the same catalogue. The shape follows the real one: a few developers publish most of the
+titles, a few features are on most titles while the rest are rare, and most titles run on Mac and
+Windows. Everything generated carries the ``bench-`` slug prefix (titles through their developer), so
+``clear`` removes exactly what was generated. The slugs are numbered from zero, so a catalogue can only
+be generated into a database without one (see ``exists``).
+
+Rows are written with ``bulk_create`` and the derived structures rebuilt once at the end with
+``signals.rebuild_all``.
+"""
+import datetime
+import random
+from django.db import transaction
+from django.utils import timezone as tz
+from clapdb.software import signals
+from clapdb.software.models import Category, Developer, Feature, Software
+
+PREFIX = "bench-"
+BATCH = 2000
+
+ADJECTIVES = ("Analog", "Bright", "Crystal", "Deep", "Dusty", "Electric", "Frozen", "Golden", "Hollow",
+              "Iron", "Liquid", "Lunar", "Magnetic", "Neon", "Quiet", "Raw", "Silver", "Solar", "Velvet", "Wild")
+NOUNS = ("Bass", "Chorus", "Comp", "Delay", "Drive", "Echo", "Filter", "Flanger", "Gate", "Keys", "Limiter",
+         "Mixer", "Organ", "Phaser", "Piano", "Reverb", "Sampler", "Strings", "Synth", "Tape")
+STUDIOS = ("Audio", "DSP", "Instruments", "Labs", "Music", "Sound", "Soundworks", "Systems")
+CATEGORIES = ("Effects", "Instruments", "Hosts", "Analysis", "Utilities", "MIDI", "Mastering", "Sampling")
+FEATURES = ("Polyphonic Modulation", "Note Expressions", "Thread Pool", "Voice Info", "Tail", "Latency",
+            "Audio Ports Config", "Note Name", "Presets", "State Context", "Remote Controls", "Param Indication",
+            "Track Info", "Surround", "Ambisonic", "Tuning")
+
+
+def generate(titles, developers=None, categories=8, features=12, density=0.25, seed=0):
+    """
+    Create ``titles`` titles spread over the other objects, and return the counts created.
+
+    ``density`` is the mean fraction of the features a title has; each feature's share falls off with its
+    rank, so the most common one is on several times as many titles as the least.
+    """
+    rng = random.Random(seed)
+    developers = developers or max(1, titles // 8)
+    now = tz.now()
+    with transaction.atomic():
+        category_objects = Category.objects.bulk_create(
+            Category(name=f"{CATEGORIES[i % len(CATEGORIES)]} {i // len(CATEGORIES) or ''}".strip(),
+                     slug=f"{PREFIX}category-{i}", sequence=100 + i)
+            for i in range(categories))
+        feature_objects = Feature.objects.bulk_create(
+            Feature(name=f"{FEATURES[i % len(FEATURES)]} {i // len(FEATURES) or ''}".strip(),
+                    slug=f"{PREFIX}feature-{i}", sequence=100 + i)
+            for i in range(features))
+        developer_objects = Developer.objects.bulk_create(
+            (Developer(name=f"{rng.choice(ADJECTIVES)} {rng.choice(STUDIOS)} {i}", slug=f"{PREFIX}developer-{i}",
+                       url=f"https://developer-{i}.example.com")
+             for i in range(developers)), batch_size=BATCH)
+
+        # Zipf-like weights: a few developers and features account for most of the catalogue.
+        developer_weights = [1 / (rank + 1) for rank in range(developers)]
+        feature_weights = [1 / (rank + 1) ** 0.8 for rank in range(features)]
+        scale = density * features / sum(feature_weights)
+        feature_odds = [min(0.95, weight * scale) for weight in feature_weights]
+
+        software = Software.objects.bulk_create(
+            (Software(name=f"{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} {i}",
+                      developer=rng.choices(developer_objects, developer_weights)[0],
+                      category=rng.choice(category_objects),
+                      url=f"https://example.com/titles/{i}",
+                      version=f"{rng.randint(1, 5)}.{rng.randint(0, 9)}.{rng.randint(0, 20)}",
+                      notes=f"<p>{rng.choice(ADJECTIVES)} {rng.choice(NOUNS).lower()} processing.</p>"
+                      if rng.random() < 0.3 else None,
+                      free=rng.random() < 0.25, mac=rng.random() < 0.85, windows=rng.random() < 0.9,
+                      linux=rng.random() < 0.2, active=rng.random() < 0.95,
+                      created=now - datetime.timedelta(days=rng.uniform(0, 730)))
+             for i in range(titles)), batch_size=BATCH)
+
+        through = Software.features.through
+        links = through.objects.bulk_create(
+            (through(software_id=item.pk, feature_id=feature.pk)
+             for item in software for feature, odds in zip(feature_objects, feature_odds) if rng.random() < odds),
+            batch_size=BATCH * 5)
+    signals.rebuild_all()
+    return {"developers": len(developer_objects), "categories": len(category_objects),
+            "features": len(feature_objects), "software": len(software), "feature_links": len(links)}
+
+
+def exists():
+    """Return whether a generated catalogue is present."""
+    return any(model.objects.filter(slug__startswith=PREFIX).exists() for model in (Developer, Category, Feature))
+
+
+def clear():
+    """Delete everything ``generate`` created, and return the number of rows deleted."""
+    with signals.suspended(), transaction.atomic():
+        deleted, _ = Software.objects.filter(developer__slug__startswith=PREFIX).delete()
+        for model in (Developer, Category, Feature):
+            deleted += model.objects.filter(slug__startswith=PREFIX).delete()[0]
+    signals.rebuild_all()
+    return deleted
@@ -0,0 +1,91 @@
+"""
+Query plans of the benchmark scenarios.
+
+``explain`` serves every scenario of ``suite.scenarios`` with cold caches, captures the queries the
+request issues and runs ``EXPLAIN`` on each SELECT, reporting the full table scans: ``SCAN <table>``
+without an index on SQLite, ``Seq Scan on <table>`` on PostgreSQL. The in-process facet and autocomplete
+indexes are built before each request, as their builds read whole tables by design.
+
+Tables smaller than ``min_rows`` are left out of the report: scanning them is cheaper than an index. So
+are SQLite's scans that walk a table in rowid order to answer an ``ORDER BY`` of its primary key with a
+``LIMIT``, such as a page of the API: they stop after a page of matching rows, as an index walk would.
+A WHERE clause that rejects most rows can still make such a walk read the table, which no plan shows.
+"""
+import re
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from clapdb.software.autocomplete import prefix_index
+from clapdb.software.facets import facet_index
+from clapdb.software.testing import cold_caches
+from .suite import scenarios
+
+PLANS = {
+    # SQLite reports "SCAN t" for a table scan, "SCAN t USING [COVERING] INDEX i" for an index walk and
+    # "SCAN t VIRTUAL TABLE INDEX" for a lookup in a full-text index.
+    "sqlite": ("EXPLAIN QUERY PLAN ", re.compile(r"\bSCAN (?:TABLE )?(\w+)(?! USING| VIRTUAL)(?:\s|$)")),
+    "postgresql": ("EXPLAIN ", re.compile(r"Seq Scan on (\w+)")),
+}
+# A sort SQLite cannot take from the scan order shows in the plan as a temporary B-tree.
+SORTED = re.compile(r"\bUSE TEMP B-TREE FOR (?:RIGHT PART OF )?ORDER BY\b")
+LIMITED = re.compile(r"\bORDER BY (.*) LIMIT \d+(?: OFFSET \d+)?$")
+
+
+def plan(sql):
+    """Return the query plan of ``sql`` as a list of lines."""
+    prefix, _ = PLANS[connection.vendor]
+    with connection.cursor() as cursor:
+        cursor.execute(prefix + sql)
+        return [" ".join(str(column) for column in row) for row in cursor.fetchall()]
+
+
+def table_sizes():
+    tables = connection.introspection.table_names()
+    with connection.cursor() as cursor:
+        sizes = {}
+        for table in tables:
+            cursor.execute(f"SELECT COUNT(*) FROM {connection.ops.quote_name(table)}")
+            sizes[table] = cursor.fetchone()[0]
+    return sizes
+
+
+def bounded(table, sql, lines):
+    """Return whether SQLite's scan of ``table`` walks it in rowid order and stops at the LIMIT."""
+    if connection.vendor != "sqlite" or any(SORTED.search(line) for line in lines):
+        return False
+    match = LIMITED.search(sql.strip())
+    if match is None:
+        return False
+    with connection.cursor() as cursor:
+        primary_key = connection.introspection.get_primary_key_column(cursor, table)
+    return re.match(rf'"{table}"\."{primary_key}"(?: ASC| DESC)?$', match.group(1)) is not None
+
+
+def scans(sql, sizes, min_rows):
+    """Return ``(table, plan)`` for every full scan of a table of at least ``min_rows`` rows in ``sql``."""
+    _, pattern = PLANS[connection.vendor]
+    lines = plan(sql)
+    tables = {table for line in lines for table in pattern.findall(line)
+              if sizes.get(table, 0) >= min_rows and not bounded(table, sql, lines)}
+    return [(table, lines) for table in sorted(tables)]
+
+
+def explain(min_rows=1000, only=None):
+    """Return ``{scenario: [(table, sql, plan)]}`` for the full scans each scenario's queries make."""
+    if connection.vendor not in PLANS:
+        raise ValueError(f"No EXPLAIN support for {connection.vendor}")
+    sizes = table_sizes()
+    client = Client()
+    report = {}
+    for name, (method, path, data) in scenarios().items():
+        if only and not any(name.startswith(prefix) for prefix in only):
+            continue
+        cold_caches()
+        facet_index.current()
+        prefix_index.current()
+        with CaptureQueriesContext(connection) as queries:
+            getattr(client, method)(path, data or {})
+        statements = dict.fromkeys(query["sql"] for query in queries.captured_queries
+                                   if query["sql"].lstrip().upper().startswith("SELECT"))
+        report[name] = [(table, sql, lines) for sql in statements for table, lines in scans(sql, sizes, min_rows)]
+    return report
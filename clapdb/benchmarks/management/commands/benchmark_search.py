@@ -0,0 +1,165 @@
+import json
+import random
+import statistics
+import time
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Count, FloatField, Value
+from django.db.models.functions import Lower
+from clapdb.cache import bump_generation
+from clapdb.software import facets, listing, search
+from clapdb.software.facets import facet_index
+from clapdb.software.models import Category, Developer, Feature, Software, SoftwareListing
+from clapdb.software.views import LISTING_DEPENDENCIES, match_results, search_page
+from ...catalogue import ADJECTIVES, NOUNS
+
+
+class Rollback(Exception):
+    pass
+
+
+def ordered(queryset):
+    return queryset.select_related("developer", "category")\
+        .order_by(Lower("developer__name"), "category__sequence", Lower("name"))
+
+
+def chained_joins(feature_ids):
+    """The first strategy: one join on the features table per selected feature, every match fetched."""
+    queryset = Software.objects.filter(active=True)
+    for feature_id in feature_ids:
+        queryset = queryset.filter(features=feature_id)
+    return len(list(ordered(queryset.distinct())))
+
+
+def with_all_features(feature_ids):
+    """
+    One grouped subquery over the features through table, so the cost does not grow with a join per
+    selected feature and the result needs no DISTINCT; every match fetched.
+    """
+    queryset = Software.objects.filter(active=True)
+    if feature_ids:
+        matching = Software.features.through.objects\
+            .filter(feature_id__in=feature_ids)\
+            .values("software_id")\
+            .annotate(matched=Count("feature_id"))\
+            .filter(matched=len(feature_ids))\
+            .values("software_id")
+        queryset = queryset.filter(pk__in=matching)
+    return len(list(ordered(queryset)))
+
+
+def bitmap(feature_ids=(), term=""):
+    """
+    What SearchView runs on a result cache miss: the facet index's bitmap, intersected with the search
+    backend's ranks and ordered in Python, then one query for the first page.
+    """
+    pks, ranks = match_results(facet_index.current().match(features=feature_ids), title=term)
+    list(search_page(SoftwareListing.objects.all(), pks, ranks, {}))
+    return len(pks)
+
+
+STRATEGIES = {
+    "joins": chained_joins,
+    "grouped": with_all_features,
+    "bitmap": bitmap,
+}
+
+
+def substring(term):
+    """The unindexed baseline: icontains on the title, every match ranked alike and fetched."""
+    queryset = Software.objects.filter(active=True, name__icontains=term)
+    return len(list(ordered(queryset.annotate(search_rank=Value(0.0, output_field=FloatField())))))
+
+
+def indexed(term):
+    """The configured search backend, ranked by relevance, every match fetched."""
+    return len(list(ordered(search.get_search_backend().search(Software.objects.filter(active=True), title=term))))
+
+
+TEXT_STRATEGIES = {
+    "icontains": substring,
+    "indexed": indexed,
+    "bitmap": lambda term: bitmap(term=term),
+}
+
+
+class Command(BaseCommand):
+    help = "Measure feature-filtered and ranked title search latency as the number of selected features and " \
+           "titles grows. The SQL strategies fetch every match; \"bitmap\" is SearchView's path and fetches " \
+           "the first page. The synthetic catalogue is created inside a transaction that is rolled back."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--titles", type=int, nargs="+", default=[1000, 5000, 20000])
+        parser.add_argument("--features", type=int, nargs="+", default=[1, 2, 4, 8, 12])
+        parser.add_argument("--terms", nargs="*", default=["bass", "sil", "velvet tape"],
+                            help="Title searches to time; titles are named from clapdb.benchmarks.catalogue.")
+        parser.add_argument("--repeat", type=int, default=10)
+        parser.add_argument("--density", type=float, default=0.6,
+                            help="Probability that a title has any given feature.")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--json", action="store_true", help="Emit the results as JSON.")
+
+    def handle(self, *args, **options):
+        results = []
+        for titles in options["titles"]:
+            try:
+                with transaction.atomic():
+                    feature_ids = self.populate(titles, max(options["features"]), options["density"], options["seed"])
+                    for count in options["features"]:
+                        for name, strategy in STRATEGIES.items():
+                            results.append({"titles": titles, "case": f"{count} features", "strategy": name,
+                                            **self.measure(strategy, feature_ids[:count], options["repeat"])})
+                    for term in options["terms"]:
+                        for name, strategy in TEXT_STRATEGIES.items():
+                            results.append({"titles": titles, "case": f'"{term}"', "strategy": name,
+                                            **self.measure(strategy, term, options["repeat"])})
+                    raise Rollback
+            except Rollback:
+                pass
+            finally:
+                # Retire the facet index, listing order and cached searches built from the rolled-back rows.
+                bump_generation(facets.GENERATION, *LISTING_DEPENDENCIES)
+
+        if options["json"]:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        self.stdout.write(f"{'titles':>8} {'case':>14} {'strategy':>9} {'matches':>8} {'median ms':>10} {'max ms':>8}")
+        for row in results:
+            self.stdout.write(f"{row['titles']:>8} {row['case']:>14} {row['strategy']:>9} {row['matches']:>8} "
+                              f"{row['median_ms']:>10.2f} {row['max_ms']:>8.2f}")
+
+    def populate(self, titles, features, density, seed):
+        rng = random.Random(seed)
+        category = Category.objects.create(name="Benchmark", slug="benchmark-search")
+        developers = Developer.objects.bulk_create(
+            Developer(name=f"Developer {i}", slug=f"benchmark-developer-{i}", url="https://example.com")
+            for i in range(max(1, titles // 10)))
+        feature_objects = Feature.objects.bulk_create(
+            Feature(name=f"Feature {i}", slug=f"benchmark-feature-{i}") for i in range(features))
+        software = Software.objects.bulk_create(
+            (Software(name=f"{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} {i}", developer=rng.choice(developers),
+                      category=category)
+             for i in range(titles)), batch_size=1000)
+        through = Software.features.through
+        through.objects.bulk_create(
+            (through(software_id=item.pk, feature_id=feature.pk)
+             for item in software for feature in feature_objects if rng.random() < density), batch_size=5000)
+        # bulk_create bypasses the signals that keep the search documents, listings and facet index current.
+        search.rebuild()
+        listing.rebuild()
+        bump_generation(facets.GENERATION, *LISTING_DEPENDENCIES)
+        return [feature.pk for feature in feature_objects]
+
+    @staticmethod
+    def measure(strategy, argument, repeat):
+        """Run ``strategy``, which returns the number of matches, ``repeat`` times after a warm-up run."""
+        # The first run builds the facet index and listing order, as the first search in a process does.
+        strategy(argument)
+        timings = []
+        matches = 0
+        for _ in range(repeat):
+            start = time.perf_counter()
+            matches = strategy(argument)
+            timings.append((time.perf_counter() - start) * 1000)
+        return {"matches": matches, "median_ms": statistics.median(timings), "max_ms": max(timings),
+                "vendor": connection.vendor}
@@ -0,0 +1,32 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from ... import startup
+
+
+class Command(BaseCommand):
+    help = "Measure the first request of a fresh worker process for every route, with and without the " \
+           "warm-up that config/gunicorn.py runs on boot, against the steady-state latency of the same " \
+           "route, using the catalogue in the database (see generate_catalogue)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--runs", type=int, default=3, help="Processes per scenario and mode.")
+        parser.add_argument("--repeat", type=int, default=20,
+                            help="Requests after the first one, for the steady-state latency.")
+        parser.add_argument("--only", nargs="+", help="Run only the scenarios whose names start with these.")
+        parser.add_argument("--output", help="Write the results to this JSON file.")
+
+    def handle(self, *args, **options):
+        try:
+            results = startup.run(options["runs"], options["repeat"], options["only"])
+        except ValueError as e:
+            raise CommandError(e)
+
+        self.stdout.write(f"{'scenario':<26} {'boot ms':>8} {'warm-up':>8} {'cold 1st':>9} {'warm 1st':>9} "
+                          f"{'steady':>8}")
+        for name, result in results.items():
+            self.stdout.write(f"{name:<26} {result['boot_ms']:>8.1f} {result['warm_up_ms'] or 0:>8.1f} "
+                              f"{result['cold_first_ms']:>9.2f} {result['warm_first_ms']:>9.2f} "
+                              f"{result['steady_ms']:>8.2f}")
+        if options["output"]:
+            with open(options["output"], "w") as output:
+                json.dump(results, output, indent=2)
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import setup_test_environment
+from ... import explain
+
+
+class Command(BaseCommand):
+    help = "EXPLAIN the queries of every route and a spread of searches, against the catalogue in the database " \
+           "(see generate_catalogue), and report the full table scans."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--only", nargs="+", help="Explain only the scenarios whose names start with these.")
+        parser.add_argument("--min-rows", type=int, default=1000,
+                            help="Ignore scans of tables with fewer rows than this.")
+        parser.add_argument("--fail-on-scan", action="store_true")
+
+    def handle(self, *args, **options):
+        # The test client's host must be allowed, as under the test runner.
+        setup_test_environment()
+        try:
+            report = explain.explain(options["min_rows"], options["only"])
+        except ValueError as e:
+            raise CommandError(e)
+
+        found = 0
+        for name, scans in report.items():
+            if not scans:
+                self.stdout.write(f"{name}: ok")
+                continue
+            found += len(scans)
+            for table, sql, plan in scans:
+                self.stdout.write(self.style.WARNING(f"{name}: full scan of {table}"))
+                if options["verbosity"] > 1:
+                    self.stdout.write(f"    {sql}")
+                    for line in plan:
+                        self.stdout.write(f"    | {line}")
+        if found and options["fail_on_scan"]:
+            raise CommandError(f"{found} full table scans")
@@ -0,0 +1,30 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from ...catalogue import clear, exists, generate
+
+
+class Command(BaseCommand):
+    help = "Add a synthetic catalogue of the given size (e.g. 1000, 10000 or 100000 titles) for benchmarking. " \
+           "Use a dedicated database: everything is written for real."
+
+    def add_arguments(self, parser):
+        parser.add_argument("titles", type=int)
+        parser.add_argument("--developers", type=int, help="Default: one per eight titles.")
+        parser.add_argument("--categories", type=int, default=8)
+        parser.add_argument("--features", type=int, default=12)
+        parser.add_argument("--density", type=float, default=0.25,
+                            help="Mean fraction of the features a title has.")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--clear", action="store_true",
+                            help="Delete a previously generated catalogue first.")
+
+    def handle(self, *args, **options):
+        if options["clear"]:
+            self.stdout.write(f"Deleted {clear()} generated rows.")
+        elif exists():
+            raise CommandError("A generated catalogue already exists; use --clear to replace it.")
+        start = time.perf_counter()
+        counts = generate(options["titles"], developers=options["developers"], categories=options["categories"],
+                          features=options["features"], density=options["density"], seed=options["seed"])
+        self.stdout.write(", ".join(f"{count} {name}" for name, count in counts.items()) +
+                          f" created in {time.perf_counter() - start:.1f}s.")
@@ -0,0 +1,107 @@
+import json
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.request
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+from clapdb.software.models import Category, Developer, Software
+
+
+def percentile(timings, fraction):
+    ordered = sorted(timings)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] if ordered else 0.0
+
+
+class Command(BaseCommand):
+    help = "Fire concurrent GETs at one or more running deployments and report throughput and p50/p99 " \
+           "latency per concurrency level. To compare WSGI with ASGI, start the same settings twice, e.g. " \
+           "'gunicorn config.wsgi -w 4 -b :8000' and, with CDB_ASYNC_VIEWS = True, " \
+           "'gunicorn config.asgi -w 4 -k uvicorn.workers.UvicornWorker -b :8001', then pass " \
+           "--target wsgi=http://127.0.0.1:8000 --target asgi=http://127.0.0.1:8001."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--target", action="append", required=True,
+                            help="NAME=BASE_URL of a running deployment; repeat to compare several.")
+        parser.add_argument("--path", action="append",
+                            help="Path to request, cycled through by every client. Defaults to one of each "
+                                 "read view, picked from the database this command is configured with.")
+        parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32, 64])
+        parser.add_argument("--requests", type=int, default=500, help="Requests per concurrency level.")
+        parser.add_argument("--timeout", type=float, default=30.0)
+        parser.add_argument("--json", action="store_true", help="Emit the results as JSON.")
+
+    def handle(self, *args, **options):
+        targets = []
+        for target in options["target"]:
+            name, sep, url = target.partition("=")
+            if not sep or not url:
+                raise CommandError(f"--target must be NAME=BASE_URL, not {target!r}")
+            targets.append((name, url.rstrip("/")))
+        paths = options["path"] or self.default_paths()
+
+        results = []
+        for name, url in targets:
+            for concurrency in options["concurrency"]:
+                results.append({"target": name, "concurrency": concurrency,
+                                **self.run([url + path for path in paths], concurrency, options["requests"],
+                                           options["timeout"])})
+
+        if options["json"]:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        self.stdout.write(f"{'target':>8} {'clients':>8} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'errors':>8}")
+        for row in results:
+            self.stdout.write(f"{row['target']:>8} {row['concurrency']:>8} {row['throughput']:>8.1f} "
+                              f"{row['p50_ms']:>8.1f} {row['p99_ms']:>8.1f} {row['errors']:>8}")
+
+    @staticmethod
+    def default_paths():
+        paths = [reverse("home"), reverse("developer-list"), reverse("stats"), reverse("feed")]
+        software = Software.objects.filter(active=True).values_list("pk", flat=True).first()
+        developer = Developer.objects.values_list("slug", flat=True).first()
+        category = Category.objects.values_list("slug", flat=True).first()
+        if software:
+            paths.append(reverse("software", args=[software]))
+        if developer:
+            paths.append(reverse("developer", args=[developer]))
+        if category:
+            paths.append(reverse("software-list-category", args=[category]))
+        return paths
+
+    @staticmethod
+    def run(urls, concurrency, requests, timeout):
+        timings = []
+        errors = []
+        issued = iter(range(requests))
+        lock = threading.Lock()
+
+        def client():
+            while True:
+                with lock:
+                    number = next(issued, None)
+                if number is None:
+                    return
+                start = time.perf_counter()
+                try:
+                    with urllib.request.urlopen(urls[number % len(urls)], timeout=timeout) as response:
+                        response.read()
+                except (urllib.error.URLError, OSError) as e:
+                    with lock:
+                        errors.append(str(e))
+                    continue
+                with lock:
+                    timings.append((time.perf_counter() - start) * 1000)
+
+        threads = [threading.Thread(target=client) for _ in range(concurrency)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        return {"requests": requests, "errors": len(errors), "seconds": elapsed,
+                "throughput": len(timings) / elapsed if elapsed else 0.0,
+                "p50_ms": statistics.median(timings) if timings else 0.0,
+                "p99_ms": percentile(timings, 0.99)}
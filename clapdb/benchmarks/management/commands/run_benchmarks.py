@@ -0,0 +1,45 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import setup_test_environment
+from ... import suite
+
+
+class Command(BaseCommand):
+    help = "Measure latency, query count and peak memory for every route and a spread of searches, against " \
+           "the catalogue in the database (see generate_catalogue). Write the results as JSON with --output " \
+           "and check them against an earlier run with --compare."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=5, help="Timed requests per scenario and cache state.")
+        parser.add_argument("--only", nargs="+", help="Run only the scenarios whose names start with these.")
+        parser.add_argument("--output", help="Write the results to this JSON file.")
+        parser.add_argument("--compare", help="A JSON file from an earlier run to report regressions against.")
+        parser.add_argument("--threshold", type=float, default=0.2,
+                            help="Fraction by which a timing or memory figure may grow before it is reported.")
+        parser.add_argument("--fail-on-regression", action="store_true")
+
+    def handle(self, *args, **options):
+        # The test client's host must be allowed, as under the test runner.
+        setup_test_environment()
+        try:
+            report = suite.run(options["repeat"], options["only"])
+        except ValueError as e:
+            raise CommandError(e)
+
+        self.stdout.write(f"{'scenario':<26} {'cold ms':>8} {'p95':>8} {'warm ms':>8} {'queries':>8} {'peak KiB':>9}")
+        for name, result in report["results"].items():
+            self.stdout.write(f"{name:<26} {result['cold_median_ms']:>8.2f} {result['cold_p95_ms']:>8.2f} "
+                              f"{result['warm_median_ms']:>8.2f} {result['queries']:>8} {result['peak_kib']:>9.1f}")
+        if options["output"]:
+            with open(options["output"], "w") as output:
+                json.dump(report, output, indent=2)
+
+        if options["compare"]:
+            with open(options["compare"]) as previous:
+                regressions = suite.compare(json.load(previous), report, options["threshold"])
+            for name, metric, before, after in regressions:
+                self.stdout.write(self.style.WARNING(f"{name}: {metric} {before} -> {after}"))
+            if not regressions:
+                self.stdout.write(self.style.SUCCESS("No regressions."))
+            elif options["fail_on_regression"]:
+                raise CommandError(f"{len(regressions)} regressions")
@@ -0,0 +1,50 @@
+"""
+Start-up benchmark.
+
+``run`` serves each scenario of ``suite.scenarios`` as the first request of a fresh process, once without
+and once after ``clapdb.software.warmup.warm_up``, then repeats it in the same process for the steady
+state. Each sample is a new ``startup_worker`` process, so nothing a previous request loaded is reused.
+A warm-up does its job when ``warm_first_ms`` is close to ``steady_ms``.
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+from django.conf import settings
+from .suite import scenarios
+
+WORKER = "clapdb.benchmarks.startup_worker"
+
+
+def measure(method, path, data, warm, repeat):
+    """Serve one request in a fresh process and return the worker's timings."""
+    task = {"method": method, "path": path, "data": data, "warm": warm, "repeat": repeat}
+    completed = subprocess.run([sys.executable, "-m", WORKER], input=json.dumps(task), capture_output=True,
+                               text=True, cwd=settings.BASE_DIR, env=os.environ.copy())
+    if completed.returncode:
+        raise ValueError(completed.stderr.strip().splitlines()[-1] if completed.stderr.strip()
+                         else f"{WORKER} exited with {completed.returncode}")
+    return json.loads(completed.stdout)
+
+
+def median(samples, key):
+    values = [sample[key] for sample in samples if sample[key] is not None]
+    return round(statistics.median(values), 2) if values else None
+
+
+def run(runs=3, repeat=20, only=None):
+    """Return ``{scenario: timings}`` with the median of ``runs`` processes per scenario and mode."""
+    results = {}
+    for name, (method, path, data) in scenarios().items():
+        if only and not any(name.startswith(prefix) for prefix in only):
+            continue
+        cold = [measure(method, path, data, False, repeat) for _ in range(runs)]
+        warm = [measure(method, path, data, True, repeat) for _ in range(runs)]
+        results[name] = {"method": method, "path": path,
+                         "boot_ms": median(cold + warm, "boot_ms"),
+                         "warm_up_ms": median(warm, "warm_up_ms"),
+                         "cold_first_ms": median(cold, "first_ms"),
+                         "warm_first_ms": median(warm, "first_ms"),
+                         "steady_ms": median(cold + warm, "steady_ms")}
+    return results
@@ -0,0 +1,53 @@
+"""
+One process of the start-up benchmark, run by ``startup.measure`` as
+``python -m clapdb.benchmarks.startup_worker`` with the task as JSON on stdin.
+
+The process boots the WSGI application, warms it up if the task says so, serves the task's request once
+and then ``repeat`` more times, and prints the timings as JSON. Nothing from Django is imported before
+the clock starts. The page cache is off so that every request runs the view.
+"""
+import json
+import statistics
+import sys
+import time
+
+
+def elapsed_ms(start):
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    task = json.load(sys.stdin)
+    start = time.perf_counter()
+    from django.core.wsgi import get_wsgi_application
+    get_wsgi_application()
+    result = {"boot_ms": elapsed_ms(start), "warm_up_ms": None}
+
+    if task["warm"]:
+        from clapdb.software.warmup import warm_up
+        start = time.perf_counter()
+        warm_up()
+        result["warm_up_ms"] = elapsed_ms(start)
+
+    from django.conf import settings
+    from django.test import Client
+    from django.test.utils import override_settings
+    override_settings(CDB_PAGE_CACHE={}, ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]).enable()
+    client = Client()
+    # get_wsgi_application loads the middleware at boot; the test client's handler would on its first request.
+    client.handler.load_middleware()
+
+    def request():
+        start = time.perf_counter()
+        response = getattr(client, task["method"])(task["path"], task["data"] or {})
+        if response.status_code != 200:
+            sys.exit(f"{task['method'].upper()} {task['path']} returned {response.status_code}")
+        return elapsed_ms(start)
+
+    result["first_ms"] = request()
+    result["steady_ms"] = statistics.median(request() for _ in range(task["repeat"]))
+    json.dump(result, sys.stdout)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Per-route benchmarks.
+
+``scenarios`` returns one request for every URL name in ``clapdb.software.urls``, with arguments taken
+from the catalogue in the database, plus representative SearchView submissions. ``run`` measures each:
+
+- latency (median, p95 and max in ms) with every cache cold, and again with warm caches;
+- the number of queries issued with cold caches;
+- the peak Python memory allocated while serving it with cold caches, from ``tracemalloc``.
+
+``run_benchmarks`` stores the results as JSON together with the commit and the catalogue size, and
+``compare`` lists what got worse between two such files.
+"""
+import platform
+import statistics
+import subprocess
+import time
+import tracemalloc
+import django
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.urls import get_resolver, reverse
+from django.utils import timezone as tz
+from clapdb.software.models import Category, Developer, Feature, Software
+from clapdb.software.testing import cold_caches, count_queries
+
+METRICS = ("cold_median_ms", "warm_median_ms", "queries", "peak_kib")
+
+
+def scenarios():
+    """Return ``{name: (method, path, data)}`` covering every route and a spread of searches."""
+    software = Software.objects.filter(active=True).select_related("developer").order_by("pk").first()
+    if software is None or software.developer is None:
+        raise ValueError("The benchmarks need a catalogue; see the generate_catalogue command.")
+    category = Category.objects.annotate(titles=Count("software")).order_by("-titles").first()
+    features = list(Feature.objects.annotate(titles=Count("software")).order_by("-titles")
+                    .values_list("pk", flat=True)[:2])
+    title_word = software.name.split()[0]
+    developer_prefix = software.developer.name[:4]
+
+    found = {
+        "home": ("get", reverse("home"), None),
+        "software": ("get", reverse("software", args=[software.pk]), None),
+        "developer": ("get", reverse("developer", args=[software.developer.slug]), None),
+        "developer-list": ("get", reverse("developer-list"), None),
+        "software-list-category": ("get", reverse("software-list-category", args=[category.slug]), None),
+        "stats": ("get", reverse("stats"), None),
+        "feed": ("get", reverse("feed"), None),
+        "feed-format": ("get", reverse("feed-format", args=["atom"]), None),
+        "category-feed": ("get", reverse("category-feed", args=[category.slug, "json"]), None),
+        "developer-feed": ("get", reverse("developer-feed", args=[software.developer.slug, "rss"]), None),
+        "autocomplete": ("get", reverse("autocomplete"), {"kind": "software", "q": title_word[:3]}),
+        "api-list": ("get", reverse("api-list", args=["software"]), None),
+        "api-detail": ("get", reverse("api-detail", args=["software", software.pk]), None),
+        "search": ("get", reverse("search"), None),
+        "search:title": ("post", reverse("search"), {"title": title_word}),
+        "search:developer": ("post", reverse("search"), {"developer": developer_prefix}),
+        "search:flags": ("post", reverse("search"), {"free": "on", "linux": "on"}),
+        "search:category-features": ("post", reverse("search"), {"category": category.pk, "features": features}),
+        "search:everything": ("post", reverse("search"), {"title": title_word, "developer": developer_prefix,
+                                                           "mac": "on", "features": features[:1]}),
+        "search:no-match": ("post", reverse("search"), {"title": "zzzzzz"}),
+    }
+    routes = {pattern.name for pattern in get_resolver("clapdb.software.urls").url_patterns if pattern.name}
+    missing = routes - set(found)
+    if missing:
+        raise ValueError(f"No benchmark scenario for {', '.join(sorted(missing))}")
+    return found
+
+
+def summarize(timings):
+    ordered = sorted(timings)
+    return statistics.median(ordered), ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], ordered[-1]
+
+
+def measure(client, method, path, data, repeat):
+    cold, warm = [], []
+    for _ in range(repeat):
+        cold_caches()
+        start = time.perf_counter()
+        response = getattr(client, method)(path, data or {})
+        cold.append((time.perf_counter() - start) * 1000)
+        if response.status_code != 200:
+            raise ValueError(f"{method.upper()} {path} returned {response.status_code}")
+        start = time.perf_counter()
+        getattr(client, method)(path, data or {})
+        warm.append((time.perf_counter() - start) * 1000)
+
+    _, queries = count_queries(client, path, method, data)
+
+    cold_caches()
+    tracemalloc.start()
+    try:
+        getattr(client, method)(path, data or {})
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    cold_median, cold_p95, cold_max = summarize(cold)
+    warm_median, warm_p95, warm_max = summarize(warm)
+    return {"method": method, "path": path, "cold_median_ms": round(cold_median, 2), "cold_p95_ms": round(cold_p95, 2),
+            "cold_max_ms": round(cold_max, 2), "warm_median_ms": round(warm_median, 2),
+            "warm_p95_ms": round(warm_p95, 2), "warm_max_ms": round(warm_max, 2), "queries": queries,
+            "peak_kib": round(peak / 1024, 1)}
+
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {"commit": commit, "date": tz.now().isoformat(), "vendor": connection.vendor,
+            "python": platform.python_version(), "django": django.get_version(),
+            "catalogue": {"software": Software.objects.count(), "developers": Developer.objects.count(),
+                          "categories": Category.objects.count(), "features": Feature.objects.count(),
+                          "feature_links": Software.features.through.objects.count()}}
+
+
+def run(repeat=5, only=None):
+    client = Client()
+    results = {}
+    for name, (method, path, data) in scenarios().items():
+        if only and not any(name.startswith(prefix) for prefix in only):
+            continue
+        results[name] = measure(client, method, path, data, repeat)
+    return {"environment": environment(), "results": results}
+
+
+def compare(before, after, threshold=0.1):
+    """
+    Return ``(scenario, metric, before, after)`` for each metric that grew by more than ``threshold``
+    (a fraction) between two ``run`` results; query counts count as worse on any increase.
+    """
+    regressions = []
+    for name, result in after["results"].items():
+        previous = before["results"].get(name)
+        if previous is None:
+            continue
+        for metric in METRICS:
+            limit = previous[metric] if metric == "queries" else previous[metric] * (1 + threshold)
+            if result[metric] > limit:
+                regressions.append((name, metric, previous[metric], result[metric]))
+    return regressions
@@ -0,0 +1,198 @@
+"""
+Cache helpers shared by the clapdb apps.
+
+A generation is a number stored in the default cache under a name such as ``"software"``. Writers bump
+it when the data it stands for changes; readers remember the value their copy was built from and
+rebuild when it moves. Writers in a transaction bump through ``bump_on_commit``, and refresh derived
+data after the commit too: a reader that saw the new generation before the commit would cache the old
+data under it. A missing counter is recreated from the clock, so an evicted generation never reappears
+with a value a reader has already seen.
+
+``versioned`` layers a per-process tier over the configured cache for data keyed by a generation, so a
+hit costs one shared-cache read of the counter and nothing else. ``fragment`` does the same for rendered
+HTML that depends on several generations. The ``a``-prefixed functions are their counterparts for async
+views; loaders and renderers stay synchronous and run through ``sync_to_async`` on a miss.
+
+Every bump also stamps ``LAST_WRITE_KEY`` with the time, which ``clapdb.db`` reads to keep reads on the
+primary while read replicas catch up.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.safestring import mark_safe
+
+KEY_PREFIX = "cdb:gen:"
+LAST_WRITE_KEY = "cdb:last-write"
+
+
+def _key(name):
+    return f"{KEY_PREFIX}{name}"
+
+
+def _seed():
+    return time.time_ns() // 1000
+
+
+def get_generations(*names):
+    """Return a {name: generation} dict, creating any counter that does not exist yet."""
+    keys = {_key(name): name for name in names}
+    found = cache.get_many(keys)
+    missing = {key: _seed() for key in keys if key not in found}
+    if missing:
+        cache.set_many(missing, timeout=None)
+        found.update(missing)
+    return {name: found[key] for key, name in keys.items()}
+
+
+def get_generation(name):
+    return get_generations(name)[name]
+
+
+async def aget_generations(*names):
+    keys = {_key(name): name for name in names}
+    found = await cache.aget_many(keys)
+    missing = {key: _seed() for key in keys if key not in found}
+    if missing:
+        await cache.aset_many(missing, timeout=None)
+        found.update(missing)
+    return {name: found[key] for key, name in keys.items()}
+
+
+def record_dependencies(request, generations):
+    """Note on the request which generations its response was built from, for the page cache."""
+    dependencies = getattr(request, "cache_dependencies", None)
+    if dependencies is not None:
+        dependencies.update(generations)
+
+
+def bump_generation(*names):
+    """Advance the given generations and return a {name: new generation} dict."""
+    generations = {}
+    for name in names:
+        try:
+            generations[name] = cache.incr(_key(name))
+        except ValueError:
+            generations[name] = _seed()
+            cache.set(_key(name), generations[name], timeout=None)
+    if names:
+        cache.set(LAST_WRITE_KEY, time.time(), timeout=None)
+    return generations
+
+
+def bump_on_commit(*names):
+    """``bump_generation`` once the current transaction commits, or at once outside a transaction."""
+    transaction.on_commit(lambda: bump_generation(*names))
+
+
+class LocalCache:
+    """A thread-safe, process-local LRU mapping whose entries expire after ``ttl`` seconds."""
+
+    def __init__(self, maxsize=256, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+
+    def get(self, key, default=None):
+        with self.lock:
+            try:
+                expires, value = self.entries[key]
+            except KeyError:
+                return default
+            if expires < time.monotonic():
+                del self.entries[key]
+                return default
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+local_cache = LocalCache()
+
+
+def versioned(name, loader, timeout=None):
+    """
+    Return the value produced by ``loader`` for the current ``name`` generation.
+
+    The value is looked up in the process-local tier, then in the shared cache, and only built by
+    ``loader`` when neither holds it for the current generation. Bump the generation to invalidate.
+    """
+    key = f"cdb:versioned:{name}:{get_generation(name)}"
+    value = local_cache.get(key)
+    if value is None:
+        value = cache.get(key)
+        if value is None:
+            value = loader()
+            cache.set(key, value, timeout=timeout)
+        local_cache.set(key, value)
+    return value
+
+
+async def aversioned(name, loader, timeout=None):
+    key = f"cdb:versioned:{name}:{(await aget_generations(name))[name]}"
+    value = local_cache.get(key)
+    if value is None:
+        value = await cache.aget(key)
+        if value is None:
+            value = await sync_to_async(loader)()
+            await cache.aset(key, value, timeout=timeout)
+        local_cache.set(key, value)
+    return value
+
+
+def _fragment_key(name, generations, vary):
+    parts = [str(part) for part in vary] + [f"{dep}={generations[dep]}" for dep in sorted(generations)]
+    return f"cdb:fragment:{name}:{hashlib.md5(':'.join(parts).encode()).hexdigest()}"
+
+
+def fragment(name, depends_on, render, vary=(), timeout=None, store=True):
+    """
+    Return the HTML produced by ``render`` for the current generations of ``depends_on``.
+
+    ``vary`` adds further key parts, such as a slug or a date, that select between fragments of the
+    same name. ``render`` is only called on a miss in both tiers. With ``store`` false the fragment is
+    rendered without touching the caches, for variants too many to keep.
+    """
+    if not store:
+        return mark_safe(str(render()))
+    key = _fragment_key(name, get_generations(*depends_on), vary)
+    html = local_cache.get(key)
+    if html is None:
+        html = cache.get(key)
+        if html is None:
+            html = str(render())
+            cache.set(key, html, timeout=timeout)
+        local_cache.set(key, html)
+    return mark_safe(html)
+
+
+async def afragment(name, depends_on, render, vary=(), timeout=None, store=True):
+    if not store:
+        return mark_safe(str(await sync_to_async(render)()))
+    key = _fragment_key(name, await aget_generations(*depends_on), vary)
+    html = local_cache.get(key)
+    if html is None:
+        html = await cache.aget(key)
+        if html is None:
+            html = str(await sync_to_async(render)())
+            await cache.aset(key, html, timeout=timeout)
+        local_cache.set(key, html)
+    return mark_safe(html)
@@ -0,0 +1,76 @@
+"""
+Read replicas and persistent connections.
+
+``ReplicaRouter`` sends the reads of a request to the alias in ``reading_from``, which
+``ReplicaMiddleware`` sets to one of ``CDB_READ_REPLICAS`` for the views named in ``CDB_REPLICA_VIEWS``.
+Writes, reads inside a transaction and everything else use ``default``.
+
+Replicas lag behind the primary. A page read from a replica just after a write would show the old data
+and be cached under the generations the write has already bumped, so it would stay stale until the next
+write. ``clapdb.cache.bump_generation`` therefore stamps the time of every write, and for
+``CDB_REPLICA_LAG`` seconds after it all reads go to the primary. That gives the admin who saved
+read-your-writes and keeps stale pages out of the caches for everyone else.
+
+With ``CONN_MAX_AGE`` a connection outlives its request, and the server may close it while it is idle.
+``check_connections`` runs at the start of every request and closes a reused connection that no longer
+answers, so the request opens a fresh one instead of failing. It applies to the aliases whose
+``DATABASES`` entry sets ``CONN_HEALTH_CHECKS``, the key Django 4.1 uses for the same check.
+"""
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+reading_from = ContextVar("cdb_reading_from", default=None)
+
+
+def replicas():
+    return list(getattr(settings, "CDB_READ_REPLICAS", ()))
+
+
+def choose_replica(last_write):
+    """Return a replica alias to read from, or None while the replicas may not have the last write."""
+    aliases = replicas()
+    if not aliases:
+        return None
+    if last_write is not None and time.time() - last_write < settings.CDB_REPLICA_LAG:
+        return None
+    return random.choice(aliases)
+
+
+@contextmanager
+def reading(alias):
+    """Send the reads of the block to ``alias``; None leaves them on the primary."""
+    token = reading_from.set(alias)
+    try:
+        yield
+    finally:
+        reading_from.reset(token)
+
+
+class ReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        alias = reading_from.get()
+        if alias is None or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+        return alias
+
+    def db_for_write(self, model, **hints):
+        # Objects read from a replica would otherwise be saved back to it.
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {DEFAULT_DB_ALIAS, *replicas()}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+
+def check_connections(**kwargs):
+    for connection in connections.all():
+        if (connection.connection is not None and connection.settings_dict.get("CONN_HEALTH_CHECKS")
+                and not connection.is_usable()):
+            connection.close()
@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class SnippetsConfig(AppConfig):
+    name = "clapdb.snippets"
+    label = "snippets"
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,45 @@
+"""
+Two-tier snippet cache.
+
+Snippets are looked up in a process-local LRU, then in the shared cache, and only then in the database,
+all keyed by the ``snippets`` generation that ``signals.py`` bumps whenever a Snippet is saved or deleted.
+Missing slugs are cached as ``MISSING`` so an absent snippet does not cost a query on every request.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from clapdb.cache import LocalCache, get_generation
+from .models import Snippet
+
+GENERATION = "snippets"
+MISSING = False
+
+local_cache = LocalCache(maxsize=512, ttl=getattr(settings, "CDB_SNIPPET_LOCAL_TTL", 300))
+
+
+def get_snippets(*slugs):
+    """Return a {slug: html} dict for the given slugs, with "" for slugs that have no snippet."""
+    generation = get_generation(GENERATION)
+    keys = {slug: f"cdb:snippet:{generation}:{slug}" for slug in slugs}
+    found = {}
+    for slug, key in keys.items():
+        html = local_cache.get(key)
+        if html is not None:
+            found[slug] = html
+
+    missing = {keys[slug]: slug for slug in slugs if slug not in found}
+    if missing:
+        for key, html in cache.get_many(missing).items():
+            found[missing[key]] = html
+            local_cache.set(key, html)
+
+    missing = [slug for slug in slugs if slug not in found]
+    if missing:
+        fetched = dict.fromkeys(missing, MISSING)
+        fetched.update(Snippet.objects.filter(slug__in=missing).values_list("slug", "html"))
+        cache.set_many({keys[slug]: html for slug, html in fetched.items()},
+                       timeout=getattr(settings, "CDB_SNIPPET_CACHE_TIMEOUT", None))
+        for slug, html in fetched.items():
+            local_cache.set(keys[slug], html)
+        found.update(fetched)
+
+    return {slug: html or "" for slug, html in found.items()}
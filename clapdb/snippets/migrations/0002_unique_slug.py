@@ -0,0 +1,37 @@
+# Generated by Django 4.0.5 on 2026-10-18 10:03
+
+from django.db import migrations, models
+
+
+def deduplicate_slugs(apps, schema_editor):
+    """Give every snippet after the first with a slug a free "-2", "-3", ... suffix, keeping its content."""
+    Snippet = apps.get_model("snippets", "Snippet")
+    max_length = Snippet._meta.get_field("slug").max_length
+    taken = set(Snippet.objects.values_list("slug", flat=True))
+    seen = set()
+    for snippet in Snippet.objects.order_by("pk").only("pk", "slug"):
+        if snippet.slug not in seen:
+            seen.add(snippet.slug)
+            continue
+        n = 2
+        while (slug := f"{snippet.slug[:max_length - len(str(n)) - 1]}-{n}") in taken:
+            n += 1
+        taken.add(slug)
+        seen.add(slug)
+        Snippet.objects.filter(pk=snippet.pk).update(slug=slug)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('snippets', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(deduplicate_slugs, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='snippet',
+            name='slug',
+            field=models.CharField(max_length=50, unique=True),
+        ),
+    ]
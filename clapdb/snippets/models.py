@@ -2,7 +2,7 @@ from django.db import models
 
 
 class Snippet(models.Model):
-    slug = models.CharField(max_length=50)
+    slug = models.CharField(max_length=50, unique=True)
     html = models.TextField()
 
     def __str__(self):
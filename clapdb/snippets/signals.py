@@ -0,0 +1,11 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from clapdb.cache import bump_on_commit
+from .cache import GENERATION
+from .models import Snippet
+
+
+@receiver(post_save, sender=Snippet)
+@receiver(post_delete, sender=Snippet)
+def snippet_changed(sender, **kwargs):
+    bump_on_commit(GENERATION)
@@ -1,14 +1,17 @@
 from django import template
 from django.utils.html import format_html
-from ..models import Snippet
+from ..cache import get_snippets
 
 register = template.Library()
 
 
 @register.simple_tag
 def get_snippet(slug):
-    try:
-        content = Snippet.objects.get(slug=slug).html
-    except Snippet.DoesNotExist:
-        content = ""
-    return format_html(content)
+    return format_html(get_snippets(slug)[slug])
+
+
+@register.simple_tag
+def prefetch_snippets(*slugs):
+    """Load several snippets with at most one query, so the get_snippet calls that follow hit the cache."""
+    get_snippets(*slugs)
+    return ""
@@ -1,7 +1,63 @@
+from functools import cached_property
 from django.contrib import admin
+from django.core.paginator import Paginator
+from django.db import DatabaseError, connection
 from django.db.models import ManyToManyField
-from django.forms import CheckboxSelectMultiple
+from django.forms import CheckboxSelectMultiple, ModelForm
+from django.forms.utils import ErrorDict
+from . import reference
 from .models import Developer, Category, Software, Feature
+from .reference import ReferenceChoiceField
+from .search import get_search_backend
+
+# Unfiltered changelists of tables larger than this are counted from the planner's estimate.
+ESTIMATE_ABOVE = 10000
+
+
+def estimated_count(model):
+    """Return the database's estimate of the number of rows in the model's table, or None if it has none."""
+    table = model._meta.db_table
+    try:
+        with connection.cursor() as cursor:
+            if connection.vendor == "postgresql":
+                cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass", [table])
+            elif connection.vendor == "sqlite":
+                # Written by ANALYZE; the first number of a table's stat is its row count.
+                cursor.execute("SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1", [table])
+            else:
+                return None
+            row = cursor.fetchone()
+    except DatabaseError:
+        return None
+    if row is None:
+        return None
+    estimate = int(str(row[0]).split()[0])
+    return estimate if estimate >= 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """Counts an unfiltered, large table from the planner's estimate instead of a COUNT(*) scan."""
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimated_count(queryset.model)
+            if estimate is not None and estimate > ESTIMATE_ABOVE:
+                return estimate
+        return super().count
+
+
+class ChangelistForm(ModelForm):
+    """A list_editable row that skips validation when unchanged, as the changelist saves changed rows only."""
+
+    def full_clean(self):
+        # Validating a row resolves its primary key and foreign keys, each with a query.
+        if self.is_bound and not self.has_changed():
+            self._errors = ErrorDict()
+            self.cleaned_data = {}
+            return
+        super().full_clean()
 
 
 class DeveloperAdmin(admin.ModelAdmin):
@@ -9,10 +65,13 @@ class DeveloperAdmin(admin.ModelAdmin):
     readonly_fields = ("id",)
     search_fields = ("name",)
     prepopulated_fields = {"slug": ("name",)}
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 
 class CategoryAdmin(admin.ModelAdmin):
     list_display = ("name", "sequence")
+    search_fields = ("name",)
     prepopulated_fields = {"slug": ("name",)}
 
 
@@ -25,16 +84,34 @@ class SoftwareAdmin(admin.ModelAdmin):
     list_display = ("name", "version", "developer", "category", "url", "free", "active")
     list_editable = ("category", "version", "url", "free", "active")
     list_filter = ("category", "active", "mac", "windows", "linux")
-    search_fields = ("name", "developer__name", "free")
+    list_select_related = ("developer", "category")
+    # The search box goes through the search backend; see get_search_results.
+    search_fields = ("name", "developer__name")
+    autocomplete_fields = ("developer",)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     save_as = True
     save_as_continue = False
     formfield_overrides = {
         ManyToManyField: {'widget': CheckboxSelectMultiple},
     }
 
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if db_field.name == "category":
+            # Every row of the changelist renders this select; its options come from the cached reference data.
+            kwargs.update(form_class=ReferenceChoiceField, objects=reference.categories)
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
+    def get_changelist_form(self, request, **kwargs):
+        return super().get_changelist_form(request, form=ChangelistForm, **kwargs)
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term.strip():
+            return queryset, False
+        return get_search_backend().search(queryset, text=search_term), False
 
 
 admin.site.register(Developer, DeveloperAdmin)
 admin.site.register(Category, CategoryAdmin)
 admin.site.register(Software, SoftwareAdmin)
-admin.site.register(Feature, FeatureAdmin)
\ No newline at end of file
+admin.site.register(Feature, FeatureAdmin)
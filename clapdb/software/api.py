@@ -0,0 +1,174 @@
+"""
+Read-only JSON API, version 1.
+
+``/api/v1/<resource>/`` lists a resource (``software``, ``developer``, ``category`` or ``feature``) and
+``/api/v1/<resource>/<pk>/`` returns one object. Rows are read with ``values()`` and never instantiated
+as models. Every endpoint takes:
+
+- ``fields``: a comma-separated subset of the resource's fields (default: all of them);
+- ``after`` / ``before`` and ``limit``: keyset pagination on the primary key; the response carries the
+  ``next`` and ``previous`` URLs;
+- ``format=ndjson`` (lists only): stream the whole resource as newline-delimited JSON, read in batches
+  so that memory use does not grow with the catalogue.
+
+Only active Software titles are published. Responses carry generation ETags like the HTML views. Errors
+are answered in JSON too: a malformed parameter with a 400, anything unexpected with a logged 500.
+"""
+import json
+import logging
+from functools import wraps
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils.http import urlencode
+from .conditional import conditional_page
+from .models import Category, Developer, Feature, Software
+from .pagination import INTEGER_RANGE, InvalidCursor, KeysetPaginator
+
+logger = logging.getLogger(__name__)
+
+MAX_LIMIT = 1000
+EXPORT_BATCH = 1000
+
+
+class Resource:
+    """A published model: its public field names mapped to ``values()`` paths, and its generations."""
+
+    def __init__(self, queryset, fields, dependencies):
+        self.queryset = queryset
+        self.fields = fields
+        self.dependencies = dependencies
+
+    def project(self, fields):
+        """Return a ``values()`` queryset selecting ``pk`` and the paths behind the given fields."""
+        paths = {"pk"} | {self.fields[field] for field in fields if self.fields[field] is not None}
+        return self.queryset.values(*paths)
+
+    def serialize(self, rows, fields):
+        return [{field: row[self.fields[field] or field] for field in fields} for row in rows]
+
+
+class SoftwareResource(Resource):
+    """Software, with the ids of its features (a field without a path) read in one query per page."""
+
+    def serialize(self, rows, fields):
+        rows = list(rows)
+        if "features" in fields:
+            features = {row["pk"]: [] for row in rows}
+            for software_id, feature_id in Software.features.through.objects\
+                    .filter(software_id__in=features).order_by("feature_id").values_list("software_id", "feature_id"):
+                features[software_id].append(feature_id)
+            for row in rows:
+                row["features"] = features[row["pk"]]
+        return super().serialize(rows, fields)
+
+
+RESOURCES = {
+    "software": SoftwareResource(
+        Software.objects.filter(active=True),
+        {"id": "id", "name": "name", "version": "version", "url": "url", "notes": "notes",
+         "developer": "developer_id", "developer_name": "developer__name", "category": "category_id",
+         "category_name": "category__name", "features": None, "free": "free", "mac": "mac",
+         "windows": "windows", "linux": "linux", "created": "created", "updated": "updated"},
+        ("software", "developer", "feature")),
+    "developer": Resource(
+        Developer.objects.all(),
+        {"id": "id", "name": "name", "slug": "slug", "url": "url", "notes": "notes", "created": "created",
+         "updated": "updated"},
+        ("developer",)),
+    "category": Resource(
+        Category.objects.all(),
+        {"id": "id", "name": "name", "slug": "slug", "sequence": "sequence", "notes": "notes"},
+        ("category",)),
+    "feature": Resource(
+        Feature.objects.all(),
+        {"id": "id", "name": "name", "slug": "slug", "description": "description", "sequence": "sequence"},
+        ("feature",)),
+}
+
+
+class BadRequest(ValueError):
+    pass
+
+
+def requested_fields(request, resource):
+    if not request.GET.get("fields"):
+        return list(resource.fields)
+    fields = [field.strip() for field in request.GET["fields"].split(",") if field.strip()]
+    unknown = [field for field in fields if field not in resource.fields]
+    if unknown:
+        raise BadRequest(f"Unknown fields: {', '.join(unknown)}")
+    return fields
+
+
+def requested_limit(request):
+    try:
+        limit = int(request.GET.get("limit", 100))
+    except ValueError:
+        raise BadRequest("limit must be an integer")
+    if not 0 < limit <= MAX_LIMIT:
+        raise BadRequest(f"limit must be between 1 and {MAX_LIMIT}")
+    return limit
+
+
+def page_url(request, **cursor):
+    params = {name: value for name, value in request.GET.items() if name not in ("after", "before")}
+    return f"{request.path}?{urlencode({**params, **cursor})}"
+
+
+def error(message, status=400):
+    return JsonResponse({"error": message}, status=status)
+
+
+def api_view(view):
+    """Answer conditional GETs from the resource's generations and report errors as JSON."""
+    conditional_views = {name: conditional_page(*resource.dependencies)(view)
+                         for name, resource in RESOURCES.items()}
+
+    @wraps(view)
+    def wrapper(request, resource, *args, **kwargs):
+        if resource not in conditional_views:
+            return error("No such API resource", status=404)
+        try:
+            return conditional_views[resource](request, resource, *args, **kwargs)
+        except (BadRequest, InvalidCursor) as e:
+            return error(str(e))
+        except Exception:
+            logger.exception("API request %s failed", request.get_full_path())
+            return error("Internal server error", status=500)
+    return wrapper
+
+
+def export(resource, fields):
+    paginator = KeysetPaginator(resource.project(fields), (), EXPORT_BATCH)
+    page = paginator.page()
+    while page:
+        for row in resource.serialize(page, fields):
+            yield json.dumps(row, cls=DjangoJSONEncoder) + "\n"
+        page = paginator.page(after=page.next_cursor()) if page.has_next() else ()
+
+
+@api_view
+def resource_list(request, resource):
+    resource = RESOURCES[resource]
+    fields = requested_fields(request, resource)
+    if request.GET.get("format") == "ndjson":
+        return StreamingHttpResponse(export(resource, fields), content_type="application/x-ndjson")
+    page = KeysetPaginator(resource.project(fields), (), requested_limit(request))\
+        .page(after=request.GET.get("after"), before=request.GET.get("before"))
+    return JsonResponse({
+        "results": resource.serialize(page, fields),
+        "next": page_url(request, after=page.next_cursor()) if page.has_next() else None,
+        "previous": page_url(request, before=page.previous_cursor()) if page.has_previous() else None,
+    })
+
+
+@api_view
+def resource_detail(request, resource, pk):
+    resource = RESOURCES[resource]
+    fields = requested_fields(request, resource)
+    if pk not in INTEGER_RANGE:
+        return error("Not found", status=404)
+    rows = resource.serialize(resource.project(fields).filter(pk=pk), fields)
+    if not rows:
+        return error("Not found", status=404)
+    return JsonResponse(rows[0])
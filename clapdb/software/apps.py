@@ -0,0 +1,12 @@
+from django.apps import AppConfig
+from django.core.signals import request_started
+
+
+class SoftwareConfig(AppConfig):
+    name = "clapdb.software"
+    label = "software"
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from clapdb.db import check_connections
+        request_started.connect(check_connections, dispatch_uid="cdb_check_connections")
@@ -0,0 +1,78 @@
+"""
+Async versions of the read views, routed in place of those in ``views.py`` when ``CDB_ASYNC_VIEWS`` is
+set, for deployments served through ``config/asgi.py``.
+
+Django 4.0 has no async ORM interface, so queries and template rendering run through ``sync_to_async``,
+on the thread ASGI keeps for the request. Generations, fragments and reference data are read with the
+async cache API, and loads that do not depend on each other are awaited together with ``asyncio.gather``.
+The queries and templates are the ones the synchronous views use.
+"""
+import asyncio
+from asgiref.sync import sync_to_async
+from django.http import Http404
+from django.shortcuts import get_object_or_404, render
+from django.utils import timezone as tz
+from clapdb.cache import afragment
+from clapdb.snippets.cache import get_snippets
+from . import reference, views
+from . import stats as catalogue_stats
+from .conditional import conditional_page
+from .feeds import aget_feed, feed_response
+from .models import Developer
+
+arender = sync_to_async(render)
+
+
+# The recent updates are those of the last CDB_RECENT_UPDATES_DAYS days.
+@conditional_page("software", "developer", "snippets", dated=True)
+async def home(request):
+    recent_updates, _ = await asyncio.gather(
+        afragment("recent-updates", views.LISTING_DEPENDENCIES, vary=[tz.now().date()],
+                  render=views.render_recent_updates),
+        # Warms the snippet cache for the template's get_snippet tag.
+        sync_to_async(get_snippets)("home_info"))
+    return await arender(request, "home.html", {"recent_updates": recent_updates})
+
+
+@conditional_page("software", "developer", "feature")
+async def stats(request):
+    counters, categories, features = await asyncio.gather(
+        sync_to_async(catalogue_stats.get)(), reference.acategories(), reference.afeatures())
+    return await arender(request, "software/stats.html", views.stats_context(counters, categories, features))
+
+
+@conditional_page("software:{pk}")
+async def software_detail(request, pk):
+    software = await sync_to_async(get_object_or_404)(views.software_detail_queryset(), pk=pk)
+    return await arender(request, "software/software.html",
+                         {"object": software, "software": software, "osses": ", ".join(software.osses)})
+
+
+@conditional_page("category:{slug}", "developer")
+async def category_list(request, slug):
+    category = views.category_for_slug(slug, await reference.acategories())
+    page = views.keyset_page(views.category_listing_queryset(slug), views.LISTING_ORDER, request.GET, group_by=2)
+    listing = await views.category_listing(page, slug, request.GET, cached=afragment)
+    return await arender(request, "software/software_list.html", {"category": category, "software_listing": listing})
+
+
+@conditional_page("developer:{slug}")
+async def developer_detail(request, slug):
+    developer = await sync_to_async(get_object_or_404)(Developer, slug=slug)
+    return await arender(request, "software/developer.html",
+                         {"object": developer, "developer": developer,
+                          "software_list": views.developer_software(developer)})
+
+
+@conditional_page("developer")
+async def developer_list(request):
+    page = views.keyset_page(Developer.objects.all(), views.DEVELOPER_ORDER, request.GET)
+    return await arender(request, "software/developer_list.html",
+                         {"object_list": page, "developer_list": page, "page_obj": page, "is_paginated": True})
+
+
+async def feed(request, format="rss", scope="all", slug=None):
+    entry = await aget_feed(request, format, scope, slug)
+    if entry is None:
+        raise Http404("No feed found matching the query")
+    return feed_response(request, entry)
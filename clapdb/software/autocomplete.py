@@ -0,0 +1,137 @@
+"""
+In-process prefix index for the developer and title autocomplete.
+
+Every developer name and active title is stored under each of its word starts ("Audio Damage" under
+"audio damage" and "damage"), case-folded and sorted, so a prefix query is a ``bisect`` to the first
+matching key followed by a walk over the contiguous run of matches. Results are ranked by whether the
+prefix starts the whole name, then by weight (a developer's number of active titles), then by name.
+
+Like the facet index it is rebuilt lazily whenever the shared ``autocomplete`` generation, bumped by the
+receivers in ``signals.py``, differs from the one it was built from, so answering a query never touches
+the database.
+"""
+import heapq
+import threading
+from bisect import bisect_left
+from collections import Counter
+from django.conf import settings
+from django.http import JsonResponse
+from django.utils.cache import patch_cache_control
+from clapdb.cache import LocalCache, get_generation
+from .conditional import conditional_page
+from .models import Developer, Software
+from .search import fold
+
+GENERATION = "autocomplete"
+KINDS = ("developer", "software")
+MAX_LIMIT = 50
+# Prefixes up to this length match too many names to rank per query; their answers are ranked at build time.
+SHORT_PREFIX = 2
+
+
+class PrefixIndex:
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.generation = None
+        self.keys = {kind: [] for kind in KINDS}
+        self.entries = {kind: [] for kind in KINDS}
+        self.short = {kind: {} for kind in KINDS}
+        self.results = LocalCache(maxsize=1024, ttl=60 * 60)
+
+    @staticmethod
+    def _word_starts(name):
+        words = fold(name).split()
+        return {" ".join(words[position:]) for position in range(len(words))}
+
+    def _sorted(self, items):
+        """Return (keys, entries) for ``(name, weight, value)`` items, each entered under every word start."""
+        rows = sorted((key, key == fold(name), weight, name, value)
+                      for name, weight, value in items for key in self._word_starts(name))
+        return [row[0] for row in rows], rows
+
+    @staticmethod
+    def _rank(entries, limit):
+        # A name can match at several of its word starts; keep its best-ranked one.
+        ranks = {}
+        for sort_key, whole, weight, name, value in entries:
+            rank = (not whole, -weight, name.lower(), name, value)
+            if value not in ranks or rank < ranks[value]:
+                ranks[value] = rank
+        return [{"name": name, "value": value} for *rank, name, value in heapq.nsmallest(limit, ranks.values())]
+
+    def _short(self, keys, entries):
+        """Rank the matches of every prefix of up to SHORT_PREFIX characters in one pass per length."""
+        short = {}
+        for length in range(1, SHORT_PREFIX + 1):
+            start = 0
+            while start < len(keys):
+                prefix = keys[start][:length]
+                end = bisect_left(keys, prefix + "\uffff", start)
+                short[prefix] = self._rank(entries[start:end], MAX_LIMIT)
+                start = end
+        return short
+
+    def build(self, generation=None):
+        generation = get_generation(GENERATION) if generation is None else generation
+        titles = Counter(Software.objects.filter(active=True, developer__isnull=False)
+                         .values_list("developer_id", flat=True))
+        developers = [(name, titles[pk], slug)
+                      for pk, name, slug in Developer.objects.values_list("pk", "name", "slug")]
+        software = [(name, 0, pk) for pk, name in Software.objects.filter(active=True).values_list("pk", "name")]
+        indexes = {"developer": self._sorted(developers), "software": self._sorted(software)}
+        short = {kind: self._short(keys, entries) for kind, (keys, entries) in indexes.items()}
+        with self.lock:
+            for kind, (keys, entries) in indexes.items():
+                self.keys[kind] = keys
+                self.entries[kind] = entries
+                self.short[kind] = short[kind]
+            self.results.clear()
+            self.generation = generation
+
+    def current(self):
+        """Return the index, rebuilding it first if the names have changed since it was built."""
+        generation = get_generation(GENERATION)
+        if generation != self.generation:
+            self.build(generation)
+        return self
+
+    def complete(self, kind, prefix, limit=10):
+        """
+        Return up to ``limit`` ``{"name", "value"}`` dicts for the names of ``kind`` with a word starting with
+        ``prefix``. The value is the developer's slug or the title's pk.
+        """
+        prefix = fold(prefix)
+        if not prefix:
+            return []
+        limit = min(limit, MAX_LIMIT)
+        key = (kind, prefix, limit)
+        with self.lock:
+            keys, entries, short, generation = self.keys[kind], self.entries[kind], self.short[kind], self.generation
+        if len(prefix) <= SHORT_PREFIX:
+            return short.get(prefix, [])[:limit]
+        results = self.results.get(key)
+        if results is not None and results[0] == generation:
+            return results[1]
+        start = bisect_left(keys, prefix)
+        end = bisect_left(keys, prefix + "\uffff", start)
+        matches = self._rank(entries[start:end], limit)
+        self.results.set(key, (generation, matches))
+        return matches
+
+
+prefix_index = PrefixIndex()
+
+
+@conditional_page(GENERATION)
+def autocomplete(request):
+    kind = request.GET.get("kind", "developer")
+    if kind not in KINDS:
+        return JsonResponse({"error": f"kind must be one of {', '.join(KINDS)}"}, status=400)
+    try:
+        limit = max(1, min(int(request.GET.get("limit", 10)), MAX_LIMIT))
+    except ValueError:
+        limit = 10
+    response = JsonResponse({"results": prefix_index.current().complete(kind, request.GET.get("q", ""), limit)})
+    patch_cache_control(response, public=True, max_age=settings.CDB_AUTOCOMPLETE_MAX_AGE)
+    return response
@@ -0,0 +1,126 @@
+"""
+Validators for conditional GET on the public views.
+
+HTML pages get an ETag derived from the generations of the tables they render, which costs one cache
+read and no queries, so a current client gets its 304 before any template is rendered. Pages that also
+change with the date, such as the home page's recent updates, are ``dated``: their ETag includes the day.
+The feeds carry their own validators; see ``feeds.py``.
+
+``conditional_page`` and ``depends_on`` also decorate async views, reading the generations with the
+async cache API; ``async_condition`` is the counterpart of Django's ``condition`` for those views.
+"""
+import asyncio
+import hashlib
+from calendar import timegm
+from functools import wraps
+from django.utils.cache import get_conditional_response
+from django.utils.decorators import method_decorator
+from django.utils import timezone as tz
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.http import condition
+from clapdb.cache import aget_generations, get_generations, record_dependencies
+
+# Every page renders the category navigation.
+PAGE_DEPENDENCIES = ("category",)
+
+
+def generation_etag(*names, vary_on_cookies=(), dated=False):
+    """
+    Return an etag_func for ``condition`` that changes whenever one of the named generations moves, and
+    every day if ``dated``.
+
+    Names may contain ``str.format`` fields filled from the URL kwargs, e.g. ``"software:{pk}"``. The
+    generations read are also recorded as the page's dependencies for ``PageCacheMiddleware``.
+    """
+    names = tuple(sorted(set(PAGE_DEPENDENCIES + names)))
+
+    def etag(request, *args, **kwargs):
+        generations = get_generations(*(name.format(**kwargs) for name in names))
+        return _etag(request, generations, vary_on_cookies, dated)
+
+    return etag
+
+
+def async_generation_etag(*names, vary_on_cookies=(), dated=False):
+    """``generation_etag`` for async views: the returned etag_func is a coroutine function."""
+    names = tuple(sorted(set(PAGE_DEPENDENCIES + names)))
+
+    async def etag(request, *args, **kwargs):
+        generations = await aget_generations(*(name.format(**kwargs) for name in names))
+        return _etag(request, generations, vary_on_cookies, dated)
+
+    return etag
+
+
+def _etag(request, generations, vary_on_cookies, dated):
+    record_dependencies(request, generations)
+    parts = [f"{name}={generation}" for name, generation in sorted(generations.items())]
+    parts += [f"{cookie}={request.COOKIES.get(cookie, '')}" for cookie in vary_on_cookies]
+    if dated:
+        today = tz.now().date()
+        # PageCacheMiddleware keeps the page for that day only.
+        request.cache_date = today
+        parts.append(f"date={today}")
+    return hashlib.md5(":".join(parts).encode()).hexdigest()
+
+
+def depends_on(*names):
+    """Record the named generations as dependencies of a view that has no ETag of its own."""
+    names = tuple(sorted(set(PAGE_DEPENDENCIES + names)))
+
+    def decorator(view):
+        if asyncio.iscoroutinefunction(view):
+            @wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                record_dependencies(request, await aget_generations(*(name.format(**kwargs) for name in names)))
+                return await view(request, *args, **kwargs)
+            return async_wrapper
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            record_dependencies(request, get_generations(*(name.format(**kwargs) for name in names)))
+            return view(request, *args, **kwargs)
+        return wrapper
+
+    return decorator
+
+
+def async_condition(etag_func=None, last_modified_func=None):
+    """Django's ``condition`` for async views; the validator functions are coroutine functions too."""
+    def decorator(view):
+        @wraps(view)
+        async def inner(request, *args, **kwargs):
+            etag = await etag_func(request, *args, **kwargs) if etag_func else None
+            etag = quote_etag(etag) if etag else None
+            last_modified = await last_modified_func(request, *args, **kwargs) if last_modified_func else None
+            last_modified = int(timegm(last_modified.utctimetuple())) if last_modified else None
+
+            response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            if response is None:
+                response = await view(request, *args, **kwargs)
+
+            if request.method in ("GET", "HEAD"):
+                if last_modified and not response.has_header("Last-Modified"):
+                    response.headers["Last-Modified"] = http_date(last_modified)
+                if etag:
+                    response.headers.setdefault("ETag", etag)
+            return response
+        return inner
+
+    return decorator
+
+
+def conditional_page(*names, vary_on_cookies=(), dated=False):
+    """Decorate a view so that it answers 304 while the named generations, and the date if ``dated``, are unchanged."""
+    def decorator(view):
+        if asyncio.iscoroutinefunction(view):
+            return async_condition(etag_func=async_generation_etag(*names, vary_on_cookies=vary_on_cookies,
+                                                                   dated=dated))(view)
+        return condition(etag_func=generation_etag(*names, vary_on_cookies=vary_on_cookies, dated=dated))(view)
+
+    return decorator
+
+
+def conditional_get(*names, vary_on_cookies=(), dated=False):
+    """``conditional_page`` for the ``get`` method of a class-based view."""
+    return method_decorator(conditional_page(*names, vary_on_cookies=vary_on_cookies, dated=dated), name="get")
@@ -1,7 +1,7 @@
-from .models import Category
+from . import reference
 
 
 def categories(request):
     return {
-        "categories": Category.objects.order_by("sequence")
-    }
\ No newline at end of file
+        "categories": reference.categories()
+    }
@@ -0,0 +1,116 @@
+"""
+In-process bitmap index over the search facets.
+
+Each facet (``free``, ``mac``, ``windows``, ``linux``, ``("category", pk)``, ``("feature", pk)``) is a
+Python int used as a bitset with bit ``n`` set when active Software ``pk == n`` has it. Facet filters are
+bitwise ANDs and per-facet counts are popcounts, so neither needs the database.
+
+The index is rebuilt lazily whenever the shared ``facets`` generation differs from the one it was built
+from, which keeps every worker process in step with writes made by another. The process doing the write
+applies it incrementally through ``update`` once the transaction commits.
+"""
+import threading
+from collections import defaultdict
+from django.db import transaction
+from clapdb.cache import bump_generation, get_generation
+from .models import Software
+
+FLAGS = ("free", "mac", "windows", "linux")
+GENERATION = "facets"
+
+
+def bit_ids(bitmap):
+    """Return the positions of the set bits of ``bitmap`` in ascending order."""
+    bits = bin(bitmap)[:1:-1]
+    return [position for position, bit in enumerate(bits) if bit == "1"]
+
+
+class FacetIndex:
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.generation = None
+        self.active = 0
+        self.bitmaps = defaultdict(int)
+
+    @staticmethod
+    def _rows(queryset):
+        rows = {pk: (active, category_id, flags, set()) for pk, active, category_id, *flags
+                in queryset.values_list("pk", "active", "category_id", *FLAGS)}
+        through = Software.features.through.objects.filter(software_id__in=queryset.values("pk"))
+        for software_id, feature_id in through.values_list("software_id", "feature_id"):
+            rows[software_id][3].add(feature_id)
+        return rows
+
+    def _set(self, pk, active, category_id, flags, features):
+        if not active:
+            return
+        bit = 1 << pk
+        self.active |= bit
+        for name, value in zip(FLAGS, flags):
+            if value:
+                self.bitmaps[name] |= bit
+        if category_id is not None:
+            self.bitmaps[("category", category_id)] |= bit
+        for feature_id in features:
+            self.bitmaps[("feature", feature_id)] |= bit
+
+    def build(self, generation=None):
+        generation = get_generation(GENERATION) if generation is None else generation
+        with self.lock:
+            self.active = 0
+            self.bitmaps = defaultdict(int)
+            for pk, row in self._rows(Software.objects.all()).items():
+                self._set(pk, *row)
+            self.generation = generation
+
+    def current(self):
+        """Return the index, rebuilding it first if another process has changed the catalogue."""
+        generation = get_generation(GENERATION)
+        if generation != self.generation:
+            self.build(generation)
+        return self
+
+    def update(self, software_ids):
+        """Re-read the given Software ids once the write commits, then publish the change to the other processes."""
+        software_ids = set(software_ids)
+        if software_ids:
+            transaction.on_commit(lambda: self._update(software_ids))
+
+    def _update(self, software_ids):
+        with self.lock:
+            if self.generation is not None:
+                mask = 0
+                for pk in software_ids:
+                    mask |= 1 << pk
+                self.active &= ~mask
+                for key in self.bitmaps:
+                    self.bitmaps[key] &= ~mask
+                for pk, row in self._rows(Software.objects.filter(pk__in=software_ids)).items():
+                    self._set(pk, *row)
+            generation = bump_generation(GENERATION)[GENERATION]
+            # Anything but the next number means another process published a change this index has not
+            # applied; drop the index so the next read rebuilds it.
+            if self.generation is not None:
+                self.generation = generation if generation == self.generation + 1 else None
+
+    def match(self, category=None, features=(), **flags):
+        """Return the bitmap of active titles having every selected facet."""
+        with self.lock:
+            bitmap = self.active
+            for name in FLAGS:
+                if flags.get(name):
+                    bitmap &= self.bitmaps[name]
+            if category is not None:
+                bitmap &= self.bitmaps[("category", category)]
+            for feature_id in features:
+                bitmap &= self.bitmaps[("feature", int(feature_id))]
+            return bitmap
+
+    def counts(self, bitmap):
+        """Return how many titles of ``bitmap`` carry each facet."""
+        with self.lock:
+            return {key: (bitmap & value).bit_count() for key, value in self.bitmaps.items()}
+
+
+facet_index = FacetIndex()
@@ -0,0 +1,227 @@
+"""
+Precomputed syndication feeds.
+
+A feed lists the recent updates of the whole catalogue, of one category or of one developer, as RSS 2.0,
+Atom 1.0 or JSON Feed 1.1. ``get_feed`` serializes it once for each state of the generations its scope
+depends on, and keeps the bytes, their gzip encoding, a SHA-256 ETag and the Last-Modified time in the
+process-local tier and the shared cache. A poll then costs one cache read of the generations, and a
+feed is only rebuilt after a write to a title it lists. Feeds of objects that do not exist are not
+cached.
+
+``feed_response`` serves a stored feed gzipped to clients that accept it. The two encodings are
+different representations, so each gets its own strong ETag, with ``Vary: Accept-Encoding``.
+"""
+import gzip
+import hashlib
+import json
+import re
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.urls import reverse
+from django.utils import feedgenerator
+from django.utils import timezone as tz
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.html import format_html
+from django.utils.http import http_date
+from django.utils.safestring import mark_safe
+from clapdb.cache import aget_generations, get_generations, local_cache
+from . import reference
+from .models import Developer, SoftwareListing
+
+KEY_PREFIX = "cdb:feed:"
+ACCEPTS_GZIP = re.compile(r"\bgzip\b")
+
+# The generations each scope's feed is built from; the all-titles feed also changes with the date. The
+# scoped feeds also depend on the global ``category`` generation, which signals.rebuild_all bumps after
+# writes that sent no signals.
+DEPENDENCIES = {
+    "all": ("software", "developer"),
+    "category": ("category:{slug}", "category"),
+    "developer": ("developer:{slug}", "category"),
+}
+# The build date of a feed without items, which feedgenerator would otherwise date now.
+EMPTY_FEED_DATE = tz.datetime(1970, 1, 1, tzinfo=tz.utc)
+
+
+class FormatConverter:
+    """URL converter for the feed formats."""
+    regex = "rss|atom|json"
+
+    def to_python(self, value):
+        return value
+
+    def to_url(self, value):
+        return value
+
+
+class StableDateMixin:
+    """Dates an empty feed at EMPTY_FEED_DATE, so its bytes and ETag only change with its contents."""
+
+    def latest_post_date(self):
+        return super().latest_post_date() if self.items else EMPTY_FEED_DATE
+
+
+class RssFeed(StableDateMixin, feedgenerator.Rss201rev2Feed):
+    pass
+
+
+class AtomFeed(StableDateMixin, feedgenerator.Atom1Feed):
+    pass
+
+
+class JSONFeed(feedgenerator.SyndicationFeed):
+    """JSON Feed 1.1 (https://jsonfeed.org/version/1.1) with the SyndicationFeed interface."""
+    content_type = "application/feed+json"
+
+    def write(self, outfile, encoding):
+        outfile.write(json.dumps(self.document(), ensure_ascii=False))
+
+    def document(self):
+        document = {"version": "https://jsonfeed.org/version/1.1",
+                    "title": self.feed["title"],
+                    "home_page_url": self.feed["link"],
+                    "feed_url": self.feed["feed_url"],
+                    "description": self.feed["description"],
+                    "language": self.feed["language"],
+                    "items": []}
+        for item in self.items:
+            document["items"].append({"id": item["unique_id"] or item["link"],
+                                      "url": item["link"],
+                                      "title": item["title"],
+                                      "content_html": item["description"],
+                                      "date_published": item["pubdate"].isoformat(),
+                                      "date_modified": item["updateddate"].isoformat()})
+        return document
+
+
+FORMATS = {"rss": RssFeed, "atom": AtomFeed, "json": JSONFeed}
+
+
+def feed_items(scope, slug):
+    listings = SoftwareListing.objects.filter(active=True)
+    if scope == "all":
+        listings = listings.filter(created__gte=tz.now() - tz.timedelta(days=settings.CDB_RECENT_UPDATES_DAYS))
+    elif scope == "category":
+        listings = listings.filter(developer_id__isnull=False, category_slug=slug)
+    else:
+        listings = listings.filter(developer_id=slug)
+    return listings.order_by("-created")[:settings.CDB_RECENT_UPDATES_MAX]
+
+
+def feed_info(scope, slug):
+    """Return ``(title, path, description, item filter)`` for a feed, or None if its object does not exist."""
+    if scope == "all":
+        return ("CLAPdb Recent Updates", reverse("home"), "CLAP Audio Software Database Recent Updates", slug)
+    if scope == "category":
+        category = next((category for category in reference.categories() if category.slug == slug), None)
+        if category is None:
+            return None
+        return (f"CLAPdb: {category.name}", reverse("software-list-category", args=[slug]),
+                f"Recent updates in {category.name} in the CLAP Audio Software Database", slug)
+    developer = Developer.objects.filter(slug=slug).values_list("pk", "name").first()
+    if developer is None:
+        return None
+    return (f"CLAPdb: {developer[1]}", reverse("developer", args=[slug]),
+            f"Recent updates from {developer[1]} in the CLAP Audio Software Database", developer[0])
+
+
+def item_description(item):
+    description = format_html("<p>Developer: {}</p>\n<p>Title: {}</p>\n<p>Version: {}</p>\n"
+                              "<p>URL: <a href=\"{}\">{}</a></p>",
+                              item.developer_name, item.name, item.version or "", item.url, item.url)
+    if item.notes:
+        # Notes are HTML entered in the admin, as on the Software page.
+        description += mark_safe(f"\n<p>Notes:</p>{item.notes}")
+    return description
+
+
+def build_feed(scope, slug, format, base_url):
+    """Serialize a feed and return its stored form, or None if the feed's object does not exist."""
+    info = feed_info(scope, slug)
+    if info is None:
+        return None
+    title, path, description, key = info
+    feed = FORMATS[format](title=title, link=base_url + path, description=description, language="en",
+                           feed_url=base_url + feed_path(format, scope, slug))
+    last_modified = None
+    for item in feed_items(scope, key):
+        link = base_url + reverse("software", args=[item.pk])
+        feed.add_item(title=f"{item.created:%Y-%m-%d} \N{EM DASH} {item.developer_name} {item.name}",
+                      link=link, unique_id=link, description=item_description(item),
+                      pubdate=item.created, updateddate=item.updated)
+        last_modified = max(last_modified or item.updated, item.updated)
+    content = feed.writeString("utf-8").encode()
+    return {"content": content,
+            "gzip": gzip.compress(content, mtime=0),
+            "etag": hashlib.sha256(content).hexdigest()[:40],
+            "content_type": feed.content_type,
+            "last_modified": last_modified.timestamp() if last_modified else None}
+
+
+def feed_path(format, scope="all", slug=None):
+    if scope == "all":
+        return reverse("feed") if format == "rss" else reverse("feed-format", args=[format])
+    return reverse(f"{scope}-feed", args=[slug, format])
+
+
+def _names(scope, slug):
+    return [name.format(slug=slug) for name in DEPENDENCIES[scope]]
+
+
+def _key(scope, slug, format, base_url, generations):
+    parts = [scope, slug or "", format, base_url] + [f"{name}={generations[name]}" for name in sorted(generations)]
+    if scope == "all":
+        parts.append(str(tz.now().date()))
+    return KEY_PREFIX + hashlib.md5(":".join(parts).encode()).hexdigest()
+
+
+def get_feed(request, format, scope="all", slug=None):
+    """Return the stored form of a feed, building it on a miss; None if the feed's object does not exist."""
+    base_url = f"{request.scheme}://{request.get_host()}"
+    key = _key(scope, slug, format, base_url, get_generations(*_names(scope, slug)))
+    entry = local_cache.get(key)
+    if entry is None:
+        entry = cache.get(key)
+        if entry is None:
+            entry = build_feed(scope, slug, format, base_url)
+            if entry is None:
+                return None
+            cache.set(key, entry, timeout=settings.CDB_FEED_TIMEOUT)
+        local_cache.set(key, entry)
+    return entry
+
+
+async def aget_feed(request, format, scope="all", slug=None):
+    base_url = f"{request.scheme}://{request.get_host()}"
+    key = _key(scope, slug, format, base_url, await aget_generations(*_names(scope, slug)))
+    entry = local_cache.get(key)
+    if entry is None:
+        entry = await cache.aget(key)
+        if entry is None:
+            entry = await sync_to_async(build_feed)(scope, slug, format, base_url)
+            if entry is None:
+                return None
+            await cache.aset(key, entry, timeout=settings.CDB_FEED_TIMEOUT)
+        local_cache.set(key, entry)
+    return entry
+
+
+def feed_response(request, entry):
+    """Serve a stored feed, gzipped if the client accepts it, or a 304 if the client's copy is current."""
+    gzipped = bool(ACCEPTS_GZIP.search(request.META.get("HTTP_ACCEPT_ENCODING", "")))
+    etag = f'"{entry["etag"]}{"-gzip" if gzipped else ""}"'
+    last_modified = int(entry["last_modified"]) if entry["last_modified"] is not None else None
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = HttpResponse(entry["gzip"] if gzipped else entry["content"], content_type=entry["content_type"])
+        if gzipped:
+            response["Content-Encoding"] = "gzip"
+        response["Content-Length"] = len(response.content)
+    response["ETag"] = etag
+    if last_modified is not None:
+        response["Last-Modified"] = http_date(last_modified)
+    patch_vary_headers(response, ("Accept-Encoding",))
+    patch_cache_control(response, public=True, max_age=settings.CDB_FEED_MAX_AGE)
+    return response
@@ -0,0 +1,333 @@
+"""
+Bulk import of catalogue files.
+
+A file holds one record per title, as CSV, JSON Lines or a JSON array, and is read as a stream and applied
+in batches of ``BATCH`` records. A record names its title by natural key, the developer's slug and the
+title's name, and carries any of these fields:
+
+- ``developer`` (the developer's name, required for a new developer), ``developer_slug`` (default: the
+  slugified name), ``developer_url`` and ``developer_notes``;
+- ``name`` (required), ``version``, ``url``, ``notes``, ``free``, ``mac``, ``windows``, ``linux`` and
+  ``active``;
+- ``category``, a category slug;
+- ``features``, feature slugs: a list in JSON, separated by ``;`` in CSV. They replace the title's
+  features.
+
+Fields a record leaves out are left as they are, and so are empty CSV cells; a JSON ``null`` clears a
+field. Each batch is diffed against the database with one query per table and written with
+``bulk_create``, ``bulk_update`` and batched inserts into the features through table. Everything runs in
+one transaction with the receivers in ``signals.py`` suspended, and the derived data is brought up to date
+once at the end (``CatalogueImport.invalidate``).
+"""
+import csv
+import json
+from collections import Counter
+from itertools import islice
+from django.db import DataError, transaction
+from django.utils import timezone as tz
+from django.utils.text import slugify
+from clapdb.cache import bump_on_commit
+from . import autocomplete, signals, stats
+from .models import Category, Developer, Feature, Software
+
+BATCH = 1000
+# Past this many titles a full rebuild is cheaper than refreshing them by id.
+REBUILD_THRESHOLD = 5000
+
+FORMATS = ("csv", "jsonl", "json")
+TEXT_FIELDS = ("version", "url", "notes")
+BOOLEAN_FIELDS = ("free", "mac", "windows", "linux", "active")
+TRUE = ("1", "true", "yes", "y", "on")
+FALSE = ("0", "false", "no", "n", "off")
+
+
+class CatalogueError(ValueError):
+    """A record that cannot be imported; ``record`` is its 1-based position in the file."""
+
+    def __init__(self, record, message):
+        super().__init__(f"Record {record}: {message}")
+        self.record = record
+
+
+def read_csv(stream):
+    for row in csv.DictReader(stream):
+        yield {name: value for name, value in row.items() if name and value not in ("", None)}
+
+
+def read_json_lines(stream):
+    for line in stream:
+        if line.strip():
+            yield json.loads(line)
+
+
+def read_json_array(stream, chunk_size=1 << 16):
+    """Yield the items of a JSON array one at a time, reading ``stream`` in chunks."""
+    decoder = json.JSONDecoder()
+    buffer = stream.read(chunk_size).lstrip()
+    if not buffer.startswith("["):
+        raise ValueError("A JSON catalogue must be an array of records")
+    buffer = buffer[1:]
+    while True:
+        buffer = buffer.lstrip()
+        if buffer.startswith(","):
+            buffer = buffer[1:].lstrip()
+        if buffer.startswith("]"):
+            return
+        try:
+            item, end = decoder.raw_decode(buffer)
+        except json.JSONDecodeError:
+            more = stream.read(chunk_size)
+            if not more:
+                raise
+            buffer += more
+            continue
+        yield item
+        buffer = buffer[end:]
+
+
+READERS = {"csv": read_csv, "jsonl": read_json_lines, "json": read_json_array}
+
+
+def read_records(stream, format):
+    return READERS[format](stream)
+
+
+def boolean(value):
+    if isinstance(value, bool):
+        return value
+    if str(value).strip().lower() in TRUE:
+        return True
+    if str(value).strip().lower() in FALSE:
+        return False
+    raise ValueError(f"{value!r} is not a boolean")
+
+
+class CatalogueImport:
+    """
+    Applies catalogue records to the database; ``counts`` tallies what was created and updated.
+
+    The titles are tallied by record: each creates a title, updates one or leaves it unchanged, compared
+    with the title as the records before it left it, in the database or earlier in the import. ``log`` is
+    called with a line for every change.
+    """
+
+    def __init__(self, log=None):
+        self.log = log or (lambda line: None)
+        self.categories = {}
+        for pk, slug in Category.objects.order_by("-pk").values_list("pk", "slug"):
+            self.categories[slug] = pk
+        self.features, self.feature_slugs_by_pk = {}, {}
+        for pk, slug in Feature.objects.order_by("-pk").values_list("pk", "slug"):
+            self.features[slug] = pk
+            self.feature_slugs_by_pk[pk] = slug
+        self.counts = Counter()
+        # Every title the import changes, with their counters and pages as they were before.
+        self.touched = set()
+        self.counted = Counter()
+        self.pages = set()
+
+    def run(self, records, dry_run=False):
+        """Apply ``records`` in one transaction, rolled back when ``dry_run``, and return ``counts``."""
+        records = enumerate(records, 1)
+        with signals.suspended(), transaction.atomic():
+            while batch := list(islice(records, BATCH)):
+                cleaned = [self.clean(number, record) for number, record in batch]
+                try:
+                    self.apply(cleaned)
+                except DataError as e:
+                    first, last = batch[0][0], batch[-1][0]
+                    raise CatalogueError(first, f"the database refused a value in records {first} to {last}: {e}")
+            if dry_run:
+                transaction.set_rollback(True)
+        if not dry_run:
+            self.invalidate()
+        return self.counts
+
+    def clean(self, number, record):
+        """Validate a record and return it with the developer, title and feature values split out."""
+        if not isinstance(record, dict):
+            raise CatalogueError(number, "not a record")
+        name = str(record.get("name") or "").strip()
+        if not name:
+            raise CatalogueError(number, "name is required")
+        developer_name = str(record.get("developer") or "").strip()
+        slug = str(record.get("developer_slug") or "").strip() or slugify(developer_name)
+        if not slug:
+            raise CatalogueError(number, "developer or developer_slug is required")
+
+        developer = {"name": developer_name} if developer_name else {}
+        if "developer_url" in record:
+            developer["url"] = record["developer_url"] or ""
+        if "developer_notes" in record:
+            developer["notes"] = record["developer_notes"] or None
+
+        software = {field: str(record[field]) if record[field] is not None else None
+                    for field in TEXT_FIELDS if field in record}
+        for field in BOOLEAN_FIELDS:
+            if field in record:
+                try:
+                    software[field] = boolean(record[field])
+                except ValueError as e:
+                    raise CatalogueError(number, f"{field}: {e}")
+        if "category" in record:
+            category = record["category"] or None
+            if category is not None and category not in self.categories:
+                raise CatalogueError(number, f"no category with the slug {category!r}")
+            software["category_id"] = self.categories.get(category)
+
+        # Checked here, so an overlong value is reported with its record rather than fail a whole batch.
+        for model, values in ((Developer, {"slug": slug, **developer}), (Software, {"name": name, **software})):
+            for field, value in values.items():
+                max_length = model._meta.get_field(field).max_length
+                if isinstance(value, str) and max_length and len(value) > max_length:
+                    label = field if model is Software else "developer" if field == "name" else f"developer_{field}"
+                    raise CatalogueError(number, f"{label} is longer than {max_length} characters")
+
+        cleaned = {"number": number, "developer_slug": slug, "developer": developer, "name": name,
+                   "software": software}
+        if "features" in record:
+            features = record["features"] or []
+            if isinstance(features, str):
+                features = features.split(";")
+            features = {str(feature).strip() for feature in features} - {""}
+            unknown = features - set(self.features)
+            if unknown:
+                raise CatalogueError(number, f"no features with the slugs {', '.join(sorted(unknown))}")
+            cleaned["features"] = {self.features[feature] for feature in features}
+        return cleaned
+
+    def feature_slugs(self, feature_ids):
+        return sorted(self.feature_slugs_by_pk[pk] for pk in feature_ids)
+
+    def touch(self, software_ids):
+        """Note titles about to change, keeping the counters and pages of those not seen before."""
+        software_ids = set(software_ids) - self.touched
+        if software_ids:
+            self.counted.update(stats.snapshot(software_ids))
+            self.pages |= signals.page_generations(software_ids)
+            self.touched |= software_ids
+
+    @staticmethod
+    def describe(values):
+        return ", ".join(f"{field} {value!r}" for field, value in values.items())
+
+    @staticmethod
+    def changes(instance, values):
+        return {field: value for field, value in values.items() if getattr(instance, field) != value}
+
+    def apply_developers(self, records):
+        """Create and update the developers of a batch, and return them by slug."""
+        developers = {}
+        for developer in Developer.objects.filter(slug__in={record["developer_slug"] for record in records})\
+                .order_by("-pk"):
+            developers[developer.slug] = developer
+        created, updated, fields = [], {}, set()
+        for record in records:
+            slug, values = record["developer_slug"], record["developer"]
+            developer = developers.get(slug)
+            if developer is None:
+                if "name" not in values:
+                    raise CatalogueError(record["number"], f"no developer with the slug {slug!r}; "
+                                                           f"give its name to create it")
+                developer = developers[slug] = Developer(slug=slug, **values)
+                created.append(developer)
+                self.log(f"create developer {slug}: {self.describe(values)}")
+            elif changes := self.changes(developer, values):
+                for field, value in changes.items():
+                    self.log(f"update developer {slug}: {field} {getattr(developer, field)!r} -> {value!r}")
+                    setattr(developer, field, value)
+                if developer.pk is not None:
+                    updated[developer.pk] = developer
+                    fields |= changes.keys()
+
+        if updated:
+            # The developer's columns are copied into the listings of all of its titles.
+            self.touch(Software.objects.filter(developer_id__in=updated).values_list("pk", flat=True))
+        Developer.objects.bulk_create(created)
+        now = tz.now()
+        for developer in updated.values():
+            developer.updated = now
+        Developer.objects.bulk_update(updated.values(), sorted(fields | {"updated"}))
+        self.counts["developers created"] += len(created)
+        self.counts["developers updated"] += len(updated)
+        return developers
+
+    def apply(self, records):
+        developers = self.apply_developers(records)
+        existing = {}
+        for software in Software.objects.filter(developer__in={developer.pk for developer in developers.values()},
+                                                name__in={record["name"] for record in records}).order_by("-pk"):
+            existing[(software.developer_id, software.name)] = software
+        through = Software.features.through
+        current = {}
+        for link_id, software_id, feature_id in through.objects\
+                .filter(software_id__in=[software.pk for software in existing.values()])\
+                .values_list("pk", "software_id", "feature_id"):
+            current.setdefault(software_id, {})[feature_id] = link_id
+
+        # Each record is compared with the title as the records before it in the batch left it.
+        created, updated, fields, features = [], {}, set(), {}
+        for record in records:
+            developer = developers[record["developer_slug"]]
+            key = (developer.pk, record["name"])
+            label = f"{developer.slug}/{record['name']}"
+            software = existing.get(key)
+            if software is None:
+                software = existing[key] = Software(developer=developer, name=record["name"], **record["software"])
+                created.append(software)
+                features[key] = record.get("features", set())
+                values = dict(record["software"])
+                if "features" in record:
+                    values["features"] = self.feature_slugs(record["features"])
+                self.log(f"create software {label}" + (f": {self.describe(values)}" if values else ""))
+                self.counts["software created"] += 1
+                continue
+            changes = self.changes(software, record["software"])
+            for field, value in changes.items():
+                self.log(f"update software {label}: {field} {getattr(software, field)!r} -> {value!r}")
+                setattr(software, field, value)
+            if changes and software.pk is not None:
+                updated[software.pk] = software
+                fields |= changes.keys()
+            have = features.get(key, set(current.get(software.pk, {})))
+            if "features" in record and record["features"] != have:
+                self.log(f"update software {label}: features {self.feature_slugs(have)} -> "
+                         f"{self.feature_slugs(record['features'])}")
+                features[key] = record["features"]
+                changes["features"] = record["features"]
+            self.counts["software updated" if changes else "software unchanged"] += 1
+
+        added, removed, relinked = [], [], set()
+        for key, wanted in features.items():
+            software = existing[key]
+            have = current.get(software.pk, {})
+            added.extend((software, feature_id) for feature_id in wanted - set(have))
+            removed.extend(have[feature_id] for feature_id in set(have) - wanted)
+            if software.pk is not None and wanted != set(have):
+                relinked.add(software.pk)
+
+        self.touch(set(updated) | relinked)
+        Software.objects.bulk_create(created, batch_size=BATCH)
+        now = tz.now()
+        for software in updated.values():
+            software.updated = now
+        Software.objects.bulk_update(updated.values(), sorted(fields | {"updated"}), batch_size=BATCH)
+        through.objects.filter(pk__in=removed).delete()
+        through.objects.bulk_create((through(software_id=software.pk, feature_id=feature_id)
+                                     for software, feature_id in added), batch_size=BATCH * 5)
+        self.touched |= {software.pk for software in created}
+        self.counts["feature links added"] += len(added)
+        self.counts["feature links removed"] += len(removed)
+
+    def invalidate(self):
+        """Bring the derived data and the generations up to date for everything the import changed."""
+        if len(self.touched) > REBUILD_THRESHOLD:
+            signals.rebuild_all()
+            return
+        if self.touched:
+            signals.refresh_software(self.touched, self.pages | {"software", "developer", autocomplete.GENERATION},
+                                     self.counted)
+        if self.counts["developers created"]:
+            developers = self.counts["developers created"]
+            transaction.on_commit(lambda: stats.apply({}, developers=developers))
+            bump_on_commit("developer", autocomplete.GENERATION)
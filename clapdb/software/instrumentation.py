@@ -0,0 +1,132 @@
+"""
+Per-request performance instrumentation.
+
+``InstrumentationMiddleware`` (in ``middleware.py``) opens a ``RequestMetrics`` for every request and
+collects, through the helpers here, the number and duration of database queries, the time spent rendering
+templates and the total latency. They are folded into an in-process report keyed by URL name
+(``report()``), served to staff by ``report_view``, and sent in a ``Server-Timing`` header under DEBUG and
+to logged-in staff.
+"""
+import threading
+import time
+from contextvars import ContextVar
+from functools import wraps
+from django.contrib.admin.views.decorators import staff_member_required
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import JsonResponse
+from django.template.base import Template
+
+current = ContextVar("cdb_request_metrics", default=None)
+
+
+class RequestMetrics:
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.queries = 0
+        self.db_ms = 0.0
+        self.template_ms = 0.0
+        self.template_depth = 0
+
+    @property
+    def total_ms(self):
+        return (time.perf_counter() - self.start) * 1000
+
+    def server_timing(self, total_ms):
+        return f'db;dur={self.db_ms:.1f};desc="{self.queries} queries", ' \
+               f'tpl;dur={self.template_ms:.1f}, total;dur={total_ms:.1f}'
+
+
+def query_timer(execute, sql, params, many, context):
+    """A ``connection.execute_wrapper`` that charges each query to the current request."""
+    metrics = current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.queries += 1
+        metrics.db_ms += (time.perf_counter() - start) * 1000
+
+
+def instrument_connection(sender=None, connection=None, **kwargs):
+    """Install ``query_timer`` on a connection once; it lasts for the life of the connection object."""
+    if query_timer not in connection.execute_wrappers:
+        connection.execute_wrappers.append(query_timer)
+
+
+def instrument_connections():
+    """
+    Time the queries of every connection, in whatever thread it is opened. Async views run their queries
+    through ``sync_to_async``, on connections belonging to another thread than the request's middleware.
+    """
+    connection_created.connect(instrument_connection, dispatch_uid="cdb_instrument_connection")
+    for connection in connections.all():
+        instrument_connection(connection=connection)
+
+
+_instrumented = False
+
+
+def instrument_templates():
+    """Wrap Template.render once so that top-level template renders are timed; includes are not double counted."""
+    global _instrumented
+    if _instrumented:
+        return
+    render = Template.render
+
+    @wraps(render)
+    def timed_render(self, context):
+        metrics = current.get()
+        if metrics is None:
+            return render(self, context)
+        metrics.template_depth += 1
+        start = time.perf_counter()
+        try:
+            return render(self, context)
+        finally:
+            metrics.template_depth -= 1
+            if not metrics.template_depth:
+                metrics.template_ms += (time.perf_counter() - start) * 1000
+
+    Template.render = timed_render
+    _instrumented = True
+
+
+_report = {}
+_report_lock = threading.Lock()
+
+
+def record(name, metrics, total_ms):
+    with _report_lock:
+        entry = _report.setdefault(name, {"requests": 0, "queries": 0, "max_queries": 0, "db_ms": 0.0,
+                                          "template_ms": 0.0, "total_ms": 0.0, "max_total_ms": 0.0})
+        entry["requests"] += 1
+        entry["queries"] += metrics.queries
+        entry["max_queries"] = max(entry["max_queries"], metrics.queries)
+        entry["db_ms"] += metrics.db_ms
+        entry["template_ms"] += metrics.template_ms
+        entry["total_ms"] += total_ms
+        entry["max_total_ms"] = max(entry["max_total_ms"], total_ms)
+
+
+def report():
+    """Return the per-URL-name totals and averages collected by this process."""
+    with _report_lock:
+        entries = {name: dict(entry) for name, entry in _report.items()}
+    for entry in entries.values():
+        for field in ("queries", "db_ms", "template_ms", "total_ms"):
+            entry[f"avg_{field}"] = round(entry[field] / entry["requests"], 2)
+    return entries
+
+
+def reset():
+    with _report_lock:
+        _report.clear()
+
+
+@staff_member_required
+def report_view(request):
+    return JsonResponse(report())
@@ -0,0 +1,28 @@
+import os
+import time
+from django.core.management.base import BaseCommand, CommandError
+from ...static_export import export
+
+
+class Command(BaseCommand):
+    help = "Render every public page, and a client-side search index, to static files. Only files whose " \
+           "content changed since the last export into the same directory are rewritten."
+
+    def add_arguments(self, parser):
+        parser.add_argument("output", help="Directory to export to.")
+        parser.add_argument("--base-url", default="http://localhost",
+                            help="Public scheme and host of the site, for the absolute links in the feed.")
+        parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                            help="Rendering processes (default: one per CPU).")
+        parser.add_argument("--force", action="store_true", help="Rewrite every file.")
+
+    def handle(self, *args, **options):
+        if options["workers"] < 1:
+            raise CommandError("--workers must be at least 1.")
+        start = time.perf_counter()
+        counts = export(options["output"], base_url=options["base_url"], workers=options["workers"],
+                        force=options["force"])
+        self.stdout.write(", ".join(f"{count} {name}" for name, count in counts.items()) +
+                          f" in {time.perf_counter() - start:.1f}s.")
+        if counts["failed"]:
+            raise CommandError(f"{counts['failed']} pages could not be rendered.")
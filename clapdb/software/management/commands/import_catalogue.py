@@ -0,0 +1,45 @@
+import os
+import time
+from django.core.management.base import BaseCommand, CommandError
+from ...importer import FORMATS, CatalogueError, CatalogueImport, read_records
+
+
+class Command(BaseCommand):
+    help = "Create and update Software and Developer rows from CSV, JSON Lines or JSON catalogue files, " \
+           "matched on developer slug and title name. See clapdb.software.importer for the record fields."
+
+    def add_arguments(self, parser):
+        parser.add_argument("files", nargs="+")
+        parser.add_argument("--format", choices=FORMATS,
+                            help="Default: from the file extension (.csv, .jsonl or .ndjson, .json).")
+        parser.add_argument("--dry-run", action="store_true",
+                            help="Report the changes and roll them back.")
+
+    def file_format(self, path, format):
+        if format:
+            return format
+        extension = os.path.splitext(path)[1].lower()
+        formats = {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl", ".json": "json"}
+        if extension not in formats:
+            raise CommandError(f"Cannot tell the format of {path}; use --format.")
+        return formats[extension]
+
+    def records(self, paths, format):
+        for path in paths:
+            with open(path, newline="", encoding="utf-8") as stream:
+                yield from read_records(stream, self.file_format(path, format))
+
+    def handle(self, *args, **options):
+        # A dry run is for reviewing the changes, so it lists them at the default verbosity.
+        log = self.stdout.write if options["verbosity"] > 1 or options["dry_run"] and options["verbosity"] else None
+        start = time.perf_counter()
+        try:
+            counts = CatalogueImport(log).run(self.records(options["files"], options["format"]),
+                                              dry_run=options["dry_run"])
+        except (CatalogueError, ValueError, OSError) as e:
+            raise CommandError(str(e))
+        summary = ", ".join(f"{count} {name}" for name, count in counts.items() if count) or "No changes"
+        if options["dry_run"]:
+            self.stdout.write(f"Dry run, nothing was written: {summary}.")
+        else:
+            self.stdout.write(f"{summary} in {time.perf_counter() - start:.1f}s.")
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+from ... import search
+from ...models import SearchDocument
+
+
+class Command(BaseCommand):
+    help = "Rebuild the search document of every Software title."
+
+    def handle(self, *args, **options):
+        search.rebuild()
+        self.stdout.write(f"Indexed {SearchDocument.objects.count()} titles.")
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from ... import stats
+
+
+class Command(BaseCommand):
+    help = "Recompute the materialized catalogue counters from scratch."
+
+    def handle(self, *args, **options):
+        stats.rebuild()
+        self.stdout.write(f"Rebuilt {len(stats.get())} counters.")
@@ -0,0 +1,48 @@
+import sqlite3
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+from clapdb import db
+
+
+class Command(BaseCommand):
+    help = "Copy the default database over every alias in CDB_READ_REPLICAS, to try replica routing " \
+           "locally with two SQLite or two PostgreSQL databases. Production replicas are kept up to date " \
+           "by the database's own replication instead."
+
+    def handle(self, *args, **options):
+        aliases = db.replicas()
+        if not aliases:
+            raise CommandError("CDB_READ_REPLICAS is empty")
+        primary = connections[DEFAULT_DB_ALIAS]
+        for alias in aliases:
+            replica = connections[alias]
+            if replica.vendor != primary.vendor:
+                raise CommandError(f"{alias} is {replica.vendor}, the default database is {primary.vendor}")
+            if primary.vendor == "sqlite":
+                self.copy_sqlite(primary, replica)
+            elif primary.vendor == "postgresql":
+                self.copy_postgresql(primary, replica)
+            else:
+                raise CommandError(f"Cannot copy a {primary.vendor} database")
+            self.stdout.write(f"Copied {DEFAULT_DB_ALIAS} to {alias}.")
+
+    @staticmethod
+    def copy_sqlite(primary, replica):
+        replica.close()
+        primary.ensure_connection()
+        target = sqlite3.connect(replica.settings_dict["NAME"])
+        try:
+            primary.connection.backup(target)
+        finally:
+            target.close()
+
+    @staticmethod
+    def copy_postgresql(primary, replica):
+        # A database is copied as a template, which must have no other sessions.
+        primary.close()
+        replica.close()
+        quote = primary.ops.quote_name
+        with replica._nodb_cursor() as cursor:
+            cursor.execute(f"DROP DATABASE IF EXISTS {quote(replica.settings_dict['NAME'])}")
+            cursor.execute(f"CREATE DATABASE {quote(replica.settings_dict['NAME'])} "
+                           f"TEMPLATE {quote(primary.settings_dict['NAME'])}")
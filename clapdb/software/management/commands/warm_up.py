@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from ... import warmup
+
+
+class Command(BaseCommand):
+    help = "Preload the URL resolvers, templates, database connection and reference caches, as every " \
+           "gunicorn worker does on boot (see config/gunicorn.py). Run after a deploy to fill the shared " \
+           "cache before the workers start."
+
+    def handle(self, *args, **options):
+        for step, ms in warmup.warm_up().items():
+            if ms is None:
+                self.stdout.write(self.style.WARNING(f"{step:<10} skipped, the database is unreachable"))
+            else:
+                self.stdout.write(f"{step:<10} {ms:8.1f} ms")
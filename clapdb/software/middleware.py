@@ -0,0 +1,241 @@
+"""
+Request middleware for the public site.
+
+PageCacheMiddleware: full-page cache for anonymous reads.
+
+``settings.CDB_PAGE_CACHE`` maps URL names to cache timeouts; only those routes are cached, and only for
+GET/HEAD requests without a session or messages cookie, so the search POST and the admin always reach
+Django. A page is stored together with the generations it was built from (see
+``clapdb.cache.record_dependencies``) and served only while all of them are unchanged, so a write to any
+object a page depends on invalidates exactly the pages showing it. A page whose view is ``dated`` (see
+``conditional.py``) is also only served on the day it was built, and expires at midnight.
+
+The middleware sits just below SecurityMiddleware: a hit is answered before sessions, CSRF,
+authentication or the view run, with no database access at all.
+
+InstrumentationMiddleware: query, template and latency metrics per request (see ``instrumentation.py``).
+They go into the in-process report for every request, but into a ``Server-Timing`` header only under
+DEBUG or for logged-in staff: the timings would tell anyone else about the backend.
+
+ReplicaMiddleware: serves the views named in ``settings.CDB_REPLICA_VIEWS`` from a read replica (see
+``clapdb.db``). It sits below PageCacheMiddleware, so a page cache hit does not look up the last write.
+
+All three support sync and async request paths, so under ASGI a page cache hit or a 304 is answered without
+leaving the event loop for a worker thread.
+"""
+import asyncio
+import datetime
+import hashlib
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.urls import Resolver404, resolve
+from django.utils import timezone as tz
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import parse_http_date_safe
+from clapdb import db
+from clapdb.cache import LAST_WRITE_KEY, aget_generations, get_generations
+from . import instrumentation
+
+# Entries are (dependencies, response, date); v2 keeps the two-item entries of older releases out.
+KEY_PREFIX = "cdb:page:v2:"
+
+
+class AsyncCapableMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(self.get_response):
+            # Mark the instance as a coroutine function, as Django's MiddlewareMixin does.
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        return self.handle(request)
+
+
+class PageCacheMiddleware(AsyncCapableMiddleware):
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.policies = getattr(settings, "CDB_PAGE_CACHE", {})
+        self.bypass_cookies = (settings.SESSION_COOKIE_NAME, getattr(settings, "MESSAGE_COOKIE_NAME", "messages"))
+
+    def handle(self, request):
+        timeout = self.policy(request)
+        if timeout is None:
+            return self.get_response(request)
+
+        key = self.key(request)
+        entry = cache.get(key)
+        if entry is not None:
+            dependencies, response, date = entry
+            if self.current(date) and get_generations(*dependencies) == dependencies:
+                return self.cached_response(request, response)
+
+        request.cache_dependencies = {}
+        request.cache_date = None
+        response = self.get_response(request)
+        if self.storable(request, response):
+            cache.set(key, (request.cache_dependencies, response, request.cache_date),
+                      self.timeout(request, timeout))
+        return response
+
+    async def __acall__(self, request):
+        timeout = self.policy(request)
+        if timeout is None:
+            return await self.get_response(request)
+
+        key = self.key(request)
+        entry = await cache.aget(key)
+        if entry is not None:
+            dependencies, response, date = entry
+            if self.current(date) and await aget_generations(*dependencies) == dependencies:
+                return self.cached_response(request, response)
+
+        request.cache_dependencies = {}
+        request.cache_date = None
+        response = await self.get_response(request)
+        if self.storable(request, response):
+            await cache.aset(key, (request.cache_dependencies, response, request.cache_date),
+                             self.timeout(request, timeout))
+        return response
+
+    @staticmethod
+    def key(request):
+        return KEY_PREFIX + hashlib.md5(request.get_full_path().encode()).hexdigest()
+
+    @staticmethod
+    def current(date):
+        return date is None or date == tz.now().date()
+
+    @staticmethod
+    def timeout(request, timeout):
+        """Cap the timeout of a dated page at the end of its day."""
+        if request.cache_date is None:
+            return timeout
+        now = tz.now()
+        midnight = datetime.datetime.combine(request.cache_date + datetime.timedelta(days=1), datetime.time.min,
+                                             tzinfo=now.tzinfo)
+        return max(1, min(timeout, int((midnight - now).total_seconds()) + 1))
+
+    @staticmethod
+    def cached_response(request, response):
+        return get_conditional_response(
+            request,
+            etag=response.get("ETag"),
+            last_modified=parse_http_date_safe(response.get("Last-Modified", "")),
+            response=response,
+        )
+
+    def policy(self, request):
+        """Return the cache timeout for the request, or None when it must not be cached."""
+        if request.method not in ("GET", "HEAD"):
+            return None
+        if any(cookie in request.COOKIES for cookie in self.bypass_cookies):
+            return None
+        try:
+            match = resolve(request.path_info)
+        except Resolver404:
+            return None
+        return self.policies.get(match.url_name)
+
+    @staticmethod
+    def storable(request, response):
+        # Pages that declared no dependencies could never be invalidated, so they are not stored.
+        return (request.cache_dependencies
+                and response.status_code == 200
+                and not response.streaming
+                and not response.cookies
+                and "private" not in response.get("Cache-Control", "")
+                and "no-store" not in response.get("Cache-Control", ""))
+
+
+class InstrumentationMiddleware(AsyncCapableMiddleware):
+    """Feeds the per-URL-name report, and adds a Server-Timing header to the responses staff may see."""
+
+    def __init__(self, get_response):
+        if not getattr(settings, "CDB_INSTRUMENTATION", True):
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+        instrumentation.instrument_connections()
+        instrumentation.instrument_templates()
+
+    def handle(self, request):
+        metrics = instrumentation.RequestMetrics()
+        token = instrumentation.current.set(metrics)
+        try:
+            response = self.get_response(request)
+        finally:
+            instrumentation.current.reset(token)
+        return self.finish(request, response, metrics, self.for_staff(request))
+
+    async def __acall__(self, request):
+        # The context variable is copied into the threads sync_to_async runs the view's queries in.
+        metrics = instrumentation.RequestMetrics()
+        token = instrumentation.current.set(metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            instrumentation.current.reset(token)
+        # Looking the user up may query the database; a request without a session cookie cannot be staff.
+        for_staff = settings.SESSION_COOKIE_NAME in request.COOKIES and await sync_to_async(self.for_staff)(request)
+        return self.finish(request, response, metrics, for_staff)
+
+    @staticmethod
+    def for_staff(request):
+        """Return whether the request comes from logged-in staff."""
+        user = getattr(request, "user", None)
+        return settings.SESSION_COOKIE_NAME in request.COOKIES and user is not None and user.is_staff
+
+    def finish(self, request, response, metrics, for_staff):
+        total_ms = metrics.total_ms
+        if settings.DEBUG or for_staff:
+            response["Server-Timing"] = metrics.server_timing(total_ms)
+            if for_staff:
+                # Kept out of shared caches, which would pass the header on to everyone.
+                patch_cache_control(response, private=True)
+        instrumentation.record(self.url_name(request), metrics, total_ms)
+        return response
+
+    @staticmethod
+    def url_name(request):
+        match = getattr(request, "resolver_match", None)
+        if match is None:
+            try:
+                match = resolve(request.path_info)
+            except Resolver404:
+                return "(unresolved)"
+        return match.url_name or match.view_name
+
+
+class ReplicaMiddleware(AsyncCapableMiddleware):
+    """Sends the reads of the replica views to a read replica, unless the last write is too recent."""
+
+    def __init__(self, get_response):
+        if not db.replicas():
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+        self.views = set(settings.CDB_REPLICA_VIEWS)
+
+    def handle(self, request):
+        alias = db.choose_replica(cache.get(LAST_WRITE_KEY)) if self.routed(request) else None
+        with db.reading(alias):
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        # The context variable is copied into the threads sync_to_async runs the view's queries in.
+        alias = db.choose_replica(await cache.aget(LAST_WRITE_KEY)) if self.routed(request) else None
+        with db.reading(alias):
+            return await self.get_response(request)
+
+    def routed(self, request):
+        try:
+            match = resolve(request.path_info)
+        except Resolver404:
+            return False
+        return match.url_name in self.views
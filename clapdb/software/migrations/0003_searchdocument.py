@@ -0,0 +1,93 @@
+from django.db import migrations, models
+import django.db.models.deletion
+from django.utils.html import strip_tags
+
+FTS_TABLE = "software_searchdocument_fts"
+
+POSTGRESQL_FORWARD = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX software_searchdocument_name_trgm ON software_searchdocument USING gin (name gin_trgm_ops)",
+    "CREATE INDEX software_searchdocument_developer_trgm ON software_searchdocument USING gin (developer gin_trgm_ops)",
+    "CREATE INDEX software_searchdocument_body_trgm ON software_searchdocument USING gin (body gin_trgm_ops)",
+]
+
+SQLITE_FORWARD = [
+    f"""CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+        name, developer, body, content='software_searchdocument', content_rowid='software_id', tokenize='trigram')""",
+    f"""CREATE TRIGGER software_searchdocument_ai AFTER INSERT ON software_searchdocument BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, name, developer, body)
+        VALUES (new.software_id, new.name, new.developer, new.body);
+    END""",
+    f"""CREATE TRIGGER software_searchdocument_ad AFTER DELETE ON software_searchdocument BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, developer, body)
+        VALUES ('delete', old.software_id, old.name, old.developer, old.body);
+    END""",
+    f"""CREATE TRIGGER software_searchdocument_au AFTER UPDATE ON software_searchdocument BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, developer, body)
+        VALUES ('delete', old.software_id, old.name, old.developer, old.body);
+        INSERT INTO {FTS_TABLE}(rowid, name, developer, body)
+        VALUES (new.software_id, new.name, new.developer, new.body);
+    END""",
+]
+
+SQLITE_BACKWARD = [
+    "DROP TRIGGER IF EXISTS software_searchdocument_ai",
+    "DROP TRIGGER IF EXISTS software_searchdocument_ad",
+    "DROP TRIGGER IF EXISTS software_searchdocument_au",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+
+
+def create_index(apps, schema_editor):
+    statements = {"postgresql": POSTGRESQL_FORWARD, "sqlite": SQLITE_FORWARD}
+    for sql in statements.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(sql)
+
+
+def drop_index(apps, schema_editor):
+    # The PostgreSQL indexes go with the table.
+    if schema_editor.connection.vendor == "sqlite":
+        for sql in SQLITE_BACKWARD:
+            schema_editor.execute(sql)
+
+
+def fold(text):
+    return " ".join(strip_tags(text or "").lower().split())
+
+
+def populate(apps, schema_editor):
+    Software = apps.get_model("software", "Software")
+    SearchDocument = apps.get_model("software", "SearchDocument")
+    documents = []
+    for software in Software.objects.select_related("developer", "category").prefetch_related("features"):
+        developer = software.developer.name if software.developer else ""
+        category = software.category.name if software.category else ""
+        features = " ".join(feature.name for feature in software.features.all())
+        documents.append(SearchDocument(
+            software_id=software.pk,
+            name=fold(software.name),
+            developer=fold(developer),
+            body=fold(" ".join([software.name, developer, category, features, software.notes or ""])),
+        ))
+    SearchDocument.objects.bulk_create(documents, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('software', '0002_feature_software_features'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('software', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_document', serialize=False, to='software.software')),
+                ('name', models.CharField(max_length=50)),
+                ('developer', models.CharField(max_length=50)),
+                ('body', models.TextField()),
+            ],
+        ),
+        migrations.RunPython(create_index, drop_index),
+        migrations.RunPython(populate, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 4.0.5 on 2026-10-18 10:06
+
+from collections import Counter
+from django.db import migrations, models
+
+
+def populate(apps, schema_editor):
+    Software = apps.get_model("software", "Software")
+    Developer = apps.get_model("software", "Developer")
+    CatalogueStats = apps.get_model("software", "CatalogueStats")
+    counters = Counter(developers=Developer.objects.count())
+    active_ids = set()
+    for software in Software.objects.all():
+        counters["software"] += 1
+        counters["active" if software.active else "inactive"] += 1
+        if not software.active:
+            continue
+        active_ids.add(software.pk)
+        counters["free" if software.free else "paid"] += 1
+        counters[f"category:{'none' if software.category_id is None else software.category_id}"] += 1
+        for name in ("mac", "windows", "linux"):
+            if getattr(software, name):
+                counters[f"os:{name}"] += 1
+    for software_id, feature_id in Software.features.through.objects.values_list("software_id", "feature_id"):
+        if software_id in active_ids:
+            counters[f"feature:{feature_id}"] += 1
+    CatalogueStats.objects.create(pk=1, counters={name: value for name, value in counters.items() if value})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('software', '0003_searchdocument'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogueStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('counters', models.JSONField(default=dict)),
+                ('updated', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Catalogue stats',
+            },
+        ),
+        migrations.RunPython(populate, migrations.RunPython.noop),
+    ]
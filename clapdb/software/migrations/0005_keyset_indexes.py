@@ -0,0 +1,23 @@
+# Generated by Django 4.0.5 on 2026-10-18 10:11
+
+from django.db import migrations, models
+import django.db.models.expressions
+import django.db.models.functions.text
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('software', '0004_cataloguestats'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='developer',
+            index=models.Index(django.db.models.functions.text.Lower('name'), django.db.models.expressions.F('id'), name='developer_lower_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='software',
+            index=models.Index(django.db.models.expressions.F('developer'), django.db.models.functions.text.Lower('name'), django.db.models.expressions.F('id'), name='software_dev_lower_name_idx'),
+        ),
+    ]
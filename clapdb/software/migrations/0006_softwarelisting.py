@@ -0,0 +1,88 @@
+# Generated by Django 4.0.5 on 2026-10-18 10:23
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.db.models.expressions
+import django.db.models.functions.text
+
+PLATFORMS = (("mac", "Mac"), ("windows", "Windows"), ("linux", "Linux"))
+
+
+def populate(apps, schema_editor):
+    Software = apps.get_model("software", "Software")
+    SoftwareListing = apps.get_model("software", "SoftwareListing")
+    listings = []
+    for software in Software.objects.select_related("developer", "category").prefetch_related("features"):
+        developer = software.developer
+        category = software.category
+        listings.append(SoftwareListing(
+            software_id=software.pk,
+            name=software.name,
+            version=software.version,
+            url=software.url,
+            notes=software.notes,
+            free=software.free,
+            active=software.active,
+            platforms=", ".join(label for name, label in PLATFORMS if getattr(software, name)),
+            feature_ids=sorted(feature.pk for feature in software.features.all()),
+            created=software.created,
+            updated=software.updated,
+            developer_id=developer.pk if developer else None,
+            developer_name=developer.name if developer else None,
+            developer_slug=developer.slug if developer else None,
+            developer_url=developer.url if developer else None,
+            developer_notes=developer.notes if developer else None,
+            category_id=category.pk if category else None,
+            category_name=category.name if category else None,
+            category_slug=category.slug if category else None,
+            category_sequence=category.sequence if category else None,
+        ))
+    SoftwareListing.objects.bulk_create(listings, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('software', '0005_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SoftwareListing',
+            fields=[
+                ('software', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='listing', serialize=False, to='software.software')),
+                ('name', models.CharField(max_length=50)),
+                ('version', models.CharField(blank=True, max_length=20, null=True)),
+                ('url', models.URLField(blank=True, null=True)),
+                ('notes', models.TextField(blank=True, null=True)),
+                ('free', models.BooleanField(default=False)),
+                ('active', models.BooleanField(default=True)),
+                ('platforms', models.CharField(blank=True, max_length=30)),
+                ('feature_ids', models.JSONField(default=list)),
+                ('created', models.DateTimeField()),
+                ('updated', models.DateTimeField()),
+                ('developer_id', models.IntegerField(blank=True, null=True)),
+                ('developer_name', models.CharField(blank=True, max_length=50, null=True)),
+                ('developer_slug', models.SlugField(blank=True, db_index=False, null=True)),
+                ('developer_url', models.URLField(blank=True, null=True)),
+                ('developer_notes', models.TextField(blank=True, null=True)),
+                ('category_id', models.IntegerField(blank=True, null=True)),
+                ('category_name', models.CharField(blank=True, max_length=30, null=True)),
+                ('category_slug', models.SlugField(blank=True, db_index=False, max_length=30, null=True)),
+                ('category_sequence', models.IntegerField(blank=True, null=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='softwarelisting',
+            index=models.Index(django.db.models.expressions.F('category_slug'), django.db.models.functions.text.Lower('developer_name'), django.db.models.expressions.F('developer_id'), django.db.models.functions.text.Lower('name'), django.db.models.expressions.F('software'), condition=models.Q(('active', True)), name='listing_category_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='softwarelisting',
+            index=models.Index(fields=['developer_id', 'category_sequence', 'category_name', 'category_id', 'name'], name='listing_developer_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='softwarelisting',
+            index=models.Index(fields=['-created'], name='listing_created_idx'),
+        ),
+        migrations.RunPython(populate, migrations.RunPython.noop),
+    ]
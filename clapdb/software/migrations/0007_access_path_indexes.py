@@ -0,0 +1,59 @@
+# Generated by Django 4.0.5 on 2026-10-18 10:36
+
+from django.db import migrations, models
+
+
+def deduplicate_slugs(apps, schema_editor):
+    """Give every category and developer after the first with a slug a free "-2", "-3", ... suffix."""
+    for model_name in ("Category", "Developer"):
+        model = apps.get_model("software", model_name)
+        max_length = model._meta.get_field("slug").max_length
+        taken = set(model.objects.values_list("slug", flat=True))
+        seen = set()
+        for obj in model.objects.order_by("pk").only("pk", "slug"):
+            if obj.slug not in seen:
+                seen.add(obj.slug)
+                continue
+            n = 2
+            while (slug := f"{obj.slug[:max_length - len(str(n)) - 1]}-{n}") in taken:
+                n += 1
+            taken.add(slug)
+            seen.add(slug)
+            model.objects.filter(pk=obj.pk).update(slug=slug)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('software', '0006_softwarelisting'),
+    ]
+
+    operations = [
+        migrations.RunPython(deduplicate_slugs, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='softwarelisting',
+            name='listing_created_idx',
+        ),
+        migrations.AlterField(
+            model_name='category',
+            name='slug',
+            field=models.SlugField(max_length=30, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='developer',
+            name='slug',
+            field=models.SlugField(unique=True),
+        ),
+        migrations.AddIndex(
+            model_name='developer',
+            index=models.Index(fields=['name', 'id'], name='developer_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='software',
+            index=models.Index(fields=['name', 'id'], name='software_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='softwarelisting',
+            index=models.Index(condition=models.Q(('active', True)), fields=['-created'], name='listing_active_created_idx'),
+        ),
+    ]
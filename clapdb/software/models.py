@@ -1,11 +1,12 @@
 from datetime import datetime
 from django.db import models
+from django.db.models.functions import Lower
 from django.urls import reverse
 
 
 class Category(models.Model):
     name = models.CharField(max_length=30)
-    slug = models.SlugField(max_length=30)
+    slug = models.SlugField(max_length=30, unique=True)
     sequence = models.IntegerField(blank=True, null=True)
     notes = models.TextField(blank=True, null=True)
 
@@ -22,7 +23,7 @@ class Category(models.Model):
 
 class Developer(models.Model):
     name = models.CharField(max_length=50)
-    slug = models.SlugField(max_length=50)
+    slug = models.SlugField(max_length=50, unique=True)
     url = models.URLField()
     notes = models.TextField(blank=True, null=True)
     created = models.DateTimeField(auto_now_add=True)
@@ -33,6 +34,11 @@ class Developer(models.Model):
 
     class Meta:
         ordering = ["name"]
+        indexes = [
+            models.Index(Lower("name"), "id", name="developer_lower_name_idx"),
+            # The admin changelist's default order.
+            models.Index(fields=["name", "id"], name="developer_name_idx"),
+        ]
 
 
 class Feature(models.Model):
@@ -81,3 +87,74 @@ class Software(models.Model):
     class Meta:
         ordering = ["name"]
         verbose_name_plural = "Software"
+        indexes = [
+            # Keyset pagination walks developers by lower(name), then each developer's titles by lower(name).
+            models.Index("developer", Lower("name"), "id", name="software_dev_lower_name_idx"),
+            # The admin changelist's default order.
+            models.Index(fields=["name", "id"], name="software_name_idx"),
+        ]
+
+
+class SearchDocument(models.Model):
+    """Case-folded search text for a Software title, maintained by signals.
+
+    The table carries trigram indexes on PostgreSQL and an FTS5 shadow table on
+    SQLite (see migration 0003); query it through ``clapdb.software.search``.
+    """
+    software = models.OneToOneField(Software, primary_key=True, on_delete=models.CASCADE,
+                                    related_name="search_document")
+    name = models.CharField(max_length=50)
+    developer = models.CharField(max_length=50)
+    body = models.TextField()
+
+    def __str__(self):
+        return self.name
+
+
+class SoftwareListing(models.Model):
+    """A Software title flattened with its developer, category, platforms and features, maintained by signals.
+
+    The listing pages read this table alone; see ``clapdb.software.listing``.
+    """
+    software = models.OneToOneField(Software, primary_key=True, on_delete=models.CASCADE, related_name="listing")
+    name = models.CharField(max_length=50)
+    version = models.CharField(max_length=20, blank=True, null=True)
+    url = models.URLField(blank=True, null=True)
+    notes = models.TextField(blank=True, null=True)
+    free = models.BooleanField(default=False)
+    active = models.BooleanField(default=True)
+    platforms = models.CharField(max_length=30, blank=True)
+    feature_ids = models.JSONField(default=list)
+    created = models.DateTimeField()
+    updated = models.DateTimeField()
+    developer_id = models.IntegerField(blank=True, null=True)
+    developer_name = models.CharField(max_length=50, blank=True, null=True)
+    developer_slug = models.SlugField(max_length=50, blank=True, null=True, db_index=False)
+    developer_url = models.URLField(blank=True, null=True)
+    developer_notes = models.TextField(blank=True, null=True)
+    category_id = models.IntegerField(blank=True, null=True)
+    category_name = models.CharField(max_length=30, blank=True, null=True)
+    category_slug = models.SlugField(max_length=30, blank=True, null=True, db_index=False)
+    category_sequence = models.IntegerField(blank=True, null=True)
+
+    def __str__(self):
+        return self.name
+
+    class Meta:
+        indexes = [
+            # A category page walks its developers by lower(name), then each one's titles by lower(name).
+            models.Index("category_slug", Lower("developer_name"), "developer_id", Lower("name"), "software",
+                         name="listing_category_idx", condition=models.Q(active=True)),
+            models.Index(fields=["developer_id", "category_sequence", "category_name", "category_id", "name"],
+                         name="listing_developer_idx"),
+            models.Index(fields=["-created"], name="listing_active_created_idx", condition=models.Q(active=True)),
+        ]
+
+
+class CatalogueStats(models.Model):
+    """Catalogue counters kept in a single row (pk=1), maintained incrementally by ``clapdb.software.stats``."""
+    counters = models.JSONField(default=dict)
+    updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = "Catalogue stats"
@@ -0,0 +1,279 @@
+"""
+Keyset (cursor) pagination for the catalogue listings.
+
+A page is addressed by the sort key of the row next to it rather than by an offset, so every page is a
+single indexed range scan of ``per_page + 1`` rows, whether it is the first or the two hundredth. The
+cursor is the key of a boundary row, passed as ``after`` (the last row of the previous page) or ``before``
+(the first row of the next page) and encoded as URL-safe base64 JSON. A cursor is checked against the
+types of the keys before it reaches a query, so a crafted one is an ``InvalidCursor`` and never a
+database error.
+
+The leading ``group_by`` keys identify the group that ``{% regroup %}`` builds the listing from (the
+developer), and a page knows whether its first group started on the page before (``continued``) and
+whether its last one carries on (``continues``), so a group split by a page boundary renders as one.
+
+``OrderedKeysetPaginator`` pages through an order computed once and cached as a list of primary keys,
+fetching each page by primary key. Its cursors are the same as ``KeysetPaginator``'s, so a client can
+move between the two.
+"""
+import base64
+import binascii
+import json
+import math
+from functools import cached_property
+from django.core.exceptions import FieldDoesNotExist, FieldError
+from django.core.paginator import InvalidPage
+from django.db.models import Q
+
+INTEGER = (int,)
+NUMBER = (int, float)
+STRING = (str,)
+# The JSON types a cursor may hold for a key, by the internal type of the field the key sorts on.
+CURSOR_TYPES = {
+    **dict.fromkeys(("AutoField", "BigAutoField", "SmallAutoField", "IntegerField", "BigIntegerField",
+                     "SmallIntegerField", "PositiveIntegerField", "PositiveBigIntegerField",
+                     "PositiveSmallIntegerField"), INTEGER),
+    **dict.fromkeys(("FloatField", "DecimalField"), NUMBER),
+    **dict.fromkeys(("CharField", "TextField", "SlugField", "EmailField", "URLField"), STRING),
+    "BooleanField": (bool,),
+}
+SCALAR = (str, int, float)
+# Integers a 64-bit database column can hold.
+INTEGER_RANGE = range(-2 ** 63, 2 ** 63)
+
+
+class InvalidCursor(InvalidPage):
+    pass
+
+
+class StaleCursor(InvalidPage):
+    """The row a cursor points at is not in the precomputed order."""
+
+
+def encode_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def valid_value(value, types):
+    """Return whether a decoded cursor value is one of ``types`` and can be used in a query."""
+    if isinstance(value, bool):
+        return bool in types
+    if not isinstance(value, types):
+        return False
+    if isinstance(value, int):
+        return value in INTEGER_RANGE
+    if isinstance(value, float):
+        return math.isfinite(value)
+    # No database accepts NUL in a string parameter.
+    return "\x00" not in value
+
+
+def decode_cursor(cursor, types):
+    """Decode a cursor whose values must be of ``types``, one tuple of JSON types per key."""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise InvalidCursor("That page cursor is not valid")
+    if (not isinstance(values, list) or len(values) != len(types)
+            or not all(valid_value(value, value_types) for value, value_types in zip(values, types))):
+        raise InvalidCursor("That page cursor is not valid")
+    return values
+
+
+class KeysetPaginator:
+    """
+    Paginates ``queryset`` on ``keys``, a sequence of ``(name, expression, descending)`` triples.
+
+    Each expression is annotated under its name; an expression of None names a field or annotation the
+    queryset already has. The primary key is appended as the final tiebreaker, so the order is total.
+    Keys must not be NULL: wrap nullable ones in ``Coalesce``. A ``values()`` queryset must select every
+    key, ``pk`` included.
+    """
+
+    def __init__(self, queryset, keys, per_page, group_by=1):
+        self.keys = tuple(keys) + (("pk", None, False),)
+        self.per_page = per_page
+        self.group_by = group_by
+        annotations = {name: expression for name, expression, descending in self.keys if expression is not None}
+        self.queryset = queryset.annotate(**annotations)
+
+    @cached_property
+    def cursor_types(self):
+        """The JSON types a cursor may hold for each key, from the field or annotation the key sorts on."""
+        opts = self.queryset.model._meta
+        types = []
+        for name, expression, descending in self.keys:
+            try:
+                if name in self.queryset.query.annotations:
+                    field = self.queryset.query.annotations[name].output_field
+                else:
+                    field = opts.pk if name == "pk" else opts.get_field(name)
+            except (FieldDoesNotExist, FieldError):
+                types.append(SCALAR)
+                continue
+            if field.is_relation:
+                field = field.target_field
+            types.append(CURSOR_TYPES.get(field.get_internal_type(), SCALAR))
+        return types
+
+    def order_by(self, reverse=False):
+        return [f"{'-' if descending != reverse else ''}{name}" for name, expression, descending in self.keys]
+
+    def beyond(self, values, reverse=False):
+        """Return a Q matching the rows that sort after ``values`` (before them when ``reverse``)."""
+        query = Q()
+        equal = {}
+        for (name, expression, descending), value in zip(self.keys, values):
+            query |= Q(**equal, **{f"{name}__{'lt' if descending != reverse else 'gt'}": value})
+            equal[name] = value
+        return query
+
+    def key(self, row):
+        if isinstance(row, dict):
+            return [row[name] for name, expression, descending in self.keys]
+        return [getattr(row, name) for name, expression, descending in self.keys]
+
+    def page(self, after=None, before=None):
+        """Return the page following the ``after`` cursor, preceding the ``before`` cursor, or the first."""
+        if after:
+            return KeysetPage(self, decode_cursor(after, self.cursor_types), reverse=False)
+        if before:
+            return KeysetPage(self, decode_cursor(before, self.cursor_types), reverse=True)
+        return KeysetPage(self, None, reverse=False)
+
+
+class KeysetPage:
+    """One page of a ``KeysetPaginator``; the rows are fetched on first use."""
+
+    def __init__(self, paginator, cursor, reverse):
+        self.paginator = paginator
+        self.cursor = cursor
+        self.reverse = reverse
+
+    @cached_property
+    def _window(self):
+        paginator = self.paginator
+        queryset = paginator.queryset
+        if self.cursor is not None:
+            queryset = queryset.filter(paginator.beyond(self.cursor, self.reverse))
+        rows = list(queryset.order_by(*paginator.order_by(self.reverse))[:paginator.per_page + 1])
+        # The extra row lies beyond the page, in the direction of travel.
+        extra = paginator.key(rows.pop()) if len(rows) > paginator.per_page else None
+        if self.reverse:
+            rows.reverse()
+            return rows, extra, self.cursor
+        return rows, self.cursor, extra
+
+    @property
+    def object_list(self):
+        return self._window[0]
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+    def has_previous(self):
+        return bool(self.object_list) and self._window[1] is not None
+
+    def has_next(self):
+        return bool(self.object_list) and self._window[2] is not None
+
+    def has_other_pages(self):
+        return self.has_previous() or self.has_next()
+
+    def previous_cursor(self):
+        return encode_cursor(self.paginator.key(self.object_list[0])) if self.has_previous() else None
+
+    def next_cursor(self):
+        return encode_cursor(self.paginator.key(self.object_list[-1])) if self.has_next() else None
+
+    def _same_group(self, row, values):
+        return values is not None and self.paginator.key(row)[:self.paginator.group_by] == \
+            values[:self.paginator.group_by]
+
+    @property
+    def continued(self):
+        """True when the first group on this page began on the previous page."""
+        return bool(self.object_list) and self._same_group(self.object_list[0], self._window[1])
+
+    @property
+    def continues(self):
+        """True when the last group on this page carries on to the next page."""
+        return bool(self.object_list) and self._same_group(self.object_list[-1], self._window[2])
+
+
+class OrderedKeysetPaginator(KeysetPaginator):
+    """
+    A KeysetPaginator over ``ordered``, the primary keys of ``queryset`` in key order, with each page
+    fetched by primary key.
+
+    ``extra`` maps a primary key to attributes that cannot be computed from the row alone, such as its
+    search rank; they are set on the fetched rows before their keys are read. A cursor is located by its
+    primary key. When that row is not in ``ordered``, ``locate`` (a callable taking the cursor) returns the
+    number of rows of ``ordered`` that sort before it; without ``locate``, ``page`` raises StaleCursor.
+    """
+
+    def __init__(self, queryset, keys, per_page, ordered, extra=None, group_by=1, locate=None):
+        super().__init__(queryset, keys, per_page, group_by)
+        self.ordered = ordered
+        self.extra = extra or {}
+        self.locate = locate
+
+    @cached_property
+    def positions(self):
+        return {pk: position for position, pk in enumerate(self.ordered)}
+
+    def bounds(self, cursor):
+        """Return where the rows before ``cursor`` end and the rows after it start in ``ordered``."""
+        position = self.positions.get(cursor[-1])
+        if position is not None:
+            return position, position + 1
+        if self.locate is None:
+            raise StaleCursor("That page cursor points outside the results")
+        position = self.locate(cursor)
+        return position, position
+
+    def fetch(self, pks):
+        rows = {row.pk: row for row in self.queryset.filter(pk__in=pks)}
+        fetched = []
+        for pk in pks:
+            if pk in rows:
+                for name, value in self.extra.get(pk, {}).items():
+                    setattr(rows[pk], name, value)
+                fetched.append(rows[pk])
+        return fetched
+
+    def page(self, after=None, before=None):
+        if after:
+            return OrderedKeysetPage(self, decode_cursor(after, self.cursor_types), reverse=False)
+        if before:
+            return OrderedKeysetPage(self, decode_cursor(before, self.cursor_types), reverse=True)
+        return OrderedKeysetPage(self, None, reverse=False)
+
+
+class OrderedKeysetPage(KeysetPage):
+
+    def __init__(self, paginator, cursor, reverse):
+        super().__init__(paginator, cursor, reverse)
+        # Locate the cursor now, so a stale one is reported before the page is rendered.
+        self.bounds = paginator.bounds(cursor) if cursor is not None else None
+
+    @cached_property
+    def _window(self):
+        paginator = self.paginator
+        if self.reverse:
+            end = self.bounds[0]
+            start = max(0, end - paginator.per_page - 1)
+            rows = paginator.fetch(paginator.ordered[start:end])
+            # The extra row lies before the page.
+            extra = paginator.key(rows.pop(0)) if len(rows) > paginator.per_page else None
+            return rows, extra, self.cursor
+        start = 0 if self.bounds is None else self.bounds[1]
+        rows = paginator.fetch(paginator.ordered[start:start + paginator.per_page + 1])
+        extra = paginator.key(rows.pop()) if len(rows) > paginator.per_page else None
+        return rows, self.cursor, extra
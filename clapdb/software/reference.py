@@ -0,0 +1,59 @@
+"""
+Reference data read on nearly every request, served from ``clapdb.cache.versioned``.
+
+The ``categories`` and ``features`` generations are kept by ``signals.py``. ``ReferenceChoiceField`` offers
+them as form choices, read when a form renders or validates rather than when it is defined, so no query
+runs at import time.
+"""
+from django.forms import ModelChoiceField, ValidationError
+from clapdb.cache import aversioned, versioned
+from .models import Category, Feature
+
+
+def load_categories():
+    return list(Category.objects.order_by("sequence"))
+
+
+def load_features():
+    return list(Feature.objects.all())
+
+
+def categories():
+    """All categories in navigation order."""
+    return versioned("categories", load_categories)
+
+
+def features():
+    """All features in display order."""
+    return versioned("features", load_features)
+
+
+async def acategories():
+    return await aversioned("categories", load_categories)
+
+
+async def afeatures():
+    return await aversioned("features", load_features)
+
+
+class ReferenceChoiceField(ModelChoiceField):
+    """A ModelChoiceField over cached reference objects, so rendering and validating it take no queries."""
+
+    def __init__(self, objects, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # A callable such as ``categories``, called each time the choices are needed.
+        self.objects = objects
+        self.choices = self.reference_choices
+
+    def reference_choices(self):
+        choices = [("", self.empty_label)] if self.empty_label is not None else []
+        return choices + [(obj.pk, self.label_from_instance(obj)) for obj in self.objects()]
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        obj = next((obj for obj in self.objects() if str(obj.pk) == str(value)), None)
+        if obj is None:
+            raise ValidationError(self.error_messages["invalid_choice"], code="invalid_choice",
+                                  params={"value": value})
+        return obj
@@ -0,0 +1,185 @@
+"""
+Search backends for the software catalogue.
+
+Every Software row has a SearchDocument holding its case-folded name, developer name and a body made
+of name, developer, category, features and notes. The documents are kept current by the receivers in
+``signals.py``; backends only ever read them, so SearchView never scans the base tables.
+
+The backend is chosen by ``settings.CDB_SEARCH_BACKEND`` (a dotted path), falling back to the one
+matching the database vendor.
+"""
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+from django.utils.html import strip_tags
+from django.utils.module_loading import import_string
+from .models import SearchDocument, Software
+
+FTS_TABLE = "software_searchdocument_fts"
+REBUILD_CHUNK = 500
+
+
+def fold(text):
+    return " ".join(strip_tags(text or "").lower().split())
+
+
+def build_document(software):
+    """Return an unsaved SearchDocument for a Software instance with developer, category and features loaded."""
+    developer = software.developer.name if software.developer else ""
+    category = software.category.name if software.category else ""
+    features = " ".join(feature.name for feature in software.features.all())
+    return SearchDocument(software_id=software.pk,
+                          name=fold(software.name),
+                          developer=fold(developer),
+                          body=fold(" ".join([software.name, developer, category, features, software.notes or ""])))
+
+
+def update_documents(software_ids):
+    """Rebuild the search documents of the given Software ids, dropping any that no longer exist."""
+    software_ids = set(software_ids)
+    if not software_ids:
+        return
+    software = Software.objects.filter(pk__in=software_ids)\
+        .select_related("developer", "category")\
+        .prefetch_related("features")
+    documents = [build_document(item) for item in software]
+    with transaction.atomic():
+        SearchDocument.objects.filter(software_id__in=software_ids).delete()
+        SearchDocument.objects.bulk_create(documents)
+
+
+def rebuild():
+    """Rebuild every search document from scratch."""
+    software = Software.objects.select_related("developer", "category").prefetch_related("features").order_by("pk")
+    with transaction.atomic():
+        SearchDocument.objects.all().delete()
+        # iterator() ignores prefetch_related before Django 4.1, so walk the table in prefetched chunks.
+        last = 0
+        while chunk := list(software.filter(pk__gt=last)[:REBUILD_CHUNK]):
+            SearchDocument.objects.bulk_create(build_document(item) for item in chunk)
+            last = chunk[-1].pk
+    get_search_backend().optimize()
+
+
+def document_prefix(queryset):
+    """Return the lookup prefix from the rows of ``queryset`` to the columns of their search documents."""
+    if queryset.model is SearchDocument:
+        return ""
+    return "search_document__" if queryset.model is Software else "software__search_document__"
+
+
+class BaseSearchBackend:
+    """
+    Restricts a Software (or SoftwareListing) queryset to the titles matching the search terms.
+
+    ``search`` returns the queryset filtered on the search documents and annotated with ``search_rank``,
+    where a higher value is a better match. Terms are matched as case-insensitive substrings. ``ranks``
+    returns the same matches as a ``{Software id: search_rank}`` dict read from the documents alone, for
+    callers that filter the titles in Python.
+    """
+
+    @staticmethod
+    def terms(developer="", title="", text=""):
+        return {column: fold(term) for column, term in (("developer", developer), ("name", title),
+                                                        ("body", text)) if fold(term)}
+
+    def search(self, queryset, developer="", title="", text=""):
+        terms = self.terms(developer, title, text)
+        if not terms:
+            return queryset.annotate(search_rank=Value(0.0, output_field=FloatField()))
+        return self.match(queryset, terms)
+
+    def ranks(self, developer="", title="", text=""):
+        """Return ``{Software id: search_rank}`` for the titles matching the terms, or None without terms."""
+        terms = self.terms(developer, title, text)
+        if not terms:
+            return None
+        return dict(self.match(SearchDocument.objects.all(), terms).values_list("pk", "search_rank"))
+
+    def match(self, queryset, terms):
+        raise NotImplementedError("subclasses of BaseSearchBackend must provide a match() method")
+
+    def optimize(self):
+        """Hook for compacting the index after a bulk rebuild."""
+
+
+class DatabaseSearchBackend(BaseSearchBackend):
+    """Unindexed substring matching on the search documents, for databases without a dedicated backend."""
+
+    def match(self, queryset, terms):
+        document = document_prefix(queryset)
+        query = Q()
+        for column, term in terms.items():
+            query &= Q(**{f"{document}{column}__contains": term})
+        return queryset.filter(query).annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+
+class PostgresSearchBackend(BaseSearchBackend):
+    """Substring matching served by pg_trgm GIN indexes, ranked by trigram similarity."""
+
+    def match(self, queryset, terms):
+        from django.contrib.postgres.search import TrigramSimilarity
+
+        document = document_prefix(queryset)
+        query = Q()
+        rank = None
+        for column, term in terms.items():
+            query &= Q(**{f"{document}{column}__contains": term})
+            similarity = TrigramSimilarity(f"{document}{column}", term)
+            rank = similarity if rank is None else rank + similarity
+        return queryset.filter(query).annotate(search_rank=rank)
+
+
+class SQLiteSearchBackend(BaseSearchBackend):
+    """Substring matching served by an FTS5 trigram table, ranked by bm25."""
+
+    @staticmethod
+    def _like(term):
+        return "%" + term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+    def match(self, queryset, terms):
+        # The trigram tokenizer cannot MATCH terms shorter than three characters; those fall back to a
+        # LIKE on the FTS table, which it still answers without touching the base tables.
+        phrases = []
+        where = []
+        params = []
+        for column, term in terms.items():
+            if len(term) >= 3:
+                phrases.append(f'{column} : "{term.replace(chr(34), chr(34) * 2)}"')
+            else:
+                where.append(f"{FTS_TABLE}.{column} LIKE %s ESCAPE '\\'")
+                params.append(self._like(term))
+        if phrases:
+            where.insert(0, f"{FTS_TABLE} MATCH %s")
+            params.insert(0, " AND ".join(phrases))
+        # The FTS table is joined rather than queried per row, so the MATCH runs once and bm25() ranks each
+        # row it returns. Software, SoftwareListing and SearchDocument are all keyed by the Software id,
+        # which is the FTS rowid.
+        opts = queryset.model._meta
+        where.append(f"{FTS_TABLE}.rowid = {opts.db_table}.{opts.pk.column}")
+        queryset = queryset.extra(tables=[FTS_TABLE], where=where, params=params)
+        if not phrases:
+            return queryset.annotate(search_rank=Value(0.0, output_field=FloatField()))
+        return queryset.annotate(search_rank=RawSQL(f"-bm25({FTS_TABLE})", [], output_field=FloatField()))
+
+    def optimize(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES('optimize')")
+
+
+BACKENDS = {
+    "postgresql": PostgresSearchBackend,
+    "sqlite": SQLiteSearchBackend,
+}
+
+_backend = None
+
+
+def get_search_backend():
+    global _backend
+    if _backend is None:
+        path = getattr(settings, "CDB_SEARCH_BACKEND", None)
+        backend_class = import_string(path) if path else BACKENDS.get(connection.vendor, DatabaseSearchBackend)
+        _backend = backend_class()
+    return _backend
@@ -0,0 +1,235 @@
+"""
+Keeps the data derived from the catalogue in step with it.
+
+Every write that can change what a Software title looks like ends in ``refresh_software`` with the ids
+of the affected titles. Developer, Category and Feature deletions are captured in ``pre_delete`` because
+the related rows are detached (SET_NULL, M2M cleanup) without signals of their own. Changes that can
+move the catalogue counters also take a ``stats.snapshot`` of the affected titles beforehand.
+
+Writes also bump the generation named after the model (``software``, ``developer``, ``category``,
+``feature``), which keys the rendered fragments. Category and Feature writes bump the generation of the
+matching ``reference`` data, and Software and Developer writes that of the ``autocomplete`` index. Pages
+about a single object depend on per-object generations instead: ``software:<pk>``, ``developer:<slug>``
+and ``category:<slug>``.
+
+All of it happens once the write commits (see ``clapdb.cache``).
+
+Bulk writers run inside ``suspended()``, where the receivers stand down, and call ``rebuild_all`` (or
+``refresh_software`` with the ids they touched) once at the end.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from clapdb.cache import bump_generation, bump_on_commit
+from . import autocomplete, facets, listing, search, stats
+from .facets import facet_index
+from .models import Category, Developer, Feature, Software
+
+
+_suspended = ContextVar("cdb_signals_suspended", default=False)
+
+
+@contextmanager
+def suspended():
+    """Skip the receivers in this module for the writes made inside the block."""
+    token = _suspended.set(True)
+    try:
+        yield
+    finally:
+        _suspended.reset(token)
+
+
+def receiver(signal, **kwargs):
+    """``django.dispatch.receiver`` for receivers that stand down inside ``suspended()``."""
+    def decorator(func):
+        @wraps(func)
+        def active_receiver(*args, **kw):
+            if not _suspended.get():
+                return func(*args, **kw)
+        # Strongly referenced: only the undecorated function is kept by the module.
+        signal.connect(active_receiver, weak=False, **kwargs)
+        return func
+    return decorator
+
+
+def page_generations(software_ids):
+    """Return the per-object generations of the developer and category pages listing the given titles."""
+    names = set()
+    for developer, category in Software.objects.filter(pk__in=software_ids)\
+            .values_list("developer__slug", "category__slug"):
+        if developer:
+            names.add(f"developer:{developer}")
+        if category:
+            names.add(f"category:{category}")
+    return names
+
+
+def refresh_software(software_ids, generations=(), counted=None):
+    """
+    Bring every structure derived from the given Software ids up to date once the transaction commits.
+
+    ``counted`` is the ``stats.snapshot`` of the same ids taken before the change, if it can have moved
+    the counters; ``generations`` names extra generations to bump.
+    """
+    software_ids = set(software_ids)
+    generations = set(generations)
+    # The snapshot after the change is taken now: later writes in the same transaction count their own.
+    after = stats.snapshot(software_ids) if counted is not None else None
+    transaction.on_commit(lambda: _refresh(software_ids, generations, counted, after))
+
+
+def _refresh(software_ids, generations, counted, after):
+    search.update_documents(software_ids)
+    listing.update_listings(software_ids)
+    facet_index.update(software_ids)
+    if counted is not None:
+        stats.apply(counted, after)
+    names = {f"software:{pk}" for pk in software_ids} | page_generations(software_ids) | generations
+    if names:
+        bump_generation(*names)
+
+
+def rebuild_all():
+    """
+    Rebuild every derived structure from scratch, after writes that sent no signals.
+
+    The ``category`` generation is one every page depends on (see ``conditional.PAGE_DEPENDENCIES``), so
+    bumping it also retires every cached page, fragment and ETag.
+    """
+    transaction.on_commit(_rebuild_all)
+
+
+def _rebuild_all():
+    search.rebuild()
+    listing.rebuild()
+    stats.rebuild()
+    bump_generation(facets.GENERATION, autocomplete.GENERATION, "categories", "features",
+                    "software", "developer", "category", "feature")
+
+
+def related_software_ids(instance):
+    if isinstance(instance, Feature):
+        return list(instance.software_set.values_list("pk", flat=True))
+    return list(Software.objects.filter(**{instance._meta.model_name: instance}).values_list("pk", flat=True))
+
+
+@receiver(pre_save, sender=Software)
+@receiver(pre_delete, sender=Software)
+def software_changing(sender, instance, raw=False, **kwargs):
+    # The developer and category the title is moving away from must see the change too.
+    if instance.pk and not raw:
+        instance._cdb_previous_pages = page_generations([instance.pk])
+        instance._cdb_counted = stats.snapshot([instance.pk])
+
+
+@receiver(post_save, sender=Software)
+def software_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        refresh_software([instance.pk], getattr(instance, "_cdb_previous_pages", ()),
+                         getattr(instance, "_cdb_counted", {}))
+
+
+@receiver(post_delete, sender=Software)
+def software_deleted(sender, instance, **kwargs):
+    refresh_software([instance.pk], getattr(instance, "_cdb_previous_pages", ()),
+                     getattr(instance, "_cdb_counted", {}))
+
+
+@receiver(m2m_changed, sender=Software.features.through)
+def software_features_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action.startswith("pre_"):
+        if not reverse:
+            software_ids = [instance.pk]
+        elif action == "pre_clear":
+            software_ids = related_software_ids(instance)
+        else:
+            software_ids = list(pk_set)
+        instance._cdb_features_change = (software_ids, stats.snapshot(software_ids))
+    else:
+        software_ids, counted = instance._cdb_features_change
+        refresh_software(software_ids, counted=counted)
+
+
+@receiver(pre_save, sender=Developer)
+@receiver(pre_save, sender=Category)
+def related_saving(sender, instance, raw=False, **kwargs):
+    if instance.pk and not raw:
+        instance._cdb_previous_slug = sender.objects.filter(pk=instance.pk).values_list("slug", flat=True).first()
+
+
+@receiver(post_save, sender=Developer)
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=Feature)
+def related_saved(sender, instance, created=False, raw=False, **kwargs):
+    if not created and not raw:
+        slugs = {getattr(instance, "_cdb_previous_slug", None), instance.slug} - {None}
+        pages = {f"{sender._meta.model_name}:{slug}" for slug in slugs} if sender is not Feature else set()
+        refresh_software(related_software_ids(instance), pages)
+
+
+@receiver(pre_delete, sender=Developer)
+@receiver(pre_delete, sender=Category)
+@receiver(pre_delete, sender=Feature)
+def related_deleting(sender, instance, **kwargs):
+    instance._cdb_related_software = related_software_ids(instance)
+    instance._cdb_counted = stats.snapshot(instance._cdb_related_software)
+
+
+@receiver(post_delete, sender=Developer)
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=Feature)
+def related_deleted(sender, instance, **kwargs):
+    pages = {f"{sender._meta.model_name}:{instance.slug}"} if sender is not Feature else set()
+    refresh_software(getattr(instance, "_cdb_related_software", []), pages,
+                     getattr(instance, "_cdb_counted", {}))
+
+
+@receiver(post_save, sender=Developer)
+def developer_saved(sender, instance, created=False, raw=False, **kwargs):
+    if created and not raw:
+        transaction.on_commit(lambda: stats.apply({}, developers=1))
+
+
+@receiver(post_delete, sender=Developer)
+def developer_deleted(sender, instance, **kwargs):
+    transaction.on_commit(lambda: stats.apply({}, developers=-1))
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def categories_changed(sender, **kwargs):
+    bump_on_commit("categories")
+
+
+@receiver(post_save, sender=Feature)
+@receiver(post_delete, sender=Feature)
+def features_changed(sender, **kwargs):
+    bump_on_commit("features")
+
+
+@receiver(post_save, sender=Software)
+@receiver(post_delete, sender=Software)
+@receiver(post_save, sender=Developer)
+@receiver(post_delete, sender=Developer)
+def names_changed(sender, **kwargs):
+    bump_on_commit(autocomplete.GENERATION)
+
+
+@receiver(post_save, sender=Software)
+@receiver(post_delete, sender=Software)
+@receiver(post_save, sender=Developer)
+@receiver(post_delete, sender=Developer)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Feature)
+@receiver(post_delete, sender=Feature)
+def content_changed(sender, **kwargs):
+    bump_on_commit(sender._meta.model_name)
+
+
+@receiver(m2m_changed, sender=Software.features.through)
+def software_features_generation(sender, action, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear"):
+        bump_on_commit("software")
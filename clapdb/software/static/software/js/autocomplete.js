@@ -0,0 +1,36 @@
+// Fills the <datalist> of every input carrying data-autocomplete="<kind>" from /autocomplete/.
+(function () {
+    "use strict";
+
+    function attach(input) {
+        var list = document.getElementById(input.getAttribute("list"));
+        var url = input.dataset.autocompleteUrl;
+        var timer = null;
+        var last = null;
+
+        input.addEventListener("input", function () {
+            clearTimeout(timer);
+            timer = setTimeout(function () {
+                var q = input.value.trim();
+                if (!q || q === last) {
+                    return;
+                }
+                last = q;
+                fetch(url + "?kind=" + encodeURIComponent(input.dataset.autocomplete) + "&q=" + encodeURIComponent(q))
+                    .then(function (response) { return response.json(); })
+                    .then(function (data) {
+                        if (q !== last) {
+                            return;
+                        }
+                        list.replaceChildren.apply(list, data.results.map(function (result) {
+                            var option = document.createElement("option");
+                            option.value = result.name;
+                            return option;
+                        }));
+                    });
+            }, 150);
+        });
+    }
+
+    document.querySelectorAll("input[data-autocomplete]").forEach(attach);
+})();
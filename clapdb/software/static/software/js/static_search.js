@@ -0,0 +1,122 @@
+// Client-side search for the static export: filters the index written by export_static instead of POSTing
+// to the search view, and renders the results the way the search page does.
+(function () {
+    "use strict";
+
+    var form = document.querySelector("form[data-static-index]");
+    if (!form) {
+        return;
+    }
+    var results = document.getElementById("static_results");
+    var index = null;
+
+    function fold(text) {
+        return text.toLowerCase().split(/\s+/).filter(Boolean).join(" ");
+    }
+
+    function element(tag, attributes, children) {
+        var node = document.createElement(tag);
+        Object.keys(attributes || {}).forEach(function (name) {
+            node.setAttribute(name, attributes[name]);
+        });
+        (children || []).forEach(function (child) {
+            node.append(child);
+        });
+        return node;
+    }
+
+    function link(href, text) {
+        return element("a", {"href": href, "class": "developer_link link-info"}, [text]);
+    }
+
+    function query() {
+        var data = new FormData(form);
+        var flags = 0;
+        index.flags.forEach(function (flag, bit) {
+            if (data.get(flag)) {
+                flags |= 1 << bit;
+            }
+        });
+        return {
+            developer: fold(data.get("developer") || ""),
+            title: fold(data.get("title") || ""),
+            category: data.get("category") ? Number(data.get("category")) : null,
+            flags: flags,
+            features: data.getAll("features").map(Number)
+        };
+    }
+
+    function matches(q, title) {
+        return (!q.developer || fold(index.developers[title[3]][1]).indexOf(q.developer) !== -1) &&
+            (!q.title || fold(title[1]).indexOf(q.title) !== -1) &&
+            (q.category === null || title[4] === q.category) &&
+            (title[5] & q.flags) === q.flags &&
+            q.features.every(function (feature) { return title[6].indexOf(feature) !== -1; });
+    }
+
+    // Titles arrive grouped by developer, then by category, as in the index.
+    function render(titles) {
+        var list = element("ul", {"class": "developer_list"});
+        var developerItem = null;
+        var categoryList = null;
+        var developer = null;
+        var category;
+        titles.forEach(function (title) {
+            if (title[3] !== developer) {
+                developer = title[3];
+                category = undefined;
+                var info = index.developers[developer];
+                developerItem = element("li", {}, [element("h3", {"class": "developer_name"}, [
+                    link(form.dataset.developerUrl.replace(/-$/, info[0]), info[1])])]);
+                if (info[2]) {
+                    developerItem.append(element("p", {}, [element("a", {"href": info[2]}, [info[2]])]));
+                }
+                categoryList = element("ul", {"class": "category_list"});
+                developerItem.append(categoryList);
+                list.append(developerItem);
+            }
+            if (title[4] !== category) {
+                category = title[4];
+                var softwareList = element("ul", {"class": "software_list"});
+                categoryList.append(element("li", {}, [
+                    element("h4", {"class": "developer_category"}, [index.categories[category] || ""]), softwareList]));
+            }
+            var item = element("li", {}, [element("strong", {}, [
+                link(form.dataset.softwareUrl.replace("/0/", "/" + title[0] + "/"), title[1])])]);
+            if (title[2]) {
+                item.append(" — " + title[2]);
+            }
+            if (title[5] & 1 << index.flags.indexOf("free")) {
+                item.append(" — Free");
+            }
+            categoryList.lastChild.lastChild.append(item);
+        });
+        return list;
+    }
+
+    function search() {
+        var q = query();
+        results.replaceChildren(element("h2", {}, ["Search Results"]));
+        results.hidden = false;
+        if (!q.developer && !q.title && q.category === null && !q.flags && !q.features.length) {
+            results.hidden = true;
+            return;
+        }
+        var titles = index.software.filter(function (title) { return matches(q, title); });
+        results.append(titles.length ? render(titles) : element("p", {}, ["No results."]));
+    }
+
+    form.addEventListener("submit", function (event) {
+        event.preventDefault();
+        if (index) {
+            search();
+            return;
+        }
+        fetch(form.dataset.staticIndex)
+            .then(function (response) { return response.json(); })
+            .then(function (data) {
+                index = data;
+                search();
+            });
+    });
+})();
@@ -0,0 +1,182 @@
+"""
+Static export of the public site.
+
+``export`` renders every public page (home, stats, feed, the developer list, every category, developer and
+Software page, and the search form) through the full middleware and view stack, in a pool of worker
+processes, and writes each under the directory of its URL: ``/developer/foo`` to ``developer/foo/index.html``
+and the RSS feed to ``feed/index.xml``. The feeds of every category and developer are exported in every
+format. Listings are rendered whole, as the ``?after=`` cursors of the keyset pagination cannot be served
+statically.
+
+A manifest in the output directory records the SHA-256 of every file, so a later export rewrites only
+the pages whose content changed and removes those of deleted objects; static hosts and CDNs that sync by
+modification time then upload only what changed.
+
+The search page is rendered for client-side search: instead of POSTing to ``SearchView`` its form filters
+``search/index.json``, a compact index of the active titles written next to it, with
+``software/js/static_search.js``. The static files themselves are not exported; publish ``collectstatic``
+output under ``STATIC_URL``.
+"""
+import hashlib
+import json
+import multiprocessing
+import os
+from collections import Counter
+from urllib.parse import urlsplit
+import django
+from django.conf import settings
+from django.db import connections
+from django.db.models import Value
+from django.db.models.functions import Coalesce, Lower
+from django.test import Client, override_settings
+from django.urls import reverse
+from .facets import FLAGS
+from .feeds import FORMATS
+from .listing import PLATFORMS
+from .models import Category, Developer, Software, SoftwareListing
+from .views import SEARCH_INDEX
+
+MANIFEST = ".export-manifest.json"
+CHUNK = 20
+EXTENSIONS = {"text/html": ".html", "application/rss+xml": ".xml", "application/atom+xml": ".xml",
+              "application/json": ".json", "application/feed+json": ".json"}
+
+
+def pages():
+    """Return the path of every public page."""
+    paths = [reverse(name) for name in ("home", "stats", "feed", "developer-list", "search")]
+    paths += [reverse("feed-format", args=[format]) for format in FORMATS if format != "rss"]
+    for slug in Category.objects.values_list("slug", flat=True):
+        paths.append(reverse("software-list-category", args=[slug]))
+        paths += [reverse("category-feed", args=[slug, format]) for format in FORMATS]
+    for slug in Developer.objects.values_list("slug", flat=True):
+        paths.append(reverse("developer", args=[slug]))
+        paths += [reverse("developer-feed", args=[slug, format]) for format in FORMATS]
+    paths += [reverse("software", args=[pk]) for pk in Software.objects.values_list("pk", flat=True)]
+    return paths
+
+
+def output_name(path, content_type):
+    extension = EXTENSIONS.get(content_type.split(";")[0].strip(), "")
+    return os.path.join(path.strip("/"), f"index{extension}")
+
+
+def write_if_changed(output, name, content, previous):
+    """Write ``content`` to ``name`` unless the manifest entry shows it unchanged; return (digest, written)."""
+    digest = hashlib.sha256(content).hexdigest()
+    target = os.path.join(output, name)
+    if previous == [name, digest] and os.path.exists(target):
+        return digest, False
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    with open(f"{target}.tmp", "wb") as f:
+        f.write(content)
+    os.replace(f"{target}.tmp", target)
+    return digest, True
+
+
+def search_index():
+    """
+    Return the client-side search index: the active titles that SearchView can find, in its order.
+
+    Each title is ``[id, name, version, developer, category id, flags, feature ids]``, where developer is
+    an offset into ``developers`` (``[slug, name, url]``) and bit ``n`` of flags is ``FLAGS[n]``.
+    """
+    developers, offsets, software = [], {}, []
+    rows = SoftwareListing.objects.filter(active=True, developer_id__isnull=False)\
+        .order_by(Lower("developer_name"), "developer_id", Coalesce("category_sequence", Value(0)),
+                  Lower("name"), "pk")\
+        .values_list("pk", "name", "version", "developer_id", "developer_slug", "developer_name", "developer_url",
+                     "category_id", "feature_ids", "free", "platforms")
+    for pk, name, version, developer_id, slug, developer_name, url, category_id, feature_ids, free, platforms \
+            in rows:
+        if developer_id not in offsets:
+            offsets[developer_id] = len(developers)
+            developers.append([slug, developer_name, url])
+        platforms = platforms.split(", ")
+        flags = {"free": free, **{flag: label in platforms for flag, label in PLATFORMS}}
+        software.append([pk, name, version or "", offsets[developer_id], category_id,
+                         sum(1 << n for n, flag in enumerate(FLAGS) if flags[flag]), feature_ids])
+    return {"flags": FLAGS,
+            "categories": {pk: name for pk, name in Category.objects.values_list("pk", "name")},
+            "developers": developers,
+            "software": software}
+
+
+def export_settings(base_url):
+    """Settings for the export workers: whole listings, no page cache or metrics, the public host."""
+    host = urlsplit(base_url).netloc
+    return {
+        "CDB_STATIC_EXPORT": True,
+        "CDB_PAGE_SIZE": max(Software.objects.count(), Developer.objects.count()) + 1,
+        "CDB_PAGE_CACHE": {},
+        "CDB_INSTRUMENTATION": False,
+        "ALLOWED_HOSTS": [*settings.ALLOWED_HOSTS, host],
+    }
+
+
+_client = None
+_secure = False
+
+
+def _start_worker(overrides, base_url):
+    global _client, _secure
+    django.setup()
+    override_settings(**overrides).enable()
+    url = urlsplit(base_url)
+    # A view that raises gets its 500 page, logged by django.request, and the page is counted as failed:
+    # a re-raised exception may not pickle back to the parent and would abort the whole export.
+    _client = Client(raise_request_exception=False, HTTP_HOST=url.netloc)
+    _secure = url.scheme == "https"
+
+
+def _export_page(task):
+    output, path, previous = task
+    response = _client.get(path, secure=_secure)
+    if response.status_code != 200:
+        return path, None, None, False
+    name = output_name(path, response["Content-Type"])
+    digest, written = write_if_changed(output, name, response.content, previous)
+    return path, name, digest, written
+
+
+def export(output, base_url="http://localhost", workers=None, force=False):
+    """
+    Export the site to ``output`` and return the number of files written, unchanged, removed and failed.
+
+    ``force`` rewrites every file regardless of the manifest.
+    """
+    manifest_path = os.path.join(output, MANIFEST)
+    previous = {}
+    if not force and os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            previous = json.load(f)
+    manifest, counts = {}, Counter()
+
+    overrides = export_settings(base_url)
+    tasks = [(output, path, previous.get(path)) for path in pages()]
+    # Forked workers must not share the parent's database connections.
+    connections.close_all()
+    with multiprocessing.Pool(workers, _start_worker, (overrides, base_url)) as pool:
+        for path, name, digest, written in pool.imap_unordered(_export_page, tasks, chunksize=CHUNK):
+            if name is None:
+                # Keep the last good export of a page that failed to render.
+                if path in previous:
+                    manifest[path] = previous[path]
+                counts["failed"] += 1
+                continue
+            manifest[path] = [name, digest]
+            counts["written" if written else "unchanged"] += 1
+
+    name = os.path.join(reverse("search").strip("/"), SEARCH_INDEX)
+    content = json.dumps(search_index(), separators=(",", ":")).encode()
+    digest, written = write_if_changed(output, name, content, previous.get(name))
+    manifest[name] = [name, digest]
+    counts["written" if written else "unchanged"] += 1
+
+    for path, (name, digest) in previous.items():
+        if path not in manifest and os.path.exists(os.path.join(output, name)):
+            os.remove(os.path.join(output, name))
+            counts["removed"] += 1
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f, indent=0, sort_keys=True)
+    return counts
@@ -0,0 +1,75 @@
+"""
+Materialized catalogue counters.
+
+``CatalogueStats`` holds one row of counters so the stats page is a single primary-key read. Counter
+names are ``developers``, ``software``, ``active``, ``inactive`` and, over active titles only, ``free``,
+``paid``, ``os:<name>``, ``category:<pk>`` (``category:none`` when unset) and ``feature:<pk>``.
+
+Writers take a ``snapshot`` of the titles they are about to change and ``apply`` the difference to the
+snapshot taken afterwards; ``rebuild`` recomputes everything from scratch.
+"""
+from collections import Counter
+from django.db import transaction
+from .models import CatalogueStats, Developer, Software
+
+OSES = ("mac", "windows", "linux")
+ROW = 1
+
+
+def _count(software):
+    counters = Counter()
+    active_ids = set()
+    for pk, active, free, category_id, *oses in software.values_list("pk", "active", "free", "category_id", *OSES):
+        counters["software"] += 1
+        counters["active" if active else "inactive"] += 1
+        if not active:
+            continue
+        active_ids.add(pk)
+        counters["free" if free else "paid"] += 1
+        counters[f"category:{'none' if category_id is None else category_id}"] += 1
+        for name, supported in zip(OSES, oses):
+            if supported:
+                counters[f"os:{name}"] += 1
+    through = Software.features.through.objects.filter(software_id__in=software.values("pk"))
+    for software_id, feature_id in through.values_list("software_id", "feature_id"):
+        if software_id in active_ids:
+            counters[f"feature:{feature_id}"] += 1
+    return counters
+
+
+def snapshot(software_ids):
+    """Return the counters contributed by the given Software ids as they are now."""
+    software_ids = set(software_ids)
+    if not software_ids:
+        return Counter()
+    return _count(Software.objects.filter(pk__in=software_ids))
+
+
+def apply(before, after=None, developers=0):
+    """Add the difference between two snapshots, and a change in the developer count, to the counters."""
+    delta = Counter(after or {})
+    delta.subtract(before or {})
+    delta["developers"] += developers
+    delta = {name: value for name, value in delta.items() if value}
+    if not delta:
+        return
+    with transaction.atomic():
+        stats, _ = CatalogueStats.objects.select_for_update().get_or_create(pk=ROW)
+        for name, value in delta.items():
+            stats.counters[name] = stats.counters.get(name, 0) + value
+            if not stats.counters[name]:
+                del stats.counters[name]
+        stats.save()
+
+
+def rebuild():
+    """Recompute every counter from the catalogue."""
+    counters = _count(Software.objects.all())
+    counters["developers"] = Developer.objects.count()
+    CatalogueStats.objects.update_or_create(pk=ROW, defaults={"counters": dict(counters)})
+
+
+def get():
+    """Return the counters with one primary-key read."""
+    stats = CatalogueStats.objects.filter(pk=ROW).first()
+    return Counter(stats.counters if stats else {})
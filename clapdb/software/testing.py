@@ -0,0 +1,76 @@
+"""
+Test helpers that hold the public views to a query budget.
+
+``QUERY_BUDGETS`` declares the most queries each named URL in ``clapdb.software.urls`` may issue with every
+cache cold. ``QueryBudgetMixin`` for ``django.test.TestCase`` checks the budgets and, given a callable that
+enlarges the fixture, checks that no view's query count grows with it::
+
+    class ViewBudgetTests(QueryBudgetMixin, TestCase):
+        def test_budgets(self):
+            self.assertQueryBudgets({"home": "/", "software": f"/software/{self.software.pk}/", ...},
+                                    grow=lambda: make_catalogue(titles=500))
+"""
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import get_resolver
+from clapdb.cache import local_cache
+from clapdb.snippets.cache import local_cache as snippet_cache
+from .autocomplete import prefix_index
+from .facets import facet_index
+
+QUERY_BUDGETS = {
+    "home": 4,
+    "software": 4,
+    "developer": 4,
+    "developer-list": 3,
+    "software-list-category": 4,
+    "search": 8,
+    "stats": 4,
+    "feed": 3,
+    "feed-format": 3,
+    "category-feed": 3,
+    "developer-feed": 3,
+    "autocomplete": 4,
+    "api-list": 3,
+    "api-detail": 3,
+}
+
+
+def cold_caches():
+    """Empty every cache tier so the next request takes the slowest path."""
+    cache.clear()
+    local_cache.clear()
+    snippet_cache.clear()
+    facet_index.generation = None
+    prefix_index.generation = None
+
+
+def count_queries(client, path, method="get", data=None):
+    """Request ``path`` with cold caches and return the response and the number of queries it issued."""
+    cold_caches()
+    with CaptureQueriesContext(connection) as queries:
+        response = getattr(client, method)(path, data or {})
+    return response, len(queries)
+
+
+class QueryBudgetMixin:
+    query_budgets = QUERY_BUDGETS
+
+    def assertQueryBudget(self, name, path, method="get", data=None):
+        response, queries = count_queries(self.client, path, method, data)
+        self.assertEqual(response.status_code, 200, f"{name} ({path}) returned {response.status_code}")
+        self.assertLessEqual(queries, self.query_budgets[name],
+                             f"{name} ({path}) issued {queries} queries, budget is {self.query_budgets[name]}")
+        return queries
+
+    def assertQueryBudgets(self, paths, grow=None):
+        """Check every URL name in ``paths`` ({url name: path}) against its budget, before and after ``grow()``."""
+        names = {pattern.name for pattern in get_resolver("clapdb.software.urls").url_patterns if pattern.name}
+        self.assertFalse(names - set(self.query_budgets), "URL names without a declared query budget")
+        before = {name: self.assertQueryBudget(name, path) for name, path in paths.items()}
+        if grow is not None:
+            grow()
+            after = {name: self.assertQueryBudget(name, path) for name, path in paths.items()}
+            for name in paths:
+                self.assertLessEqual(after[name], before[name], f"{name} issues more queries as the fixture grows")
@@ -0,0 +1,59 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+from clapdb.benchmarks.catalogue import generate
+from clapdb.software.models import Category, Software
+from clapdb.software.testing import QueryBudgetMixin, count_queries
+
+# Including the session and user lookups of the logged-in admin.
+ADMIN_QUERY_BUDGETS = {
+    "changelist": 7,
+    "changelist-filtered": 6,
+    "changelist-search": 6,
+    "changelist-save": 16,
+    "change-form": 10,
+}
+
+
+class SoftwareAdminQueryTests(QueryBudgetMixin, TestCase):
+    """The Software changelist and change form issue a fixed number of queries for a full page of rows."""
+
+    query_budgets = ADMIN_QUERY_BUDGETS
+
+    @classmethod
+    def setUpTestData(cls):
+        with cls.captureOnCommitCallbacks(execute=True):
+            generate(150, developers=15, categories=4, features=6)
+        cls.user = User.objects.create_superuser("admin", "admin@example.com", "password")
+        cls.software = Software.objects.select_related("category").first()
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_changelist(self):
+        changelist = reverse("admin:software_software_changelist")
+        self.assertQueryBudget("changelist", changelist)
+        self.assertQueryBudget("changelist-filtered", f"{changelist}?category__id__exact={self.software.category_id}")
+        self.assertQueryBudget("changelist-search", f"{changelist}?q={self.software.name.split()[1]}")
+
+    def test_changelist_save(self):
+        """Saving a page of list_editable rows validates and saves only the changed ones."""
+        changelist = reverse("admin:software_software_changelist")
+        page = list(Software.objects.order_by("name", "-pk")[:100])
+        other = Category.objects.exclude(pk=page[0].category_id).first()
+        data = {"form-TOTAL_FORMS": len(page), "form-INITIAL_FORMS": len(page), "_save": "Save"}
+        for i, software in enumerate(page):
+            data.update({f"form-{i}-id": software.pk, f"form-{i}-category": software.category_id,
+                         f"form-{i}-version": software.version, f"form-{i}-url": software.url,
+                         f"form-{i}-active": "on" if software.active else ""})
+            if software.free:
+                data[f"form-{i}-free"] = "on"
+        data["form-0-category"] = other.pk
+        response, queries = count_queries(self.client, changelist, "post", data)
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Software.objects.get(pk=page[0].pk).category, other)
+        budget = self.query_budgets["changelist-save"]
+        self.assertLessEqual(queries, budget, f"saving a page issued {queries} queries, budget is {budget}")
+
+    def test_change_form(self):
+        self.assertQueryBudget("change-form", reverse("admin:software_software_change", args=[self.software.pk]))
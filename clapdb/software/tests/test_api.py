@@ -0,0 +1,45 @@
+from django.test import TestCase
+from clapdb.software.models import Category, Developer, Software
+from clapdb.software.pagination import encode_cursor
+from clapdb.software.testing import cold_caches
+
+
+class MalformedParameterTests(TestCase):
+    """Every malformed query parameter is answered with a JSON 400, never Django's HTML 500 page."""
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name="Effects", slug="effects")
+        developer = Developer.objects.create(name="Developer", slug="developer", url="https://example.com")
+        cls.software = [Software.objects.create(name=f"Title {i}", developer=developer, category=category)
+                        for i in range(3)]
+
+    def setUp(self):
+        cold_caches()
+
+    def assertJSONError(self, path, params, status=400):
+        response = self.client.get(path, params)
+        self.assertEqual(response.status_code, status, f"{path} {params}")
+        self.assertEqual(response["Content-Type"], "application/json")
+        self.assertIn("error", response.json())
+
+    def test_crafted_cursors(self):
+        cursors = [None, [None], [{"a": 1}], ["abc"], [True], [1.5], [2 ** 64], [[1]], [1, 2], [], {"a": 1}, "abc"]
+        for resource in ("software", "developer", "category", "feature"):
+            for values in cursors:
+                for param in ("after", "before"):
+                    self.assertJSONError(f"/api/v1/{resource}/", {param: encode_cursor(values)})
+            self.assertJSONError(f"/api/v1/{resource}/", {"after": "not base64!"})
+
+    def test_other_parameters(self):
+        for params in ({"limit": "ten"}, {"limit": "0"}, {"limit": "100000"}, {"fields": "name,nope"}):
+            self.assertJSONError("/api/v1/software/", params)
+        self.assertJSONError("/api/v1/software/", {"fields": "nope"})
+        self.assertJSONError(f"/api/v1/software/{2 ** 70}/", {}, status=404)
+
+    def test_valid_cursor(self):
+        first = self.client.get("/api/v1/software/", {"limit": 1}).json()
+        self.assertEqual([row["id"] for row in first["results"]], [self.software[0].pk])
+        response = self.client.get("/api/v1/software/", {"limit": 1, "after": encode_cursor([self.software[0].pk])})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row["id"] for row in response.json()["results"]], [self.software[1].pk])
@@ -0,0 +1,80 @@
+from django.test import TestCase
+from clapdb.software.autocomplete import MAX_LIMIT
+from clapdb.software.models import Category, Developer, Software
+from clapdb.software.testing import cold_caches
+
+
+class AutocompleteTests(TestCase):
+    """Prefix queries are answered from the in-process index, best matches first."""
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name="Effects", slug="effects")
+        cls.developers = {}
+        for name, slug, titles in (("Audio Damage", "audio-damage", 1), ("Damage Audio", "damage-audio", 0),
+                                   ("Audiority", "audiority", 3), ("Audio Thing", "audio-thing", 1)):
+            cls.developers[slug] = Developer.objects.create(name=name, slug=slug, url="https://example.com")
+            with cls.captureOnCommitCallbacks(execute=True):
+                for i in range(titles):
+                    Software.objects.create(name=f"{name} Plugin {i}", developer=cls.developers[slug],
+                                            category=category)
+        with cls.captureOnCommitCallbacks(execute=True):
+            Software.objects.create(name="Audio Retired", developer=cls.developers["audio-thing"],
+                                    category=category, active=False)
+
+    def setUp(self):
+        cold_caches()
+
+    def complete(self, q, kind="developer", **params):
+        response = self.client.get("/autocomplete/", {"q": q, "kind": kind, **params})
+        self.assertEqual(response.status_code, 200)
+        return [result["value"] for result in response.json()["results"]]
+
+    def test_ranking(self):
+        # Names starting with the prefix come first, by number of active titles, then by name; names with a
+        # later word starting with it follow.
+        self.assertEqual(self.complete("audio"), ["audiority", "audio-damage", "audio-thing", "damage-audio"])
+        self.assertEqual(self.complete("dam"), ["damage-audio", "audio-damage"])
+        # Short prefixes are ranked when the index is built, and the same way.
+        self.assertEqual(self.complete("au"), ["audiority", "audio-damage", "audio-thing", "damage-audio"])
+
+    def test_case_and_spacing(self):
+        self.assertEqual(self.complete("  AUDIO d"), ["audio-damage"])
+        self.assertEqual(self.complete(""), [])
+        self.assertEqual(self.complete("nothing"), [])
+
+    def test_titles(self):
+        expected = Software.objects.filter(active=True, name__istartswith="audio").values_list("pk", flat=True)
+        self.assertCountEqual(self.complete("audio", kind="software"), expected)
+        self.assertEqual(self.complete("retired", kind="software"), [])
+
+    def test_limit(self):
+        self.assertEqual(self.complete("audio", limit=2), ["audiority", "audio-damage"])
+        self.assertEqual(len(self.complete("a", limit=0)), 1)
+        self.assertEqual(self.complete("a", limit="many"), self.complete("a"))
+        self.assertLessEqual(len(self.complete("a", limit=MAX_LIMIT + 1)), MAX_LIMIT)
+
+    def test_kind_must_be_known(self):
+        response = self.client.get("/autocomplete/", {"q": "audio", "kind": "category"})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("error", response.json())
+
+    def test_answers_without_queries(self):
+        response = self.client.get("/autocomplete/", {"q": "audio"})
+        self.assertIn("public", response["Cache-Control"])
+        self.assertIn("max-age=", response["Cache-Control"])
+        with self.assertNumQueries(0):
+            self.complete("audi", kind="software")
+            self.complete("damage")
+
+    def test_writes_update_the_index(self):
+        self.assertEqual(self.complete("aud", limit=1), ["audiority"])
+        developer = self.developers["audio-damage"]
+        developer.name = "Zeta Damage"
+        with self.captureOnCommitCallbacks(execute=True):
+            developer.save()
+        self.assertNotIn("audio-damage", self.complete("audio"))
+        self.assertIn("audio-damage", self.complete("zeta"))
+        with self.captureOnCommitCallbacks(execute=True):
+            Software.objects.filter(developer=self.developers["audiority"]).delete()
+        self.assertEqual(self.complete("aud"), ["audio-thing", "audiority", "damage-audio"])
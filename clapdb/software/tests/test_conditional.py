@@ -0,0 +1,78 @@
+from asgiref.sync import async_to_sync
+from django.test import RequestFactory, TestCase, override_settings
+from clapdb.software import async_views
+from clapdb.software.models import Category, Developer, Software
+from clapdb.software.testing import cold_caches
+
+
+# The page cache would answer the conditional requests itself; these test the views' own validators.
+@override_settings(CDB_PAGE_CACHE={})
+class ConditionalGetTests(TestCase):
+    """The HTML views answer 304 from the generations alone, until a write they depend on commits."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name="Effects", slug="effects")
+        cls.developer = Developer.objects.create(name="Valhalla DSP", slug="valhalla-dsp", url="https://example.com")
+        with cls.captureOnCommitCallbacks(execute=True):
+            cls.software = Software.objects.create(name="Supermassive", developer=cls.developer,
+                                                   category=cls.category, url="https://example.com/supermassive")
+            cls.other = Software.objects.create(name="Shimmer", developer=cls.developer, category=cls.category)
+
+    def setUp(self):
+        cold_caches()
+
+    def paths(self):
+        return ["/", f"/software/{self.software.pk}/", "/developer/valhalla-dsp", "/developers/",
+                "/category/effects", "/stats/"]
+
+    def test_current_client_gets_304_without_queries(self):
+        for path in self.paths():
+            etag = self.client.get(path)["ETag"]
+            with self.assertNumQueries(0):
+                response = self.client.get(path, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304, path)
+            self.assertFalse(response.templates, path)
+            self.assertEqual(response["ETag"], etag)
+
+    def test_write_changes_the_etag(self):
+        etags = {path: self.client.get(path)["ETag"] for path in self.paths()}
+        self.software.version = "2.0"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.software.save()
+        # The developer list shows no titles, so its clients stay current.
+        self.assertEqual(self.client.get("/developers/", HTTP_IF_NONE_MATCH=etags.pop("/developers/")).status_code,
+                         304)
+        for path, etag in etags.items():
+            response = self.client.get(path, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200, path)
+            self.assertNotEqual(response["ETag"], etag, path)
+
+    def test_per_object_etags(self):
+        path = f"/software/{self.software.pk}/"
+        etag = self.client.get(path)["ETag"]
+        # Another title's page depends on its own generation only.
+        self.other.version = "2.0"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.other.save()
+        self.assertEqual(self.client.get(path, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_if_modified_since(self):
+        # The HTML views carry no Last-Modified, so a date alone never makes a page current.
+        response = self.client.get("/stats/", HTTP_IF_MODIFIED_SINCE="Fri, 01 Jan 2100 00:00:00 GMT")
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("Last-Modified", response)
+        # The feeds do; an ETag that no longer matches wins over a date that still does.
+        response = self.client.get("/feed/")
+        last_modified = response["Last-Modified"]
+        self.assertEqual(self.client.get("/feed/", HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304)
+        self.assertEqual(self.client.get("/feed/", HTTP_IF_MODIFIED_SINCE=last_modified,
+                                         HTTP_IF_NONE_MATCH='"stale"').status_code, 200)
+
+    def test_async_views(self):
+        etag = self.client.get("/stats/")["ETag"]
+        request = RequestFactory().get("/stats/", HTTP_IF_NONE_MATCH=etag)
+        with self.assertNumQueries(0):
+            response = async_to_sync(async_views.stats)(request)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
@@ -0,0 +1,64 @@
+import json
+from django.test import TestCase
+from clapdb.software import signals
+from clapdb.software.models import Category, Developer, Software
+from clapdb.software.testing import cold_caches
+
+
+class FeedTests(TestCase):
+    """Stored feeds are rebuilt after the writes they depend on, and only then."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name="Effects", slug="effects")
+        cls.empty = Category.objects.create(name="Hosts", slug="hosts")
+        cls.developer = Developer.objects.create(name="Valhalla DSP", slug="valhalla-dsp", url="https://example.com")
+        with cls.captureOnCommitCallbacks(execute=True):
+            cls.software = Software.objects.create(name="Supermassive", developer=cls.developer,
+                                                   category=cls.category, url="https://example.com/supermassive")
+
+    def setUp(self):
+        cold_caches()
+
+    def titles(self, path):
+        return [item["title"] for item in json.loads(self.client.get(path).content)["items"]]
+
+    def test_rebuild_all_after_bulk_writes(self):
+        paths = ["/feed/json/", "/category/effects/feed/json/", "/developer/valhalla-dsp/feed/json/"]
+        for path in paths:
+            self.assertIn("Supermassive", self.titles(path)[0])
+        # A bulk update sends no signals; rebuild_all brings every stored feed up to date.
+        Software.objects.filter(pk=self.software.pk).update(name="Shimmer")
+        with self.captureOnCommitCallbacks(execute=True):
+            signals.rebuild_all()
+        for path in paths:
+            self.assertIn("Shimmer", self.titles(path)[0], path)
+
+    def test_save_rebuilds_feeds(self):
+        etag = self.client.get("/category/effects/feed/rss/")["ETag"]
+        self.software.version = "2.0"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.software.save()
+        response = self.client.get("/category/effects/feed/rss/")
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertIn(b"Version: 2.0", response.content)
+
+    def test_empty_feed_is_stable(self):
+        response = self.client.get("/category/hosts/feed/rss/")
+        self.assertIn(b"<lastBuildDate>Thu, 01 Jan 1970 00:00:00 +0000</lastBuildDate>", response.content)
+        # Rebuilt from scratch, the feed has the same bytes and so the same ETag.
+        with self.captureOnCommitCallbacks(execute=True):
+            signals.rebuild_all()
+        cold_caches()
+        self.assertEqual(self.client.get("/category/hosts/feed/rss/")["ETag"], response["ETag"])
+
+    def test_conditional_requests(self):
+        response = self.client.get("/feed/", HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(self.client.get("/feed/", HTTP_ACCEPT_ENCODING="gzip",
+                                         HTTP_IF_NONE_MATCH=response["ETag"]).status_code, 304)
+        # The gzipped and plain bodies are different representations with their own ETags.
+        self.assertEqual(self.client.get("/feed/", HTTP_IF_NONE_MATCH=response["ETag"]).status_code, 200)
+
+    def test_missing_object(self):
+        self.assertEqual(self.client.get("/developer/nobody/feed/atom/").status_code, 404)
@@ -0,0 +1,80 @@
+from django.test import TestCase
+from clapdb.cache import fragment, get_generations
+from clapdb.software import signals
+from clapdb.software.models import Category, Developer, Software
+from clapdb.software.testing import cold_caches
+from clapdb.software.views import LISTING_DEPENDENCIES
+
+
+class FragmentTests(TestCase):
+    """Rendered fragments are reused until a write they depend on commits, and only then."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name="Effects", slug="effects")
+        cls.developer = Developer.objects.create(name="Valhalla DSP", slug="valhalla-dsp", url="https://example.com")
+        with cls.captureOnCommitCallbacks(execute=True):
+            cls.software = Software.objects.create(name="Supermassive", developer=cls.developer,
+                                                   category=cls.category, url="https://example.com/supermassive")
+
+    def setUp(self):
+        cold_caches()
+
+    def render(self):
+        """Render a listing fragment and return its HTML and whether ``render`` ran."""
+        rendered = []
+
+        def render():
+            rendered.append(True)
+            return ", ".join(Software.objects.order_by("pk").values_list("name", flat=True))
+
+        return fragment("test-listing", LISTING_DEPENDENCIES, render), bool(rendered)
+
+    def test_reused_until_a_write(self):
+        self.assertEqual(self.render(), ("Supermassive", True))
+        self.assertEqual(self.render(), ("Supermassive", False))
+        self.software.name = "Shimmer"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.software.save()
+        self.assertEqual(self.render(), ("Shimmer", True))
+
+    def test_write_applies_on_commit(self):
+        self.render()
+        self.software.name = "Shimmer"
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            self.software.save()
+            # Until the transaction commits the generations, and so the fragment, stay as they were.
+            self.assertEqual(self.render(), ("Supermassive", False))
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.render(), ("Shimmer", True))
+
+    def test_related_writes(self):
+        self.render()
+        for instance, field in ((self.developer, "name"), (self.category, "name")):
+            generations = get_generations(*LISTING_DEPENDENCIES)
+            setattr(instance, field, "Renamed")
+            with self.captureOnCommitCallbacks(execute=True):
+                instance.save()
+            self.assertNotEqual(get_generations(*LISTING_DEPENDENCIES), generations, instance)
+            self.assertTrue(self.render()[1], instance)
+
+    def test_suspended_writes_wait_for_rebuild_all(self):
+        self.render()
+        with self.captureOnCommitCallbacks(execute=True), signals.suspended():
+            Software.objects.filter(pk=self.software.pk).update(name="Shimmer")
+            Software.objects.get(pk=self.software.pk).save()
+        self.assertEqual(self.render(), ("Supermassive", False))
+        with self.captureOnCommitCallbacks(execute=True):
+            signals.rebuild_all()
+        self.assertEqual(self.render(), ("Shimmer", True))
+
+    def test_pages_show_a_save_on_the_next_request(self):
+        paths = ["/", "/category/effects"]
+        for path in paths:
+            self.assertContains(self.client.get(path), "Supermassive")
+        self.software.name = "Shimmer"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.software.save()
+        for path in paths:
+            self.assertContains(self.client.get(path), "Shimmer", msg_prefix=path)
@@ -0,0 +1,62 @@
+import io
+import json
+import tempfile
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+from clapdb.software.importer import CatalogueError, CatalogueImport
+from clapdb.software.models import Category, Developer, Feature, Software
+
+
+class CatalogueImportTests(TestCase):
+    """Records are diffed against the titles as the records before them left them."""
+
+    @classmethod
+    def setUpTestData(cls):
+        Category.objects.create(name="Effects", slug="effects")
+        Feature.objects.create(name="Presets", slug="presets")
+        Feature.objects.create(name="Tail", slug="tail")
+        developer = Developer.objects.create(name="Valhalla DSP", slug="valhalla-dsp", url="https://example.com")
+        Software.objects.create(name="Shimmer", developer=developer, version="1.0")
+
+    def run_import(self, records):
+        lines = []
+        counts = CatalogueImport(lines.append).run(records)
+        return counts, lines
+
+    def test_records_in_one_batch(self):
+        counts, lines = self.run_import([
+            {"developer": "Valhalla DSP", "name": "Supermassive", "version": "1.0", "features": ["presets"]},
+            {"developer": "Valhalla DSP", "name": "Supermassive", "version": "1.1", "features": ["presets", "tail"]},
+            {"developer": "Valhalla DSP", "name": "Supermassive", "version": "1.1"},
+            {"developer": "Valhalla DSP", "name": "Shimmer", "version": "1.0"},
+        ])
+        self.assertEqual((counts["software created"], counts["software updated"], counts["software unchanged"]),
+                         (1, 1, 2))
+        self.assertEqual(lines, [
+            "create software valhalla-dsp/Supermassive: version '1.0', features ['presets']",
+            "update software valhalla-dsp/Supermassive: version '1.0' -> '1.1'",
+            "update software valhalla-dsp/Supermassive: features ['presets'] -> ['presets', 'tail']",
+        ])
+        software = Software.objects.get(name="Supermassive")
+        self.assertEqual(software.version, "1.1")
+        self.assertEqual(set(software.features.values_list("slug", flat=True)), {"presets", "tail"})
+
+    def test_overlong_value(self):
+        with self.assertRaisesMessage(CatalogueError, "Record 2: version is longer than 20 characters"):
+            self.run_import([{"developer": "Valhalla DSP", "name": "Shimmer"},
+                             {"developer": "Valhalla DSP", "name": "Shimmer", "version": "1" * 21}])
+        self.assertEqual(Software.objects.get(name="Shimmer").version, "1.0")
+
+    def test_dry_run_lists_changes(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".jsonl") as f:
+            f.write(json.dumps({"developer_slug": "valhalla-dsp", "name": "Shimmer", "version": "2.0"}) + "\n")
+            f.flush()
+            out = io.StringIO()
+            call_command("import_catalogue", f.name, "--dry-run", stdout=out)
+            with self.assertRaisesMessage(CommandError, "no developer with the slug 'nobody'"):
+                f.write(json.dumps({"developer_slug": "nobody", "name": "Shimmer"}) + "\n")
+                f.flush()
+                call_command("import_catalogue", f.name, stdout=io.StringIO())
+        self.assertIn("update software valhalla-dsp/Shimmer: version '1.0' -> '2.0'", out.getvalue())
+        self.assertIn("Dry run, nothing was written: 1 software updated.", out.getvalue())
+        self.assertEqual(Software.objects.get(name="Shimmer").version, "1.0")
@@ -0,0 +1,29 @@
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from clapdb.software import instrumentation
+from clapdb.software.testing import cold_caches
+
+
+class InstrumentationTests(TestCase):
+    """Every request is reported; only staff and DEBUG see the Server-Timing header."""
+
+    def setUp(self):
+        cold_caches()
+        instrumentation.reset()
+
+    def test_anonymous(self):
+        response = self.client.get("/stats/")
+        self.assertNotIn("Server-Timing", response)
+        self.assertEqual(instrumentation.report()["stats"]["requests"], 1)
+
+    def test_staff(self):
+        self.client.force_login(User.objects.create_user("staff", is_staff=True))
+        response = self.client.get("/stats/")
+        self.assertIn("db;dur=", response["Server-Timing"])
+        self.assertIn("private", response["Cache-Control"])
+        self.client.force_login(User.objects.create_user("member"))
+        self.assertNotIn("Server-Timing", self.client.get("/stats/"))
+
+    @override_settings(DEBUG=True)
+    def test_debug(self):
+        self.assertIn("Server-Timing", self.client.get("/stats/"))
@@ -0,0 +1,130 @@
+from django.db.models.functions import Lower
+from django.test import TestCase, override_settings
+from clapdb.benchmarks.catalogue import generate
+from clapdb.cache import local_cache
+from clapdb.software import signals
+from clapdb.software.listing import build_listings
+from clapdb.software.models import Category, Feature, Software, SoftwareListing
+from clapdb.software.pagination import encode_cursor
+from clapdb.software.testing import cold_caches
+
+PAGE_SIZE = 7
+
+
+@override_settings(CDB_PAGE_SIZE=PAGE_SIZE)
+class CategoryListingTests(TestCase):
+    """Category listings page by keyset, in developer groups, and cache only their first page."""
+
+    @classmethod
+    def setUpTestData(cls):
+        with cls.captureOnCommitCallbacks(execute=True):
+            generate(60, developers=5, categories=2, features=4)
+        cls.category = Category.objects.order_by("pk").first()
+        cls.path = f"/category/{cls.category.slug}"
+
+    def setUp(self):
+        cold_caches()
+
+    def page(self, **cursors):
+        response = self.client.get(self.path, cursors)
+        self.assertEqual(response.status_code, 200)
+        return response.context["page_obj"]
+
+    def expected(self):
+        return list(SoftwareListing.objects
+                    .filter(active=True, developer_id__isnull=False, category_slug=self.category.slug)
+                    .order_by(Lower("developer_name"), "developer_id", Lower("name"), "pk")
+                    .values_list("pk", flat=True))
+
+    def test_walk(self):
+        pks, page, pages = [], self.page(), []
+        while page:
+            pks += [row.pk for row in page]
+            pages.append(page)
+            page = self.page(after=page.next_cursor()) if page.has_next() else None
+        self.assertEqual(pks, self.expected())
+        # A developer's group split over two pages is marked on both.
+        for previous, following in zip(pages, pages[1:]):
+            split = list(previous)[-1].developer_id == list(following)[0].developer_id
+            self.assertEqual((previous.continues, following.continued), (split, split))
+        backwards = self.page(before=pages[1].previous_cursor())
+        self.assertEqual([row.pk for row in backwards], [row.pk for row in pages[0]])
+
+    def test_cursor_of_a_deleted_row(self):
+        first = self.page()
+        cursor = first.next_cursor()
+        with self.captureOnCommitCallbacks(execute=True):
+            Software.objects.filter(pk=list(first)[-1].pk).delete()
+        # The cursor holds the row's sort keys, so the next page follows on from where it was.
+        self.assertEqual([row.pk for row in self.page(after=cursor)], self.expected()[PAGE_SIZE - 1:PAGE_SIZE * 2 - 1])
+
+    def test_forged_cursors(self):
+        for cursor in ("not a cursor", encode_cursor(["a", "b", "c", "d"]), encode_cursor([1, 2, 3])):
+            self.assertEqual(self.client.get(self.path, {"after": cursor}).status_code, 404, cursor)
+
+    def test_only_the_first_page_is_cached(self):
+        def fragments():
+            return sum(1 for key in local_cache.entries if key.startswith("cdb:fragment:"))
+
+        first = self.page()
+        self.assertEqual(fragments(), 1)
+        self.page(after=first.next_cursor())
+        self.page(after=encode_cursor(["zzz", 1, "zzz", 1]))
+        self.assertEqual(fragments(), 1)
+
+
+class ListingMaintenanceTests(TestCase):
+    """Every write to a title, or to what it shows of its developer, category and features, rewrites its row."""
+
+    @classmethod
+    def setUpTestData(cls):
+        with cls.captureOnCommitCallbacks(execute=True):
+            generate(20, developers=3, categories=2, features=4)
+        cls.software = Software.objects.filter(developer__isnull=False, category__isnull=False).first()
+
+    def assertListingsCurrent(self):
+        def columns(listing):
+            return {field.attname: getattr(listing, field.attname) for field in SoftwareListing._meta.fields}
+
+        stored = {listing.pk: columns(listing) for listing in SoftwareListing.objects.all()}
+        built = {listing.pk: columns(listing) for listing in build_listings(Software.objects.all())}
+        self.assertEqual(stored, built)
+
+    def write(self, action):
+        with self.captureOnCommitCallbacks(execute=True):
+            action()
+        self.assertListingsCurrent()
+
+    def test_software_writes(self):
+        self.assertListingsCurrent()
+        software = self.software
+        software.name, software.windows, software.linux = "Renamed", True, False
+        self.write(software.save)
+        self.write(lambda: Software.objects.create(name="New", developer=software.developer,
+                                                   category=software.category, mac=True))
+        self.write(software.delete)
+        self.assertFalse(SoftwareListing.objects.filter(pk=self.software.pk).exists())
+
+    def test_developer_and_category_writes(self):
+        developer, category = self.software.developer, self.software.category
+        developer.name, developer.slug = "Renamed", "renamed"
+        self.write(developer.save)
+        category.name, category.sequence = "Renamed", 99
+        self.write(category.save)
+        self.write(developer.delete)
+        self.assertIsNone(SoftwareListing.objects.get(pk=self.software.pk).developer_id)
+
+    def test_feature_writes(self):
+        feature = Feature.objects.create(name="Sidechain", slug="sidechain")
+        self.write(lambda: self.software.features.add(feature))
+        self.assertIn(feature.pk, SoftwareListing.objects.get(pk=self.software.pk).feature_ids)
+        self.write(lambda: feature.software_set.clear())
+        self.write(lambda: feature.software_set.add(self.software))
+        self.write(feature.delete)
+        self.assertNotIn(feature.pk, SoftwareListing.objects.get(pk=self.software.pk).feature_ids)
+
+    def test_rebuild(self):
+        with signals.suspended():
+            Software.objects.filter(pk=self.software.pk).update(name="Bulk")
+            SoftwareListing.objects.filter(pk__in=Software.objects.values("pk")[:3]).delete()
+        self.write(signals.rebuild_all)
@@ -0,0 +1,73 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase
+from clapdb.software import signals
+from clapdb.software.middleware import PageCacheMiddleware
+from clapdb.software.models import Category, Developer, Software
+from clapdb.software.testing import cold_caches
+
+
+class PageCacheTests(TestCase):
+    """Anonymous GETs are served from the page cache until a page they depend on changes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name="Effects", slug="effects")
+        cls.developer = Developer.objects.create(name="Valhalla DSP", slug="valhalla-dsp", url="https://example.com")
+        with cls.captureOnCommitCallbacks(execute=True):
+            cls.software = Software.objects.create(name="Supermassive", developer=cls.developer,
+                                                   category=cls.category, url="https://example.com/supermassive")
+            cls.other = Software.objects.create(name="Shimmer", developer=cls.developer, category=cls.category)
+
+    def setUp(self):
+        cold_caches()
+
+    def rename_silently(self, name):
+        """Rename the title without signals, so only an uncached request can see it."""
+        with signals.suspended():
+            Software.objects.filter(pk=self.software.pk).update(name=name)
+
+    def test_anonymous_reads_are_cached(self):
+        for path in ("/", f"/software/{self.software.pk}/", "/developer/valhalla-dsp", "/category/effects",
+                     "/stats/"):
+            content = self.client.get(path).content
+            with self.assertNumQueries(0):
+                response = self.client.get(path)
+            self.assertEqual(response.content, content, path)
+
+    def test_dependent_write_invalidates(self):
+        path = f"/software/{self.software.pk}/"
+        self.client.get(path)
+        self.software.name = "Supermassive 2"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.software.save()
+        self.assertContains(self.client.get(path), "Supermassive 2")
+
+    def test_unrelated_write_keeps_the_page(self):
+        path = f"/software/{self.software.pk}/"
+        self.client.get(path)
+        self.other.version = "2.0"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.other.save()
+        with self.assertNumQueries(0):
+            self.client.get(path)
+
+    def test_session_cookie_bypasses(self):
+        path = f"/software/{self.software.pk}/"
+        self.client.get(path)
+        self.rename_silently("Renamed")
+        self.assertNotContains(self.client.get(path), "Renamed")
+        self.client.cookies[settings.SESSION_COOKIE_NAME] = "unknown"
+        self.assertContains(self.client.get(path), "Renamed")
+
+    def test_search_is_not_cached(self):
+        factory = RequestFactory()
+        for method in ("get", "post"):
+            getattr(self.client, method)("/search/", {"title": "supermassive"} if method == "post" else {})
+            request = getattr(factory, method)("/search/")
+            self.assertIsNone(cache.get(PageCacheMiddleware.key(request)), method)
+
+    def test_errors_are_not_cached(self):
+        self.assertEqual(self.client.get("/developer/nobody").status_code, 404)
+        Developer.objects.create(name="Nobody", slug="nobody", url="https://example.com")
+        self.assertEqual(self.client.get("/developer/nobody").status_code, 200)
@@ -0,0 +1,69 @@
+import random
+from django.test import TestCase
+from clapdb.benchmarks.catalogue import generate
+from clapdb.software import signals
+from clapdb.software.models import Category, Developer, Feature, Software
+from clapdb.software.testing import QueryBudgetMixin
+
+
+class QueryBudgetTests(QueryBudgetMixin, TestCase):
+    """Every public view stays within its query budget with cold caches, however large the catalogue."""
+
+    @classmethod
+    def setUpTestData(cls):
+        # The listings, search documents and statistics are rebuilt when the transaction commits.
+        with cls.captureOnCommitCallbacks(execute=True):
+            generate(60, developers=6, categories=4, features=6)
+        cls.software = Software.objects.select_related("developer").filter(active=True).first()
+        # Generated names are "<adjective> <noun> <n>"; each search matches titles before and after growing.
+        cls.noun = cls.software.name.split()[1]
+        cls.searches = [{"title": cls.noun}, {"developer": cls.software.developer.name.split()[0]},
+                        {"free": "on", "mac": "on"}]
+
+    def grow(self):
+        """Add titles with features to every developer and category, then rebuild the derived data."""
+        rng = random.Random(1)
+        developers, categories = list(Developer.objects.all()), list(Category.objects.all())
+        features = list(Feature.objects.all())
+        with self.captureOnCommitCallbacks(execute=True):
+            software = Software.objects.bulk_create(
+                Software(name=f"Grown {self.noun} {i}", developer=rng.choice(developers),
+                         category=rng.choice(categories), url=f"https://example.com/grown/{i}",
+                         free=i % 3 == 0, mac=True)
+                for i in range(240))
+            through = Software.features.through
+            through.objects.bulk_create(through(software_id=item.pk, feature_id=feature.pk)
+                                        for item in software for feature in rng.sample(features, 2))
+            signals.rebuild_all()
+
+    def paths(self):
+        developer, category = self.software.developer.slug, self.software.category.slug
+        return {
+            "home": "/",
+            "software": f"/software/{self.software.pk}/",
+            "developer": f"/developer/{developer}",
+            "developer-list": "/developers/",
+            "software-list-category": f"/category/{category}",
+            "search": "/search/",
+            "stats": "/stats/",
+            "feed": "/feed/",
+            "feed-format": "/feed/atom/",
+            "category-feed": f"/category/{category}/feed/rss/",
+            "developer-feed": f"/developer/{developer}/feed/json/",
+            "autocomplete": f"/autocomplete/?kind=developer&q={self.software.developer.name[:3]}",
+            "api-list": "/api/v1/software/",
+            "api-detail": f"/api/v1/software/{self.software.pk}/",
+        }
+
+    def test_views(self):
+        paths = self.paths()
+        # A prefix that completes to something, so the budget covers the lookup and not an empty answer.
+        self.assertTrue(self.client.get(paths["autocomplete"]).json()["results"])
+        self.assertQueryBudgets(paths, grow=self.grow)
+
+    def test_search(self):
+        before = [self.assertQueryBudget("search", "/search/", "post", data) for data in self.searches]
+        self.grow()
+        after = [self.assertQueryBudget("search", "/search/", "post", data) for data in self.searches]
+        for data, queries, grown in zip(self.searches, before, after):
+            self.assertLessEqual(grown, queries, f"search {data} issues more queries as the fixture grows")
@@ -0,0 +1,63 @@
+from unittest import skipUnless
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from clapdb.software.models import Category, Developer, Software, SoftwareListing
+from clapdb.software.search import get_search_backend
+
+
+class SearchBackendTests(TestCase):
+    """The search backend matches substrings of the search documents and ranks the closer matches first."""
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name="Effects", slug="effects")
+        developer = Developer.objects.create(name="Valhalla DSP", slug="valhalla-dsp", url="https://example.com")
+        other = Developer.objects.create(name="Other Audio", slug="other-audio", url="https://example.com")
+        # Search documents are written when the transaction commits.
+        with cls.captureOnCommitCallbacks(execute=True):
+            cls.exact = Software.objects.create(name="Echo", developer=developer, category=category)
+            cls.longer = Software.objects.create(name="Echo Chamber Deluxe Edition Pro", developer=other,
+                                                 category=category)
+            cls.unrelated = Software.objects.create(name="Shimmer", developer=developer, category=category,
+                                                    notes="<p>An echo with pitch shifting</p>")
+
+    def setUp(self):
+        self.backend = get_search_backend()
+
+    def test_title_match(self):
+        found = self.backend.search(SoftwareListing.objects.all(), title="ECHO")
+        self.assertEqual({row.pk for row in found}, {self.exact.pk, self.longer.pk})
+
+    def test_body_and_developer_match(self):
+        found = self.backend.search(Software.objects.all(), text="pitch shift")
+        self.assertEqual([row.pk for row in found], [self.unrelated.pk])
+        found = self.backend.search(Software.objects.all(), developer="valhalla", title="echo")
+        self.assertEqual([row.pk for row in found], [self.exact.pk])
+
+    def test_ranks_agree_with_search(self):
+        for terms in ({"title": "echo"}, {"text": "echo"}, {"title": "ec"}, {"developer": "dsp", "title": "e"}):
+            ranked = self.backend.search(SoftwareListing.objects.all(), **terms).values_list("pk", "search_rank")
+            self.assertEqual(self.backend.ranks(**terms), dict(ranked), terms)
+        self.assertIsNone(self.backend.ranks(title="  "))
+
+    def test_rank_order(self):
+        ranks = self.backend.ranks(title="echo")
+        self.assertGreater(ranks[self.exact.pk], ranks[self.longer.pk])
+        ordered = self.backend.search(SoftwareListing.objects.all(), title="echo").order_by("-search_rank", "-pk")
+        self.assertEqual(list(ordered.values_list("pk", flat=True)), [self.exact.pk, self.longer.pk])
+
+    @skipUnless(connection.vendor == "sqlite", "FTS5 is SQLite's")
+    def test_fts_match_runs_once(self):
+        queryset = self.backend.search(SoftwareListing.objects.all(), title="echo").order_by("-search_rank")
+        with CaptureQueriesContext(connection) as queries:
+            rows = list(queryset.filter(search_rank__lt=100).values_list("pk", "search_rank"))
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(len(queries), 1)
+        # Joined once, not a correlated subquery per candidate row.
+        self.assertEqual(queries[0]["sql"].count("MATCH"), 1)
+
+    @skipUnless(connection.vendor == "sqlite", "FTS5 is SQLite's")
+    def test_short_terms(self):
+        # The trigram tokenizer cannot MATCH fewer than three characters; such terms are matched unranked.
+        self.assertEqual(self.backend.ranks(title="ec"), {self.exact.pk: 0.0, self.longer.pk: 0.0})
@@ -0,0 +1,127 @@
+import re
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from clapdb.benchmarks.catalogue import generate
+from clapdb.software.models import Software, SoftwareListing
+from clapdb.software.pagination import KeysetPaginator, encode_cursor
+from clapdb.software.search import get_search_backend
+from clapdb.software.testing import cold_caches
+from clapdb.software.views import SEARCH_ORDER
+
+PAGE_SIZE = 5
+
+
+@override_settings(CDB_PAGE_SIZE=PAGE_SIZE)
+class SearchViewTests(TestCase):
+    """Searches page through the facet bitmap and text matches intersected in Python."""
+
+    @classmethod
+    def setUpTestData(cls):
+        with cls.captureOnCommitCallbacks(execute=True):
+            generate(80, developers=6, categories=4, features=6)
+        # Generated names are "<adjective> <noun> <n>".
+        cls.noun = Software.objects.filter(active=True).first().name.split()[1]
+
+    def setUp(self):
+        # The generations live in the cache, which the rollback of the previous test leaves behind.
+        cold_caches()
+
+    def search(self, data, **cursors):
+        response = self.client.post("/search/", {**data, **cursors})
+        self.assertEqual(response.status_code, 200)
+        return response.context["page_obj"]
+
+    def walk(self, data):
+        pks, page = [], self.search(data)
+        while page:
+            pks += [row.pk for row in page]
+            page = self.search(data, after=page.next_cursor()) if page.has_next() else None
+        return pks
+
+    def expected(self, **terms):
+        listings = SoftwareListing.objects.filter(active=True, developer_id__isnull=False)
+        software = get_search_backend().search(listings, **terms)
+        paginator = KeysetPaginator(software, SEARCH_ORDER, PAGE_SIZE)
+        return list(paginator.queryset.order_by(*paginator.order_by()).values_list("pk", flat=True))
+
+    def test_results_in_search_order(self):
+        self.assertEqual(self.walk({"title": self.noun}), self.expected(title=self.noun))
+        expected = [pk for pk in self.expected() if Software.objects.get(pk=pk).mac]
+        self.assertEqual(self.walk({"mac": "on"}), expected)
+
+    def test_only_page_ids_reach_the_database(self):
+        with CaptureQueriesContext(connection) as queries:
+            page = self.search({"mac": "on"})
+        self.assertTrue(page.has_next())
+        lists = [match.count(",") + 1 for query in queries for match in re.findall(r" IN \(([^()]*)\)", query["sql"])]
+        self.assertLessEqual(max(lists, default=0), PAGE_SIZE + 1)
+
+    def test_cursor_of_a_row_that_left_the_results(self):
+        # A facet search, whose results are unranked: a change to the text index would move the ranks.
+        data = {"mac": "on"}
+        first = self.search(data)
+        following = self.walk(data)[PAGE_SIZE:PAGE_SIZE * 2]
+        for field in ("mac", "active"):
+            software = Software.objects.get(pk=list(first)[-1].pk)
+            setattr(software, field, False)
+            with self.captureOnCommitCallbacks(execute=True):
+                software.save()
+            # The row is placed by the cursor's key, so the next page starts where it left off.
+            page = self.search(data, after=first.next_cursor())
+            self.assertEqual([row.pk for row in page], following, field)
+
+    def test_stale_and_forged_cursors(self):
+        data = {"title": self.noun}
+        first = [row.pk for row in self.search(data)]
+        missing = encode_cursor(["", 0, 0, 0.0, "", Software.objects.order_by("pk").last().pk + 1])
+        self.assertEqual([row.pk for row in self.search(data, after=missing)], first)
+        response = self.client.post("/search/", {**data, "after": "not a cursor"})
+        self.assertEqual(response.status_code, 404)
+
+
+class SearchCacheTests(TestCase):
+    """Repeated searches are served from the cached ordered ids, with one query for the rows of the page."""
+
+    @classmethod
+    def setUpTestData(cls):
+        with cls.captureOnCommitCallbacks(execute=True):
+            generate(40, developers=4, categories=3, features=4)
+        cls.software = Software.objects.filter(active=True).first()
+        cls.noun = cls.software.name.split()[1]
+
+    def setUp(self):
+        cold_caches()
+
+    def repeat(self, data):
+        """Search for ``data`` twice and return the pks found and the queries of the second search."""
+        self.client.post("/search/", data)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post("/search/", data)
+        return [row.pk for row in response.context["page_obj"]], len(queries)
+
+    def test_equivalent_searches_share_results(self):
+        self.client.post("/search/", {"title": f" {self.noun.upper()}  "})
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post("/search/", {"title": self.noun.lower()})
+        self.assertIn(self.software.pk, [row.pk for row in response.context["page_obj"]])
+        self.assertEqual(len(queries), 1)
+
+    def test_results_are_cached_within_the_byte_limit(self):
+        found, queries = self.repeat({"title": self.noun})
+        self.assertEqual(queries, 1)
+        # Eight bytes for each id and eight for each rank.
+        with self.settings(CDB_SEARCH_CACHE_MAX_BYTES=16 * len(found)):
+            cold_caches()
+            self.assertEqual(self.repeat({"title": self.noun}), (found, 1))
+        with self.settings(CDB_SEARCH_CACHE_MAX_BYTES=16 * len(found) - 1):
+            cold_caches()
+            self.assertEqual(self.repeat({"title": self.noun}), (found, 2))
+
+    def test_write_invalidates_results(self):
+        found, queries = self.repeat({"title": self.noun})
+        self.software.name = "Renamed"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.software.save()
+        # The ranks of the others may move with the index statistics.
+        self.assertCountEqual(self.repeat({"title": self.noun})[0], [pk for pk in found if pk != self.software.pk])
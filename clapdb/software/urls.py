@@ -1,13 +1,49 @@
-from django.urls import path
-from . import views
+from django.conf import settings
+from django.urls import path, register_converter
+from . import api, views
+from .autocomplete import autocomplete
+from .feeds import FormatConverter
+
+register_converter(FormatConverter, "feed")
+
+if getattr(settings, "CDB_ASYNC_VIEWS", False):
+    from . import async_views
+
+    read_views = {
+        "home": async_views.home,
+        "software": async_views.software_detail,
+        "developer": async_views.developer_detail,
+        "developer-list": async_views.developer_list,
+        "software-list-category": async_views.category_list,
+        "stats": async_views.stats,
+        "feed": async_views.feed,
+    }
+else:
+    read_views = {
+        "home": views.home,
+        "software": views.SoftwareDetailView.as_view(),
+        "developer": views.DeveloperDetailView.as_view(),
+        "developer-list": views.DeveloperListView.as_view(),
+        "software-list-category": views.CategoryListView.as_view(),
+        "stats": views.stats,
+        "feed": views.feed,
+    }
 
 urlpatterns = [
-    path("", views.home, name="home"),
-    path("software/<int:pk>/", views.SoftwareDetailView.as_view(), name="software",),
-    path("developer/<slug:slug>", views.DeveloperDetailView.as_view(), name="developer", ),
-    path("developers/", views.DeveloperListView.as_view(), name="developer-list", ),
-    path("category/<slug:slug>", views.CategoryListView.as_view(), name="software-list-category"),
+    path("", read_views["home"], name="home"),
+    path("software/<int:pk>/", read_views["software"], name="software",),
+    path("developer/<slug:slug>", read_views["developer"], name="developer", ),
+    path("developers/", read_views["developer-list"], name="developer-list", ),
+    path("category/<slug:slug>", read_views["software-list-category"], name="software-list-category"),
     path("search/", views.SearchView.as_view(), name="search"),
-    path("stats/", views.stats, name="stats"),
-    path("feed/", views.RecentUpdatesFeed()),
+    path("stats/", read_views["stats"], name="stats"),
+    path("feed/", read_views["feed"], name="feed"),
+    path("feed/<feed:format>/", read_views["feed"], name="feed-format"),
+    path("category/<slug:slug>/feed/<feed:format>/", read_views["feed"], {"scope": "category"},
+         name="category-feed"),
+    path("developer/<slug:slug>/feed/<feed:format>/", read_views["feed"], {"scope": "developer"},
+         name="developer-feed"),
+    path("autocomplete/", autocomplete, name="autocomplete"),
+    path("api/v1/<str:resource>/", api.resource_list, name="api-list"),
+    path("api/v1/<str:resource>/<int:pk>/", api.resource_detail, name="api-detail"),
 ]
@@ -1,92 +1,322 @@
+import bisect
+import hashlib
+import json
 import operator
+from array import array
 from functools import reduce
+from itertools import repeat
+from django.core.cache import cache
 from django.shortcuts import render
+from django.template.loader import render_to_string
 from django.views.generic.list import ListView
 from django.views.generic.edit import FormView
 from django.views.generic.detail import DetailView
-from django.db.models import Count, Q, QuerySet
-from django.db.models.functions import Lower
+from django.db.models import FloatField, QuerySet, Value
+from django.db.models.functions import Coalesce, Lower
 from django.utils import timezone as tz
-from django.http import JsonResponse
+from django.http import Http404
 from django.urls import reverse_lazy, reverse
 from django import forms
 from django.conf import settings
-from django.contrib.syndication.views import Feed
-from .models import Category, Software, Developer, Feature
+from clapdb.cache import fragment, get_generations, local_cache
+from .models import Category, Software, SoftwareListing, Developer
+from . import feeds, reference
+from . import stats as catalogue_stats
+from .conditional import conditional_get, conditional_page
+from .facets import FLAGS, bit_ids, facet_index
+from .pagination import InvalidCursor, KeysetPaginator, OrderedKeysetPaginator
+from .search import fold, get_search_backend
 
 
-def home(request):
-    recent_updates = Software\
-        .objects.select_related("developer", "category")\
+OS_LABELS = (("mac", "Mac"), ("windows", "Windows"), ("linux", "Linux"))
+
+# Rendered listings depend only on these tables.
+LISTING_DEPENDENCIES = ("software", "developer", "category")
+
+# Keyset sort keys of the developer-grouped listings: (annotation, expression, descending). The first two
+# identify the developer group; see clapdb.software.pagination.
+LISTING_ORDER = (("sort_developer", Lower("developer_name"), False), ("developer_id", None, False),
+                 ("sort_name", Lower("name"), False))
+SEARCH_ORDER = LISTING_ORDER[:2] + (("sort_category", Coalesce("category_sequence", Value(0)), False),
+                                    ("search_rank", None, True)) + LISTING_ORDER[2:]
+DEVELOPER_ORDER = (("sort_name", Lower("name"), False),)
+
+
+def keyset_page(queryset, keys, cursors, group_by=1):
+    """Return the page of ``queryset`` addressed by the ``after``/``before`` cursor in ``cursors``."""
+    try:
+        return KeysetPaginator(queryset, keys, settings.CDB_PAGE_SIZE, group_by)\
+            .page(after=cursors.get("after"), before=cursors.get("before"))
+    except InvalidCursor as e:
+        raise Http404(str(e))
+
+
+class KeysetListMixin:
+    """Keyset pagination for a ListView; ``object_list`` becomes the page and is fetched on first use."""
+    keyset = None
+    keyset_group_by = 1
+
+    def get_paginate_by(self, queryset):
+        return settings.CDB_PAGE_SIZE
+
+    def paginate_queryset(self, queryset, page_size):
+        page = keyset_page(queryset, self.keyset, self.request.GET, self.keyset_group_by)
+        return page.paginator, page, page, True
+
+
+def recent_updates():
+    return SoftwareListing.objects\
         .filter(created__gte=tz.now()-tz.timedelta(days=settings.CDB_RECENT_UPDATES_DAYS))\
         .filter(active=True)\
         .order_by("-created")[:settings.CDB_RECENT_UPDATES_MAX]
+
+
+def render_recent_updates():
+    return render_to_string("software/recent_updates_fragment.html", {"recent_updates": recent_updates()})
+
+
+# The recent updates are those of the last CDB_RECENT_UPDATES_DAYS days.
+@conditional_page("software", "developer", "snippets", dated=True)
+def home(request):
     context = {
-        "recent_updates": recent_updates,
+        "recent_updates": fragment("recent-updates", LISTING_DEPENDENCIES, vary=[tz.now().date()],
+                                   render=render_recent_updates),
     }
     return render(request, 'home.html', context=context)
 
 
-def stats(request):
-    context = {
-        "categories": Category.objects.annotate(software_count=Count("software")).order_by("sequence"),
-        "developer_count": Developer.objects.count(),
-        "software_count": Software.objects.count(),
-        "free_count": Software.objects.filter(free=True).count(),
+def stats_context(counters, categories, features):
+    return {
+        "category_counts": [(category, counters[f"category:{category.pk}"]) for category in categories],
+        "os_counts": [(label, counters[f"os:{name}"]) for name, label in OS_LABELS],
+        "feature_counts": [(feature, counters[f"feature:{feature.pk}"]) for feature in features],
+        "developer_count": counters["developers"],
+        "software_count": counters["software"],
+        "active_count": counters["active"],
+        "inactive_count": counters["inactive"],
+        "free_count": counters["free"],
+        "paid_count": counters["paid"],
     }
+
+
+@conditional_page("software", "developer", "feature")
+def stats(request):
+    context = stats_context(catalogue_stats.get(), reference.categories(), reference.features())
     return render(request, "software/stats.html", context=context)
 
 
+@conditional_get("software:{pk}")
 class SoftwareDetailView(DetailView):
     model = Software
     template_name = "software/software.html"
 
+    def get_queryset(self):
+        return software_detail_queryset()
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context["osses"] = ", ".join(self.object.osses)
         return context
 
 
-class CategoryListView(ListView):
-    model = Software
+def software_detail_queryset():
+    return Software.objects.select_related("developer", "category").prefetch_related("features")
+
+
+def category_for_slug(slug, categories):
+    category = next((category for category in categories if category.slug == slug), None)
+    if category is None:
+        raise Http404("No category found matching the query")
+    return category
+
+
+def category_listing_queryset(slug):
+    # Titles without a developer have no group to be listed under.
+    return SoftwareListing.objects.filter(active=True, developer_id__isnull=False, category_slug=slug)
+
+
+def category_listing(page, slug, cursors, cached=fragment):
+    # Only the first page is kept: a cursor is whatever the client sends, so fragments keyed on cursors
+    # would let anyone fill the cache.
+    return cached("category-listing", LISTING_DEPENDENCIES, vary=[slug, settings.CDB_PAGE_SIZE],
+                  store=not (cursors.get("after") or cursors.get("before")),
+                  render=lambda: render_to_string("software/category_fragment.html",
+                                                  {"object_list": page, "page_obj": page}))
+
+
+@conditional_get("category:{slug}", "developer")
+class CategoryListView(KeysetListMixin, ListView):
+    model = SoftwareListing
     template_name = "software/software_list.html"
+    keyset = LISTING_ORDER
+    keyset_group_by = 2
 
     def get_queryset(self, *args, **kwargs):
-        qs = super().get_queryset().select_related("developer").order_by(Lower("developer__name"), Lower("name")).filter(active=True)
-        if "slug" in self.kwargs:
-            qs = qs.filter(category__slug=self.kwargs["slug"])
-        return qs
+        return category_listing_queryset(self.kwargs["slug"])
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        if "slug" in self.kwargs:
-            context["category"] = Category.objects.get(slug=self.kwargs["slug"])
+        context["category"] = category_for_slug(self.kwargs["slug"], reference.categories())
+        context["software_listing"] = category_listing(context["page_obj"], self.kwargs["slug"], self.request.GET)
         return context
 
 
-# For retrieving data with autocomplete.js
-def get_developers():
-    result = Developer.objects.order_by(Lower("name")).values_list("name", flat=True).distinct()
-    return JsonResponse({"status": 200, "data": result})
+def search_key(cleaned_data):
+    """Return the cache key of a search: equivalent forms (case, spacing, feature order) share one."""
+    query = {"developer": fold(cleaned_data["developer"]),
+             "title": fold(cleaned_data["title"]),
+             "category": cleaned_data["category"].pk if cleaned_data["category"] else None,
+             "features": sorted(int(pk) for pk in cleaned_data["features"]),
+             **{name: cleaned_data[name] for name in FLAGS}}
+    query = {name: value for name, value in query.items() if value}
+    generations = get_generations(*LISTING_DEPENDENCIES)
+    return "cdb:search:" + hashlib.md5(json.dumps([query, generations], sort_keys=True).encode()).hexdigest()
+
+
+def listed_titles():
+    """Return a KeysetPaginator over the titles a search can list, in SEARCH_ORDER without the rank."""
+    listings = SoftwareListing.objects.filter(active=True, developer_id__isnull=False)
+    return KeysetPaginator(listings, [key for key in SEARCH_ORDER if key[0] != "search_rank"], settings.CDB_PAGE_SIZE)
+
+
+def search_order():
+    """
+    Return ``(order, groups)`` for every title a search can list, in SEARCH_ORDER without the rank.
+
+    ``order`` maps a primary key to ``(group, position)``: ``group`` numbers the developer and category
+    groups in order and ``position`` is the title's place in the listing, so sorting matches on
+    ``(group, -rank, position)`` puts them in SEARCH_ORDER. ``groups`` holds the first position and the
+    group keys of each group. Both are read with one query and kept in the process for the current listing
+    generations.
+    """
+    generations = get_generations(*LISTING_DEPENDENCIES)
+    key = "cdb:search-order:" + ":".join(f"{name}={generations[name]}" for name in LISTING_DEPENDENCIES)
+    cached = local_cache.get(key)
+    if cached is None:
+        paginator = listed_titles()
+        rows = paginator.queryset.order_by(*paginator.order_by())\
+            .values_list("pk", "sort_developer", "developer_id", "sort_category")
+        order, groups = {}, []
+        for position, (pk, *group_key) in enumerate(rows):
+            if not groups or groups[-1][1:] != tuple(group_key):
+                groups.append((position, *group_key))
+            order[pk] = (len(groups) - 1, position)
+        cached = order, groups
+        local_cache.set(key, cached)
+    return cached
+
+
+def match_results(selection, developer="", title=""):
+    """
+    Return ``(pks, ranks)`` for the listed titles of the facet ``selection`` bitmap that match the developer
+    and title terms, in SEARCH_ORDER; ``ranks`` holds the search rank of each, or is None when there are no
+    terms to rank by. The text matches are read from the search backend's ``ranks`` and intersected with
+    the bitmap in Python, so the database only ever receives the ids of a page.
+    """
+    matches = get_search_backend().ranks(developer=developer, title=title)
+    order, groups = search_order()
+    selected = set(bit_ids(selection))
+    if matches is None:
+        return array("q", (pk for pk in order if pk in selected)), None
+    results = sorted(((pk, rank) for pk, rank in matches.items() if pk in selected and pk in order),
+                     key=lambda result: (order[result[0]][0], -result[1], order[result[0]][1]))
+    return array("q", (pk for pk, rank in results)), array("d", (rank for pk, rank in results))
+
+
+def search_results(key, selection, developer="", title=""):
+    """
+    Return ``match_results`` of a search, cached under ``key`` as packed arrays unless they take more than
+    ``CDB_SEARCH_CACHE_MAX_BYTES``.
+    """
+    cached = cache.get(key)
+    if cached is not None:
+        pks, ranks = array("q"), None
+        pks.frombytes(cached[0])
+        if cached[1] is not None:
+            ranks = array("d")
+            ranks.frombytes(cached[1])
+        return pks, ranks
+    pks, ranks = match_results(selection, developer, title)
+    packed = (pks.tobytes(), ranks.tobytes() if ranks is not None else None)
+    if len(packed[0]) + len(packed[1] or b"") <= settings.CDB_SEARCH_CACHE_MAX_BYTES:
+        cache.set(key, packed, timeout=settings.CDB_SEARCH_CACHE_TIMEOUT)
+    return pks, ranks
+
+
+def locate_cursor(cursor, pks, ranks):
+    """
+    Return how many of the results ``pks`` sort before a SEARCH_ORDER ``cursor`` whose row is not among
+    them: it left the results or came from another search. The database counts the listed titles before
+    the cursor, so its place among them follows the database's collation, and the rank decides within its
+    group.
+    """
+    paginator = listed_titles()
+    values = cursor[:3] + cursor[4:]
+    position = paginator.queryset.filter(paginator.beyond(values, reverse=True)).count()
+    order, groups = search_order()
+    if not groups:
+        return 0
+    # The group holding the first title after the cursor, or the last group past the end.
+    group = bisect.bisect_right([first for first, *group_key in groups], position) - 1
+    if groups[group][1:] == tuple(cursor[:3]):
+        within = group
+    elif group > 0 and groups[group - 1][1:] == tuple(cursor[:3]):
+        within = group - 1
+    else:
+        # The cursor's group is gone: it sorts between two groups.
+        within = group - 0.5 if position < len(order) else group + 0.5
+    keys = [(order[pk][0], -rank, order[pk][1]) for pk, rank in zip(pks, ranks or repeat(0.0))]
+    return bisect.bisect_left(keys, (within, -cursor[3], position - 0.5))
+
+
+def search_page(queryset, pks, ranks, cursors):
+    """Return the page of the results addressed by ``cursors``; a cursor outside them is placed by its key."""
+    if ranks is None:
+        queryset, extra = queryset.annotate(search_rank=Value(0.0, output_field=FloatField())), None
+    else:
+        extra = {pk: {"search_rank": rank} for pk, rank in zip(pks, ranks)}
+    paginator = OrderedKeysetPaginator(queryset, SEARCH_ORDER, settings.CDB_PAGE_SIZE, pks, extra,
+                                       group_by=2, locate=lambda cursor: locate_cursor(cursor, pks, ranks))
+    try:
+        return paginator.page(after=cursors.get("after"), before=cursors.get("before"))
+    except InvalidCursor as e:
+        raise Http404(str(e))
+
+
+# The client-side search index of a static export, written next to the search page (see static_export.py).
+SEARCH_INDEX = "index.json"
 
 
 class SearchForm(forms.Form):
     developer = forms.CharField(label="developer", max_length=50, required=False)
     title = forms.CharField(label="software", max_length=50, required=False)
-    category = forms.ModelChoiceField(label="category", required=False, empty_label="All",
-                                      queryset=Category.objects.order_by("sequence"))
+    category = reference.ReferenceChoiceField(reference.categories, label="category", required=False,
+                                              empty_label="All", queryset=Category.objects.order_by("sequence"))
     free = forms.BooleanField(label="Free", required=False)
     mac = forms.BooleanField(label="Mac", required=False)
     windows = forms.BooleanField(label="Windows", required=False)
     linux = forms.BooleanField(label="Linux", required=False)
-    features = forms.MultipleChoiceField(choices=[(x.pk, x.name) for x in Feature.objects.all()],
+    features = forms.MultipleChoiceField(choices=lambda: [(x.pk, x.name) for x in reference.features()],
                                          widget=forms.CheckboxSelectMultiple, required=False)
 
 
+@conditional_get("software", "feature", vary_on_cookies=[settings.CSRF_COOKIE_NAME])
 class SearchView(FormView):
     template_name = "software/search.html"
     form_class = SearchForm
     success_url = reverse_lazy("search")
+    facet_selection = None
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        index = facet_index.current()
+        counts = index.counts(index.active if self.facet_selection is None else self.facet_selection)
+        context["facet_counts"] = {name: counts.get(name, 0) for name in FLAGS}
+        context["feature_choices"] = [(pk, name, counts.get(("feature", pk), 0))
+                                      for pk, name in context["form"].fields["features"].choices]
+        if settings.CDB_STATIC_EXPORT:
+            context["static_index_url"] = SEARCH_INDEX
+        return context
 
     def post(self, request, *args, **kwargs):
         form = self.get_form()
@@ -99,39 +329,28 @@ class SearchView(FormView):
                     is_data = True
 
             if is_data:
-                # Cannot use Q objects in this case because it leads to impossible WHERE clause when more then
-                # one feature is chosen.
-                software = Software.objects.filter(active=True)
-                if cleaned_data["features"]:
-                    for feature in Feature.objects.filter(pk__in=cleaned_data["features"]):
-                        software = software.filter(features=feature)
-
-                query = Q(active=True)
-                if cleaned_data["developer"]:
-                    query &= Q(developer__name__icontains=cleaned_data["developer"])
-                if cleaned_data["category"]:
-                    query &= Q(category=cleaned_data["category"])
-                if cleaned_data["title"]:
-                    query &= Q(name__icontains=cleaned_data["title"])
-                if cleaned_data["free"]:
-                    query &= Q(free=True)
-                if cleaned_data["mac"]:
-                    query &= Q(mac=True)
-                if cleaned_data["windows"]:
-                    query &= Q(windows=True)
-                if cleaned_data["linux"]:
-                    query &= Q(linux=True)
-
-                software = software.filter(query).distinct()
-
-                if software.count():
-                    software = software.order_by(Lower("developer__name"), "category__sequence", Lower("name"))
+                # Facets are resolved against the in-process bitmap index; the database is only asked for
+                # the text match and the matching rows.
+                self.facet_selection = facet_index.current().match(
+                    category=cleaned_data["category"].pk if cleaned_data["category"] else None,
+                    features=cleaned_data["features"],
+                    **{name: cleaned_data[name] for name in FLAGS})
+                if self.facet_selection:
+                    # Repeated searches are served from the cached order of the matching ids, with one
+                    # query for the rows of the page; only the ids of the page reach the database.
+                    pks, ranks = search_results(search_key(cleaned_data), self.facet_selection,
+                                                developer=cleaned_data["developer"], title=cleaned_data["title"])
+                    software = search_page(SoftwareListing.objects.all(), pks, ranks, request.POST) or None
                 else:
                     software = None
             else:
                 software = None
 
             self.extra_context = {"software": software,
+                                  "page_obj": software,
+                                  "search_query": [(name, value) for name in request.POST
+                                                   for value in request.POST.getlist(name)
+                                                   if name not in ("csrfmiddlewaretoken", "after", "before")],
                                   "search": True,
                                   "s_developer": cleaned_data["developer"],
                                   "s_category": cleaned_data["category"].id if cleaned_data["category"] else None,
@@ -145,51 +364,30 @@ class SearchView(FormView):
         return super().get(request, *args, **kwargs)
 
 
+@conditional_get("developer:{slug}")
 class DeveloperDetailView(DetailView):
     model = Developer
     template_name = "software/developer.html"
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context["software_list"] = self.object.software_set.all().order_by("category", "name")
+        context["software_list"] = developer_software(self.object)
         return context
 
 
-class DeveloperListView(ListView):
+def developer_software(developer):
+    return SoftwareListing.objects.filter(developer_id=developer.pk)\
+        .order_by("category_sequence", "category_name", "category_id", "name")
+
+
+@conditional_get("developer")
+class DeveloperListView(KeysetListMixin, ListView):
     model = Developer
+    keyset = DEVELOPER_ORDER
 
 
-class RecentUpdatesFeed(Feed):
-    title = "CLAPdb Recent Updates"
-    link = "/"
-    description = "CLAP Audio Software Database Recent Updates"
-
-    def items(self):
-        return Software\
-            .objects.select_related("developer", "category")\
-            .filter(created__gte=tz.now()-tz.timedelta(days=settings.CDB_RECENT_UPDATES_DAYS))\
-            .filter(active=True)\
-            .order_by("-created")[:settings.CDB_RECENT_UPDATES_MAX]
-
-    def item_title(self, item):
-        return f"{item.created.strftime('%Y-%m-%d')} &mdash; {item.developer.name} {item.name}"
-
-    def item_description(self, item):
-        desc = f"""
-        <p>Developer: {item.developer.name}</p>
-        <p>Title: {item.name}</p>
-        <p>Version: {item.version}</p>
-        <p>URL: <a href='{item.url}'>{item.url}</a>
-        """
-        if item.notes:
-            desc = desc + f"\n<p>Notes:</p>{item.notes}"
-        return desc
-
-    def item_link(self, item):
-        return reverse('software', args=[item.pk])
-
-    def item_pubdate(self, item):
-        return item.created
-
-    def item_updateddate(self, item):
-        return item.updated
+def feed(request, format="rss", scope="all", slug=None):
+    entry = feeds.get_feed(request, format, scope, slug)
+    if entry is None:
+        raise Http404("No feed found matching the query")
+    return feeds.feed_response(request, entry)
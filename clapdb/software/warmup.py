@@ -0,0 +1,114 @@
+"""
+Worker warm-up.
+
+A fresh process pays on its first requests for work the later ones skip: URL patterns compile their
+regexes and the resolver its reverse lookup table on first use, the cached template loader compiles each
+template the first time it is rendered, the context processors, locale formats and static files storage
+are imported on the first render, the database connection is opened, and the reference data, snippets
+and the in-process facet and autocomplete indexes are loaded. Beyond that, the pages named by
+``CDB_WARM_UP_PAGES`` are rendered through the full middleware stack, filling the page and fragment
+caches. ``warm_up`` does all of it up front so the first request a worker serves is as fast as the
+thousandth.
+
+It runs in every gunicorn worker through the ``post_worker_init`` hook in ``config/gunicorn.py``, and on
+demand with the ``warm_up`` command, which fills the shared cache for workers that have not started yet.
+A database that cannot be reached is logged and skipped. The worker still boots and loads the data on
+its first requests instead.
+"""
+import logging
+import time
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.db import DatabaseError, connection
+from django.template import TemplateSyntaxError, engines
+from django.template.backends.django import DjangoTemplates
+from django.test import Client
+from django.urls import URLResolver, get_resolver, reverse
+from django.utils.formats import get_format
+from clapdb.snippets.cache import get_snippets
+from clapdb.snippets.models import Snippet
+from clapdb.templating import project_templates
+from . import reference
+from .autocomplete import prefix_index
+from .facets import facet_index
+
+logger = logging.getLogger(__name__)
+
+
+def compile_patterns(resolver):
+    for pattern in resolver.url_patterns:
+        pattern.pattern.regex
+        if isinstance(pattern, URLResolver):
+            compile_patterns(pattern)
+
+
+def warm_urls():
+    resolver = get_resolver()
+    compile_patterns(resolver)
+    # Populated per language on the first reverse().
+    resolver.reverse_dict
+
+
+def warm_templates():
+    for engine, name in project_templates():
+        try:
+            engine.get_template(name)
+        except TemplateSyntaxError:
+            logger.exception("Template %s failed to compile", name)
+
+
+def warm_modules():
+    for engine in engines.all():
+        if isinstance(engine, DjangoTemplates):
+            engine.engine.template_context_processors
+    get_format("DATE_FORMAT")
+    staticfiles_storage.base_url
+
+
+def warm_database():
+    connection.ensure_connection()
+
+
+def warm_reference():
+    reference.categories()
+    reference.features()
+    get_snippets(*Snippet.objects.values_list("slug", flat=True))
+    facet_index.current()
+    prefix_index.current()
+
+
+def allowed_host():
+    """Return a host name that ALLOWED_HOSTS accepts, for requests made in-process."""
+    for host in settings.ALLOWED_HOSTS:
+        if host != "*":
+            return host.lstrip(".")
+    return "localhost"
+
+
+def warm_pages():
+    # Rendering pages without a database would only log a traceback for each.
+    connection.ensure_connection()
+    client = Client(HTTP_HOST=allowed_host(), raise_request_exception=False)
+    for name in settings.CDB_WARM_UP_PAGES:
+        response = client.get(reverse(name))
+        if response.status_code != 200:
+            logger.warning("Warm-up of %s returned %s", name, response.status_code)
+
+
+STEPS = {"urls": warm_urls, "templates": warm_templates, "modules": warm_modules, "database": warm_database,
+         "reference": warm_reference, "pages": warm_pages}
+
+
+def warm_up():
+    """Run every warm-up step and return ``{step: ms}``, with None for a step the database failed."""
+    timings = {}
+    for name, step in STEPS.items():
+        start = time.perf_counter()
+        try:
+            step()
+        except DatabaseError as e:
+            logger.warning("Warm-up step %s skipped: %s", name, e)
+            timings[name] = None
+            continue
+        timings[name] = (time.perf_counter() - start) * 1000
+    return timings
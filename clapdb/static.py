@@ -0,0 +1,246 @@
+"""
+The static asset pipeline.
+
+``CompressedManifestStaticFilesStorage`` is what ``collectstatic`` writes ``STATIC_ROOT`` with. On top of
+Django's ``ManifestStaticFilesStorage``, which copies every asset to a name carrying a hash of its content
+and lets ``{% static %}`` resolve those names from a manifest, it
+
+* strips from the stylesheets named in ``CDB_PURGE_CSS`` the rules whose selectors use a class that
+  appears nowhere in the project's templates, the static scripts or the django-bootstrap5 renderers,
+  before they are hashed; ``CDB_CSS_SAFELIST`` keeps the classes used only in HTML entered in the admin;
+* writes a gzip variant, and a brotli variant if the ``brotli`` package is installed, next to every text
+  asset, for a front server to send as is (nginx's ``gzip_static`` and ``brotli_static``).
+
+A hashed name changes with the content, so its response can be cached for good. ``serve`` sends the
+collected files with ``Cache-Control: immutable`` for a year, picking the precompressed variant the client
+accepts. It is routed under ``STATIC_URL`` when ``CDB_SERVE_STATIC`` is set, for deployments without a
+front server; under ``DEBUG`` runserver serves the unprocessed sources instead. The test runner turns
+``DEBUG`` off without a manifest to read, so there ``{% static %}`` links the unhashed names; anywhere else
+a missing manifest fails the page, as with Django's storage, rather than hide a forgotten collectstatic.
+"""
+import gzip
+import mimetypes
+import os
+import posixpath
+import re
+import django_bootstrap5
+from django_bootstrap5.components import ALERT_TYPES
+from django_bootstrap5.size import SIZES
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import HashedFilesMixin, ManifestStaticFilesStorage, staticfiles_storage
+from django.core.files.base import ContentFile
+from django.test.utils import _TestState
+from django.http import FileResponse, Http404, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+from clapdb.templating import project_templates
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE = (".css", ".js", ".json", ".map", ".svg", ".txt", ".xml", ".html")
+# A variant is only kept if it saves at least this fraction of the original size.
+MIN_SAVING = 0.05
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+ACCEPTS = {encoding: re.compile(rf"\b{encoding}\b") for encoding, _ in ENCODINGS}
+
+# Classes Bootstrap's JavaScript adds at run time, which no template mentions.
+RUNTIME_CLASSES = {"show", "showing", "hiding", "collapsing", "collapsed", "fade", "active", "disabled",
+                   "dropup", "dropend", "dropstart", "dropdown-menu-end", "dropdown-menu-start",
+                   "modal-open", "modal-backdrop", "modal-static", "offcanvas-backdrop", "tooltip",
+                   "popover", "bs-popover-auto", "bs-tooltip-auto", "was-validated"}
+# Classes django-bootstrap5 puts together from a prefix and a value.
+GENERATED_CLASSES = ({f"alert-{alert_type}" for alert_type in ALERT_TYPES}
+                     | {f"{prefix}-{size}" for prefix in ("btn", "form-control", "form-select", "input-group",
+                                                          "col-form-label", "pagination") for size in SIZES}
+                     | {f"justify-content-{value}" for value in ("start", "center", "end")})
+# Files whose words count as used class names, besides the project templates.
+CONTENT_SUFFIXES = (".html", ".txt", ".xml", ".js", ".py")
+CLASS = re.compile(r"\.(-?[_a-zA-Z][\w-]*)")
+# Parts of a selector whose classes need not be present for it to match.
+NEGATIONS = re.compile(r":not\((?:[^()]|\([^()]*\))*\)|\[[^\]]*\]")
+WORD = re.compile(r"[\w-]+")
+
+
+def content_files():
+    """Yield the paths of the files ``purge_css`` takes the used class names from."""
+    for engine, name in project_templates():
+        for directory in engine.template_dirs:
+            path = os.path.join(directory, name)
+            if os.path.exists(path):
+                yield path
+                break
+    # The search and autocomplete scripts build markup, and the django-bootstrap5 renderers give form
+    # fields and messages their classes in Python.
+    for finder in finders.get_finders():
+        for name, storage in finder.list(["CVS", ".*", "*~"]):
+            if name.endswith(".js"):
+                yield storage.path(name)
+    for root, _, files in os.walk(os.path.dirname(django_bootstrap5.__file__)):
+        yield from (os.path.join(root, name) for name in files if name.endswith(CONTENT_SUFFIXES))
+
+
+def used_classes():
+    words = RUNTIME_CLASSES | GENERATED_CLASSES | set(getattr(settings, "CDB_CSS_SAFELIST", ()))
+    for path in content_files():
+        with open(path, encoding="utf-8", errors="ignore") as f:
+            words.update(WORD.findall(f.read()))
+    return words
+
+
+def _scan(css, i, stop):
+    """Return the index of the first ``stop`` character at or after ``i`` outside strings, comments and parentheses."""
+    depth = 0
+    while i < len(css):
+        c = css[i]
+        if c in "\"'":
+            i = css.index(c, i + 1)
+        elif css.startswith("/*", i):
+            i = css.index("*/", i) + 1
+        elif c == "(":
+            depth += 1
+        elif c == ")":
+            depth -= 1
+        elif c in stop and depth == 0:
+            return i
+        i += 1
+    return i
+
+
+def _block_end(css, i):
+    """Return the index of the ``}`` closing the block whose ``{`` is at ``i``."""
+    depth = 0
+    while True:
+        i = _scan(css, i, "{}")
+        depth += 1 if css[i] == "{" else -1
+        if depth == 0:
+            return i
+        i += 1
+
+
+def split_selectors(prelude):
+    selectors, start = [], 0
+    while start <= len(prelude):
+        end = _scan(prelude, start, ",")
+        selectors.append(prelude[start:end])
+        start = end + 1
+    return selectors
+
+
+def purge_css(css, used):
+    """Return ``css`` without the selectors using a class not in ``used``, and without the rules left empty."""
+    out = []
+    i = 0
+    while i < len(css):
+        if css.startswith("/*", i):
+            end = css.index("*/", i) + 2
+            # License notices stay; source maps and other comments go.
+            if css.startswith("/*!", i):
+                out.append(css[i:end])
+            i = end
+            continue
+        end = _scan(css, i, "{;")
+        prelude = css[i:end].strip()
+        if end == len(css) or css[end] == ";":
+            if prelude:
+                out.append(prelude + ";")
+            i = end + 1
+            continue
+        close = _block_end(css, end)
+        body = css[end + 1:close]
+        i = close + 1
+        if prelude.startswith("@"):
+            if re.match(r"@(media|supports|layer|container|document)\b", prelude):
+                body = purge_css(body, used)
+                if not body:
+                    continue
+            out.append(f"{prelude}{{{body}}}")
+            continue
+        selectors = [selector.strip() for selector in split_selectors(prelude)
+                     if all(name in used for name in CLASS.findall(NEGATIONS.sub("", selector)))]
+        if selectors:
+            out.append(f"{','.join(selectors)}{{{body}}}")
+    return "".join(out)
+
+
+def compress(storage, name):
+    """Write the precompressed variants of ``name`` next to it."""
+    with storage.open(name) as f:
+        content = f.read()
+    variants = {".gz": gzip.compress(content, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants[".br"] = brotli.compress(content)
+    for suffix, compressed in variants.items():
+        if storage.exists(name + suffix):
+            storage.delete(name + suffix)
+        if len(compressed) <= len(content) * (1 - MIN_SAVING):
+            storage._save(name + suffix, ContentFile(compressed))
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+
+    def url(self, name, force=False):
+        # setup_test_environment() keeps the settings it replaces on _TestState until the tests end.
+        if not self.hashed_files and hasattr(_TestState, "saved_data"):
+            return super(HashedFilesMixin, self).url(name)
+        return super().url(name, force)
+
+    def post_process(self, paths, dry_run=False, **options):
+        if dry_run:
+            return
+        purge = set(getattr(settings, "CDB_PURGE_CSS", ())) & set(paths)
+        if purge:
+            used = used_classes()
+            for name in sorted(purge):
+                storage, path = paths[name]
+                with storage.open(path) as f:
+                    css = f.read().decode("utf-8")
+                if self.exists(name):
+                    self.delete(name)
+                self._save(name, ContentFile(purge_css(css, used).encode("utf-8")))
+                # Hash the purged copy, not the source.
+                paths[name] = (self, name)
+        names = set()
+        for name, hashed_name, processed in super().post_process(paths, dry_run, **options):
+            if not isinstance(processed, Exception):
+                names.update((name, hashed_name))
+            yield name, hashed_name, processed
+        for name in sorted(names - {None}):
+            if name.endswith(COMPRESSIBLE) and self.exists(name):
+                compress(self, name)
+
+
+def serve(request, path):
+    """Serve a file collected to ``STATIC_ROOT``, precompressed if the client accepts it."""
+    path = posixpath.normpath(path).lstrip("/")
+    fullpath = safe_join(settings.STATIC_ROOT, path)
+    if not os.path.isfile(fullpath):
+        raise Http404("No static file found matching the query")
+    content_type, _ = mimetypes.guess_type(fullpath)
+    accept_encoding = request.META.get("HTTP_ACCEPT_ENCODING", "")
+    content_encoding = None
+    for encoding, suffix in ENCODINGS:
+        if ACCEPTS[encoding].search(accept_encoding) and os.path.isfile(fullpath + suffix):
+            fullpath, content_encoding = fullpath + suffix, encoding
+            break
+    stat = os.stat(fullpath)
+    if not was_modified_since(request.META.get("HTTP_IF_MODIFIED_SINCE"), stat.st_mtime, stat.st_size):
+        response = HttpResponseNotModified()
+    else:
+        response = FileResponse(open(fullpath, "rb"), content_type=content_type or "application/octet-stream")
+        response["Last-Modified"] = http_date(stat.st_mtime)
+        if content_encoding:
+            response["Content-Encoding"] = content_encoding
+    if path.endswith(COMPRESSIBLE):
+        patch_vary_headers(response, ("Accept-Encoding",))
+    if path in getattr(staticfiles_storage, "hashed_files", {}).values():
+        patch_cache_control(response, public=True, max_age=settings.CDB_STATIC_MAX_AGE, immutable=True)
+    else:
+        # The unhashed names are rewritten by every collectstatic.
+        patch_cache_control(response, public=True, no_cache=True)
+    return response
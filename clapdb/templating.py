@@ -0,0 +1,26 @@
+"""
+The project's own templates.
+
+``project_templates`` lists them for the code that has to read every one: the worker warm-up compiles
+them, and the static pipeline takes the CSS classes they use from them. It lives here, apart from both, so
+neither imports the other.
+"""
+import os
+from django.conf import settings
+from django.template import engines
+
+TEMPLATE_SUFFIXES = (".html", ".xml", ".txt")
+
+
+def project_templates():
+    """Yield ``(engine, name)`` for every template of the project, leaving out the admin's and other packages'."""
+    base_dir = os.fspath(settings.BASE_DIR)
+    for engine in engines.all():
+        for directory in engine.template_dirs:
+            directory = os.fspath(directory)
+            if not directory.startswith(base_dir):
+                continue
+            for root, _, files in os.walk(directory):
+                for name in files:
+                    if name.endswith(TEMPLATE_SUFFIXES):
+                        yield engine, os.path.relpath(os.path.join(root, name), directory)
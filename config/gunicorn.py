@@ -0,0 +1,13 @@
+"""
+Gunicorn configuration, e.g. ``gunicorn config.wsgi -c config/gunicorn.py -w 4 -b :8000``.
+
+Command-line options override the settings here.
+"""
+
+
+def post_worker_init(worker):
+    # Each worker loads the application itself (no --preload), so warm it before it accepts requests.
+    from clapdb.software.warmup import warm_up
+
+    timings = warm_up()
+    worker.log.info("Warmed up in %.0f ms", sum(ms for ms in timings.values() if ms is not None))
@@ -34,22 +34,29 @@ INSTALLED_APPS = [
     "django_bootstrap5",
     "clapdb.software",
     "clapdb.snippets",
+    "clapdb.benchmarks",
 ]
 
 MIDDLEWARE = [
-    #"django.middleware.cache.UpdateCacheMiddleware",
+    "clapdb.software.middleware.InstrumentationMiddleware",
     "django.middleware.security.SecurityMiddleware",
+    "clapdb.software.middleware.PageCacheMiddleware",
+    "clapdb.software.middleware.ReplicaMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
-    #"django.middleware.cache.FetchFromCacheMiddleware",
 ]
 
 ROOT_URLCONF = "config.urls"
 
+# Persistent connections: give each DATABASES entry a CONN_MAX_AGE (seconds a connection is reused
+# across requests, None for no limit) and CONN_HEALTH_CHECKS = True to replace a reused connection the
+# server has closed (see clapdb.db).
+DATABASE_ROUTERS = ["clapdb.db.ReplicaRouter"]
+
 TEMPLATES = [
     {
         "BACKEND": "django.template.backends.django.DjangoTemplates",
@@ -96,14 +103,72 @@ USE_TZ = True
 # Static files (CSS, JavaScript, Images)
 STATIC_URL = "static/"
 STATIC_ROOT = f"{BASE_DIR}/static"
+# collectstatic hashes, purges and precompresses the assets (clapdb.static); with DEBUG off, {% static %}
+# resolves the hashed names from the manifest it writes, so it has to run before the server starts.
+# Only the test runner, which turns DEBUG off, links the unhashed names without a manifest.
+STATICFILES_STORAGE = "clapdb.static.CompressedManifestStaticFilesStorage"
+# Stylesheets stripped of the rules for classes the templates do not use, and classes to keep regardless,
+# such as those used only in notes and snippets entered in the admin.
+CDB_PURGE_CSS = ["software/css/bootstrap.min.css"]
+CDB_CSS_SAFELIST = []
+# Serve STATIC_ROOT from Django (clapdb.static.serve) for deployments without a front server, and the
+# seconds browsers may keep a hashed asset.
+CDB_SERVE_STATIC = False
+CDB_STATIC_MAX_AGE = 60 * 60 * 24 * 365
 
 # Default primary key field type
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
+# The Bootswatch theme in software/css/bootstrap.min.css is a complete Bootstrap build; base.html links it
+# through {% static %} in place of django-bootstrap5's CDN stylesheet.
 BOOTSTRAP5 = {
-    "theme_url": "/static/software/css/bootstrap.min.css"
+    "css_url": None,
 }
 
 # asaudio settings
 CDB_RECENT_UPDATES_MAX = 100
 CDB_RECENT_UPDATES_DAYS = 60
+# Rows per page of the keyset-paginated category, developer and search listings.
+CDB_PAGE_SIZE = 100
+# Dotted path to a clapdb.software.search backend; None picks one matching the database vendor.
+CDB_SEARCH_BACKEND = None
+# Seconds the ordered results of a search stay cached (they are invalidated by writes in any case), and the
+# most bytes they may take to be cached: 8 a title, 16 when ranked. Memcached refuses items over 1 MB.
+CDB_SEARCH_CACHE_TIMEOUT = 60 * 60
+CDB_SEARCH_CACHE_MAX_BYTES = 1000 * 1000
+# Seconds a snippet stays in the shared cache (None: until the next Snippet change) and in each process.
+CDB_SNIPPET_CACHE_TIMEOUT = None
+CDB_SNIPPET_LOCAL_TTL = 300
+# Seconds browsers may reuse an autocomplete answer.
+CDB_AUTOCOMPLETE_MAX_AGE = 60 * 5
+# Route the read views to their async versions (clapdb.software.async_views); for ASGI deployments.
+CDB_ASYNC_VIEWS = False
+# Set by export_static while it renders the site: the search page then searches client-side.
+CDB_STATIC_EXPORT = False
+# URL names of the pages every worker renders on boot (clapdb.software.warmup), filling the page and
+# fragment caches and running the code behind them before the first real request.
+CDB_WARM_UP_PAGES = ["home", "developer-list", "stats", "feed", "search"]
+# Query/template/latency metrics per request, in a staff-only report, and as a Server-Timing header under
+# DEBUG and for logged-in staff.
+CDB_INSTRUMENTATION = True
+# DATABASES aliases that replicate "default". The views named in CDB_REPLICA_VIEWS read from one of them,
+# except for CDB_REPLICA_LAG seconds after any write, when they read from the primary. To try it locally,
+# add a second SQLite or PostgreSQL database and copy the primary over it with sync_replicas.
+CDB_READ_REPLICAS = []
+CDB_REPLICA_VIEWS = ["home", "software", "developer", "developer-list", "software-list-category", "stats",
+                     "feed", "feed-format", "category-feed", "developer-feed", "search"]
+CDB_REPLICA_LAG = 10
+# URL name -> seconds for the anonymous full-page cache. Pages are invalidated by the generations they
+# depend on, so the timeouts only bound how long unused pages occupy the cache.
+CDB_PAGE_CACHE = {
+    "home": 60 * 60 * 24,
+    "software": 60 * 60 * 24,
+    "developer": 60 * 60 * 24,
+    "developer-list": 60 * 60 * 24,
+    "software-list-category": 60 * 60 * 24,
+    "stats": 60 * 60 * 24,
+}
+# The feeds keep their own precomputed, precompressed copies (clapdb.software.feeds): seconds those stay
+# in the shared cache, and seconds feed readers and proxies may reuse a response.
+CDB_FEED_TIMEOUT = 60 * 60 * 24
+CDB_FEED_MAX_AGE = 60 * 5
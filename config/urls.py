@@ -13,11 +13,18 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+from django.conf import settings
 from django.contrib import admin
-from django.urls import include, path
+from django.urls import include, path, re_path
+from clapdb import static
+from clapdb.software.instrumentation import report_view
 
 urlpatterns = [
     path("cosmere/clearcache/", include("clearcache.urls")),
+    path("cosmere/instrumentation/", report_view, name="instrumentation-report"),
     path("cosmere/", admin.site.urls),
     path("", include("clapdb.software.urls"))
 ]
+
+if settings.CDB_SERVE_STATIC:
+    urlpatterns.insert(0, re_path(rf"^{settings.STATIC_URL.lstrip('/')}(?P<path>.+)$", static.serve))